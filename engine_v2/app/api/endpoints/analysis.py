@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from typing import Dict, Any, List
+import asyncio
+import functools
 import time
 import logging
 import uuid
@@ -9,7 +11,12 @@ from app.services.monte_carlo import MonteCarloAnalyzer, MonteCarloConfig
 from app.services.prediction import PredictionService
 from app.services.coverage_optimization import CoverageOptimizer
 from app.services.slip_generator import SlipGenerator
-from app.services.ev_calculator import EVCalculator
+from app.services.ev_calculator import EVCalculator, slip_arrays
+from app.services.job_manager import job_manager
+from app.services.single_flight import SingleFlight, request_key
+from app.services.micro_batcher import MicroBatcher
+from app.services.ensemble import EnsemblePredictor
+from app.services.fidelity import FidelityController, FidelityConfig
 from app.utils.validation import validate_analysis_request
 from app.utils.logger import log_analysis_request
 
@@ -22,6 +29,31 @@ prediction_service = PredictionService()
 coverage_optimizer = CoverageOptimizer()
 slip_generator = SlipGenerator()
 ev_calculator = EVCalculator()
+analysis_flight = SingleFlight()
+
+# Match rows from concurrent requests share one model inference call
+PREDICTION_MAX_BATCH = 64
+PREDICTION_MAX_DELAY = 0.005  # seconds a request may wait for batch-mates
+prediction_batcher = MicroBatcher(
+    prediction_service.predict_matches,
+    max_batch_size=PREDICTION_MAX_BATCH,
+    max_delay=PREDICTION_MAX_DELAY
+)
+ensemble = EnsemblePredictor(monte_carlo, prediction_batcher.submit)
+
+# Alternatives screened per request vs. slips returned to the client
+NUM_ALTERNATIVES = 10
+TOP_SLIPS = 5
+
+# Scales simulations, alternatives and ensemble components down under load
+fidelity_controller = FidelityController(
+    FidelityConfig(
+        max_simulations=monte_carlo.config.simulations,
+        max_alternatives=NUM_ALTERNATIVES
+    ),
+    # Sampled in the background; requests read the cached count
+    queue_depth_fn=lambda: job_manager.store.queue_depth()
+)
 
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_slip(
@@ -55,79 +87,18 @@ async def analyze_slip(
         # Convert request to dict for processing
         request_dict = request.dict()
         
-        # Step 1: Monte Carlo simulation
-        logger.info("Running Monte Carlo simulations...")
-        mc_results = monte_carlo.simulate_slip(request_dict["matches"], request_dict["stake"])
-        
-        # Step 2: ML predictions (if requested)
-        if request.prediction_type != "monte_carlo":
-            logger.info("Running ML predictions...")
-            ml_predictions = await prediction_service.predict_matches(request_dict["matches"])
-            mc_results.update({"ml_predictions": ml_predictions})
-        
-        # Step 3: Generate alternative slips
-        logger.info("Generating alternative slips...")
-        alternatives = monte_carlo.generate_alternative_slips(
-            request_dict,
-            num_alternatives=10
-        )
-        
-        # Step 4: Optimize coverage
-        logger.info("Optimizing market coverage...")
-        optimized_slips = coverage_optimizer.optimize_slips(alternatives)
-        
-        # Step 5: Calculate expected values
-        logger.info("Calculating expected values...")
-        analyzed_slips = []
-        for slip in optimized_slips:
-            ev_analysis = ev_calculator.analyze_slip(slip)
-            analyzed_slip = {
-                **slip,
-                "expected_value": ev_analysis["expected_value"],
-                "risk_adjusted_return": ev_analysis["risk_adjusted_return"],
-                "sharpe_ratio": ev_analysis["sharpe_ratio"],
-                "recommendations": ev_analysis["recommendations"],
-            }
-            analyzed_slips.append(analyzed_slip)
-        
-        # Step 6: Format response
-        generated_slips = []
-        for i, slip in enumerate(analyzed_slips[:5]):  # Return top 5
-            generated_slips.append(
-                AlternativeSlip(
-                    slip_id=f"{request.master_slip_id}_ALT_{i+1:03d}",
-                    total_odds=slip["total_odds"],
-                    possible_return=slip["possible_return"],
-                    confidence_score=slip["confidence_score"],
-                    risk_level=slip["risk_level"],
-                    legs=slip["match_results"],
-                    expected_value=slip["expected_value"],
-                    recommendations=slip["recommendations"],
-                )
+        # Identical concurrent requests share one computation
+        with fidelity_controller.track():
+            response = await analysis_flight.do(
+                request_key(request_dict),
+                lambda: _run_analysis(request, request_dict, start_time)
             )
         
-        processing_time = time.time() - start_time
-        
         # Add to background tasks if processing took too long
-        if processing_time > 5:
-            background_tasks.add_task(log_long_running_analysis, request.master_slip_id, processing_time)
+        if response.processing_time > 5:
+            background_tasks.add_task(log_long_running_analysis, request.master_slip_id, response.processing_time)
         
-        logger.info(f"Analysis completed for {request.master_slip_id} in {processing_time:.2f}s")
-        
-        return AnalysisResponse(
-            success=True,
-            master_slip_id=request.master_slip_id,
-            generated_slips=generated_slips,
-            analysis_metadata={
-                "processing_time": processing_time,
-                "simulations": mc_results["simulations"],
-                "prediction_type": request.prediction_type,
-                "risk_profile": request.risk_profile,
-                "matches_analyzed": len(request.matches),
-                "alternatives_generated": len(analyzed_slips),
-            },
-            processing_time=processing_time,
-        )
+        return response
         
     except HTTPException:
         raise
@@ -142,6 +113,115 @@ async def analyze_slip(
             }
         )
 
+async def _run_analysis(
+    request: AnalysisRequest,
+    request_dict: Dict[str, Any],
+    start_time: float
+) -> AnalysisResponse:
+    """
+    Run the analysis pipeline for a validated request
+
+    The CPU-heavy simulation steps run in the default executor so the event
+    loop stays free to accept (and coalesce) concurrent requests meanwhile;
+    independent steps run concurrently, so latency tracks the slowest step.
+    """
+    loop = asyncio.get_running_loop()
+    
+    # Fidelity is fixed for the whole request when it starts
+    fidelity = fidelity_controller.current()
+    analyzer = monte_carlo
+    if fidelity.simulations < monte_carlo.config.simulations:
+        analyzer = monte_carlo.with_config(simulations=fidelity.simulations)
+    num_alternatives = fidelity.num_alternatives
+    
+    # Steps 1-3 run concurrently: the ensemble components (Monte Carlo, ML,
+    # form/H2H) each under their own deadline, alongside alternative
+    # generation. Candidates are screened on analytic EV bounds; only those
+    # that can still reach the top TOP_SLIPS are simulated and analyzed below
+    logger.info("Running ensemble prediction and generating alternative slips...")
+    ensemble_result, alternatives = await asyncio.gather(
+        ensemble.predict(
+            request_dict["matches"],
+            request_dict["stake"],
+            request.prediction_type,
+            monte_carlo=analyzer,
+            allowed_components=fidelity.components
+        ),
+        loop.run_in_executor(
+            None,
+            functools.partial(
+                analyzer.generate_alternative_slips,
+                request_dict,
+                num_alternatives=num_alternatives,
+                top_k=min(TOP_SLIPS, num_alternatives)
+            )
+        )
+    )
+    mc_results = ensemble_result["slip"] or {}
+    
+    # Step 4: Optimize coverage
+    logger.info("Optimizing market coverage...")
+    optimized_slips = coverage_optimizer.optimize_slips(alternatives)
+    
+    # Step 5: Calculate expected values
+    logger.info("Calculating expected values...")
+    top_slips = optimized_slips[:TOP_SLIPS]
+    ev_analysis = ev_calculator.analyze_slips(*slip_arrays(top_slips))
+    analyzed_slips = [
+        {
+            **slip,
+            "expected_value": float(ev_analysis["expected_value"][i]),
+            "risk_adjusted_return": float(ev_analysis["risk_adjusted_return"][i]),
+            "sharpe_ratio": float(ev_analysis["sharpe_ratio"][i]),
+            "recommendations": ev_analysis["recommendations"][i],
+        }
+        for i, slip in enumerate(top_slips)
+    ]
+    
+    # Step 6: Format response
+    generated_slips = []
+    for i, slip in enumerate(analyzed_slips[:TOP_SLIPS]):
+        generated_slips.append(
+            AlternativeSlip(
+                slip_id=f"{request.master_slip_id}_ALT_{i+1:03d}",
+                total_odds=slip["total_odds"],
+                possible_return=slip["possible_return"],
+                confidence_score=slip["confidence_score"],
+                risk_level=slip["risk_level"],
+                legs=slip["match_results"],
+                expected_value=slip["expected_value"],
+                recommendations=slip["recommendations"],
+            )
+        )
+    
+    processing_time = time.time() - start_time
+    
+    logger.info(f"Analysis completed for {request.master_slip_id} in {processing_time:.2f}s")
+    
+    return AnalysisResponse(
+        success=True,
+        master_slip_id=request.master_slip_id,
+        generated_slips=generated_slips,
+        analysis_metadata={
+            "processing_time": processing_time,
+            # Iterations per simulated slip; the alternatives run even when the
+            # Monte Carlo ensemble component was shed or not requested
+            "simulations": analyzer.config.simulations if (mc_results or alternatives) else 0,
+            "slips_simulated": int(bool(mc_results)) + len(alternatives),
+            "prediction_type": request.prediction_type,
+            "risk_profile": request.risk_profile,
+            "matches_analyzed": len(request.matches),
+            "alternatives_generated": len(analyzed_slips),
+            "alternatives_screened": num_alternatives,
+            "alternatives_simulated": len(alternatives),
+            "ensemble_probabilities": ensemble_result["match_probabilities"],
+            "components": ensemble_result["components"],
+            "degraded": ensemble_result["degraded"],
+            "fidelity": fidelity.to_dict(),
+        },
+        processing_time=processing_time,
+    )
+
 async def log_long_running_analysis(master_slip_id: str, processing_time: float):
     """Log long-running analyses for monitoring"""
     logger.warning(
@@ -150,11 +230,17 @@ async def log_long_running_analysis(master_slip_id: str, processing_time: float)
 
 @router.get("/analysis/{master_slip_id}/status")
 async def get_analysis_status(master_slip_id: str):
-    """Get analysis status for a master slip"""
-    # In a real implementation, this would check a job queue or database
+    """Get the status of the most recent batch job for a master slip"""
+    job = await job_manager.latest_for_master_slip(master_slip_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No analysis job for {master_slip_id}")
+
     return {
         "master_slip_id": master_slip_id,
-        "status": "completed",  # Would be dynamic
-        "last_updated": time.time(),
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "last_updated": job["updated_at"],
         "estimated_completion": None,
-    }
\ No newline at end of file
+    }
@@ -1,35 +1,123 @@
 # api/v1/analysis.py
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from typing import Dict
-import uuid
-from app.services.simulation.monte_carlo import MonteCarloSimulator
-from app.tasks.simulation_tasks import process_simulation_task
-from app.core.dependencies import get_simulation_service
+import asyncio
+import json
+
+from app.services.job_events import JobEventFeed
+from app.services.job_manager import job_manager
+from app.services.job_store import FINISHED_STATES, COMPLETED, FAILED
 
 router = APIRouter()
 
+EVENT_POLL_INTERVAL = 0.25  # seconds between job event table reads
+
+# One tail per job, however many clients stream it; workers append events
+# in their own process, and each poll only reads the indexed (job_id, seq)
+# range not seen yet
+job_events = JobEventFeed(
+    lambda job_id, after_seq: job_manager.store.events_since(job_id, after_seq),
+    EVENT_POLL_INTERVAL,
+)
+
 @router.post("/analyze/batch")
-async def analyze_betslip_batch(
-    payload: Dict,
-    background_tasks: BackgroundTasks,
-    simulator: MonteCarloSimulator = Depends(get_simulation_service)
-):
+async def analyze_betslip_batch(payload: Dict):
     """
     Endpoint for batch analysis - returns immediately with job ID
+
+    The job is persisted before responding and executed by the job manager's
+    worker pool, so it survives API restarts and never blocks the event loop.
     """
-    job_id = str(uuid.uuid4())
-    
-    # Queue the heavy computation
-    background_tasks.add_task(
-        process_simulation_task,
-        job_id=job_id,
-        payload=payload,
-        simulator=simulator
+    job_id = await job_manager.submit(
+        "batch_simulation",
+        payload,
+        master_slip_id=payload.get("master_slip_id"),
     )
-    
+
     return {
         "job_id": job_id,
         "status": "queued",
-        "estimated_completion": "15-30 seconds",
-        "websocket_channel": f"results:{job_id}"
-    }
\ No newline at end of file
+        "queue_position": await job_manager.queue_depth(),
+        "status_url": f"/api/analysis/jobs/{job_id}",
+        "websocket_channel": f"results:{job_id}",
+        "websocket_url": f"/api/ws/results/{job_id}",
+        "events_url": f"/api/analysis/jobs/{job_id}/events"
+    }
+
+@router.get("/analysis/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Job status, progress and (once finished) its result or error"""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@router.get("/analysis/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """Result of a completed job; 409 while it is still queued or running"""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    if job["status"] not in FINISHED_STATES:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+    if job["status"] != COMPLETED:
+        raise HTTPException(status_code=422, detail=job["error"] or f"Job {job_id} was {job['status']}")
+    return job["result"]
+
+@router.delete("/analysis/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    status = await job_manager.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {"job_id": job_id, "status": status, "cancel_requested": status not in (COMPLETED, FAILED)}
+
+async def _until_disconnect(websocket: WebSocket) -> None:
+    """Return once the client goes away; it sends nothing else on this socket"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+async def _send_events(websocket: WebSocket, job_id: str, after: int) -> None:
+    async for event in job_events.subscribe(job_id, after):
+        await websocket.send_json(event)
+    await websocket.close()
+
+@router.websocket("/ws/results/{job_id}")
+async def stream_job_results(websocket: WebSocket, job_id: str, after: int = 0):
+    """
+    Push match completions, intermediate best slips and the final result of a job
+
+    A "restarted" event means the job was requeued and runs again from the
+    start: clients should drop the partial results received before it.
+    """
+    await websocket.accept()
+    if await job_manager.get(job_id) is None:
+        await websocket.close(code=4404, reason=f"Job {job_id} not found")
+        return
+    # Race the stream against a disconnect, so a client leaving while the job
+    # is idle releases its subscription instead of waiting for the next event
+    sender = asyncio.create_task(_send_events(websocket, job_id, after))
+    listener = asyncio.create_task(_until_disconnect(websocket))
+    done, pending = await asyncio.wait({sender, listener}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    for task in done | pending:
+        try:
+            await task
+        except (asyncio.CancelledError, WebSocketDisconnect):
+            pass
+
+@router.get("/analysis/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, after: int = 0):
+    """Server-Sent Events variant of the results stream; resume with ?after=<seq>"""
+    if await job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def event_source():
+        async for event in job_events.subscribe(job_id, after):
+            yield f"id: {event['seq']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
@@ -1,12 +1,13 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from typing import Dict, Any
 
 from app.core.config import settings
 from app.utils.logger import setup_logging
-from app.api.endpoints import analysis, health, validation
+from app.api.endpoints import analysis, analysis_update, health, validation
 from app.api.middleware import RequestLoggingMiddleware
 
 # Setup logging
@@ -19,14 +20,27 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting Football Analysis API")
     
-    # Load ML models
-    from app.ml_models.predictor import load_models
-    await load_models()
+    # Map ML models from the shared registry (pages are shared across workers)
+    from app.ml_models.registry import model_registry
+    loaded = await asyncio.get_running_loop().run_in_executor(None, model_registry.preload)
+    logger.info(f"Mapped models: {loaded}")
+    
+    # Start background job workers
+    from app.services.job_manager import job_manager
+    await job_manager.start()
+    
+    # Sample event-loop lag and CPU for load-adaptive fidelity
+    from app.api.endpoints.analysis import fidelity_controller
+    await fidelity_controller.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down Football Analysis API")
+    await fidelity_controller.stop()
+    await job_manager.stop()
+    from app.services.monte_carlo import shutdown_process_pool
+    shutdown_process_pool()
 
 def create_application() -> FastAPI:
     """Create and configure FastAPI application"""
@@ -51,6 +65,7 @@ def create_application() -> FastAPI:
     app.include_router(health.router, prefix="/api", tags=["Health"])
     app.include_router(validation.router, prefix="/api", tags=["Validation"])
     app.include_router(analysis.router, prefix="/api", tags=["Analysis"])
+    app.include_router(analysis_update.router, prefix="/api", tags=["Analysis"])
     
     return app
 
@@ -0,0 +1,197 @@
+# ml_models/registry.py - Shared, memory-mapped model storage
+# Layout on disk:
+#   <root>/<model>/CURRENT            -> name of the live version
+#   <root>/<model>/<version>/meta.json
+#   <root>/<model>/<version>/<array>.npy
+# Arrays are opened with np.load(mmap_mode="r"), so every worker process maps
+# the same page-cache pages instead of holding a private copy of the weights.
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+
+class ModelArtifact:
+    """One version of a model; arrays are mapped on first access"""
+
+    def __init__(self, name: str, version: str, path: str):
+        self.name = name
+        self.version = version
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.metadata: Dict[str, Any] = json.load(f)
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def array_names(self) -> List[str]:
+        return list(self.metadata.get("arrays", []))
+
+    def __getitem__(self, array_name: str) -> np.ndarray:
+        array = self._arrays.get(array_name)
+        if array is None:
+            with self._lock:
+                array = self._arrays.get(array_name)
+                if array is None:
+                    array = np.load(os.path.join(self.path, f"{array_name}.npy"), mmap_mode="r")
+                    self._arrays[array_name] = array
+        return array
+
+    def open_all(self) -> "ModelArtifact":
+        """Map every array now rather than on first access"""
+        for array_name in self.array_names:
+            self[array_name]
+        return self
+
+class ModelRegistry:
+    """
+    Versioned registry of memory-mapped model artifacts
+
+    Models are resolved lazily on first get(). Publishing a new version writes
+    it beside the old one and atomically repoints CURRENT; running workers
+    notice the change on their next get() (at most every check_interval
+    seconds) and swap without a restart. Callers that still hold the previous
+    artifact keep a valid mapping until they drop it.
+    """
+
+    def __init__(self, root: str, check_interval: float = 5.0, max_workers: int = 4):
+        self.root = root
+        self.check_interval = check_interval
+        self.max_workers = max_workers
+        self._models: Dict[str, ModelArtifact] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def list_models(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, CURRENT_FILE))
+        )
+
+    def current_version(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, name, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def get(self, name: str) -> ModelArtifact:
+        """Live artifact for a model, re-resolving CURRENT if it may have moved"""
+        artifact = self._models.get(name)
+        now = time.monotonic()
+        if artifact is not None and now - self._checked_at.get(name, 0.0) < self.check_interval:
+            return artifact
+
+        with self._lock:
+            artifact = self._models.get(name)
+            version = self.current_version(name)
+            if version is None:
+                if artifact is not None:
+                    return artifact
+                raise KeyError(f"Model {name} is not published in {self.root}")
+            if artifact is None or artifact.version != version:
+                artifact = ModelArtifact(name, version, os.path.join(self.root, name, version))
+                if name in self._models:
+                    logger.info(f"Model {name} swapped to version {version}")
+                self._models[name] = artifact
+            self._checked_at[name] = now
+            return artifact
+
+    def preload(self, names: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Resolve and map models in parallel
+
+        Returns:
+            Model name -> loaded version
+        """
+        names = names if names is not None else self.list_models()
+        if not names:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(names))) as pool:
+            artifacts = list(pool.map(lambda n: self.get(n).open_all(), names))
+        return {artifact.name: artifact.version for artifact in artifacts}
+
+    def publish(
+        self,
+        name: str,
+        arrays: Dict[str, np.ndarray],
+        metadata: Optional[Dict[str, Any]] = None,
+        version: Optional[str] = None
+    ) -> str:
+        """
+        Write a new model version and make it current
+
+        The default version is the publish time to the microsecond, with a
+        counter appended if that name is taken.
+        """
+        model_dir = os.path.join(self.root, name)
+        os.makedirs(model_dir, exist_ok=True)
+        published_at = time.time()
+        if version is None:
+            stamp = time.strftime("%Y%m%d%H%M%S", time.gmtime(published_at)) + f"{int(published_at % 1 * 1e6):06d}"
+            version, counter = stamp, 1
+            while os.path.exists(os.path.join(model_dir, version)):
+                version, counter = f"{stamp}-{counter}", counter + 1
+        final_dir = os.path.join(model_dir, version)
+        if os.path.exists(final_dir):
+            raise ValueError(f"Model {name} version {version} already exists")
+
+        staging = tempfile.mkdtemp(prefix=f".{version}-", dir=model_dir)
+        try:
+            for array_name, array in arrays.items():
+                np.save(os.path.join(staging, f"{array_name}.npy"), np.ascontiguousarray(array))
+            with open(os.path.join(staging, META_FILE), "w") as f:
+                json.dump({**(metadata or {}), "arrays": sorted(arrays), "published_at": published_at}, f)
+            os.rename(staging, final_dir)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        pointer = os.path.join(model_dir, f".{CURRENT_FILE}.tmp")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(model_dir, CURRENT_FILE))
+        self._checked_at.pop(name, None)
+        logger.info(f"Published model {name} version {version}")
+        return version
+
+    def _published_at(self, model_dir: str, version: str) -> float:
+        """Publish time from a version's metadata (directory mtime for older versions)"""
+        path = os.path.join(model_dir, version)
+        try:
+            with open(os.path.join(path, META_FILE)) as f:
+                return float(json.load(f)["published_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return os.path.getmtime(path)
+
+    def prune(self, name: str, keep: int = 2) -> List[str]:
+        """Delete all but the `keep` most recently published versions (never the current one)"""
+        model_dir = os.path.join(self.root, name)
+        current = self.current_version(name)
+        versions = sorted(
+            (
+                v for v in os.listdir(model_dir)
+                if not v.startswith(".") and os.path.isdir(os.path.join(model_dir, v))
+            ),
+            key=lambda v: (self._published_at(model_dir, v), v)
+        )
+        removed = [v for v in versions[:-keep] if v != current] if keep > 0 else []
+        for version in removed:
+            shutil.rmtree(os.path.join(model_dir, version), ignore_errors=True)
+        return removed
+
+# Shared by every worker process; nothing touches the disk until first use
+model_registry = ModelRegistry(os.getenv("MODEL_REGISTRY_PATH", "data/models"))
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.services.monte_carlo import MonteCarloAnalyzer
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ("home_win", "draw", "away_win")
+
+# Components each prediction type asks for
+COMPONENTS_BY_TYPE = {
+    "monte_carlo": ("monte_carlo",),
+    "machine_learning": ("machine_learning", "form_h2h"),
+    "ensemble": ("monte_carlo", "machine_learning", "form_h2h"),
+}
+
+@dataclass
+class EnsembleConfig:
+    # Seconds each component may take before the blend goes ahead without it
+    deadlines: Dict[str, float] = field(default_factory=lambda: {
+        "monte_carlo": 4.0,
+        "machine_learning": 1.5,
+        "form_h2h": 0.5,
+    })
+    weights: Dict[str, float] = field(default_factory=lambda: {
+        "monte_carlo": 0.5,
+        "machine_learning": 0.3,
+        "form_h2h": 0.2,
+    })
+    base_draw_rate: float = 0.26
+
+def form_h2h_probabilities(match: Dict[str, Any], base_draw_rate: float = 0.26) -> Dict[str, float]:
+    """
+    Cheap 1X2 estimate from team form and head-to-head history
+
+    Form strength is points per game plus half the goal difference per game;
+    the strength gap is mapped through a logistic curve and blended with the
+    Laplace-smoothed head-to-head record (weighted by how many meetings exist).
+    """
+    def strength(form: Dict[str, Any]) -> float:
+        played = max(form.get("matches_played", 0), 1)
+        ppg = (3 * form.get("wins", 0) + form.get("draws", 0)) / played
+        goal_diff = form.get("avg_goals_scored", 0.0) - form.get("avg_goals_conceded", 0.0)
+        return ppg / 3 + goal_diff / 2
+
+    gap = strength(match.get("home_form") or {}) - strength(match.get("away_form") or {}) + 0.1
+    home_share = 1 / (1 + math.exp(-3 * gap))
+    form_probs = {
+        "home_win": (1 - base_draw_rate) * home_share,
+        "draw": base_draw_rate,
+        "away_win": (1 - base_draw_rate) * (1 - home_share),
+    }
+
+    h2h = match.get("head_to_head") or {}
+    total = h2h.get("total_matches", 0)
+    if total <= 0:
+        return form_probs
+
+    h2h_probs = {
+        "home_win": (h2h.get("home_wins", 0) + 1) / (total + 3),
+        "draw": (h2h.get("draws", 0) + 1) / (total + 3),
+        "away_win": (h2h.get("away_wins", 0) + 1) / (total + 3),
+    }
+    h2h_weight = min(total, 10) / 20
+    return {k: (1 - h2h_weight) * form_probs[k] + h2h_weight * h2h_probs[k] for k in OUTCOMES}
+
+def _as_probabilities(prediction: Any) -> Optional[Dict[str, float]]:
+    """Pull a normalised 1X2 triple out of a predictor output, if it has one"""
+    if not isinstance(prediction, dict):
+        return None
+    source = prediction.get("probabilities", prediction)
+    if not isinstance(source, dict) or not all(k in source for k in OUTCOMES):
+        return None
+    total = sum(float(source[k]) for k in OUTCOMES)
+    if total <= 0:
+        return None
+    return {k: float(source[k]) / total for k in OUTCOMES}
+
+class EnsemblePredictor:
+    """
+    Run the prediction components concurrently under per-component deadlines
+
+    Monte Carlo and the form/H2H model run in the default executor, the ML
+    predictor is awaited directly. Whatever finishes in time is blended with
+    renormalised weights; late or failing components are reported in the
+    component status table and flag the result as degraded. A late executor
+    job cannot be interrupted and finishes in the background unused.
+    """
+
+    def __init__(
+        self,
+        monte_carlo: MonteCarloAnalyzer,
+        predict_matches: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        config: EnsembleConfig = None
+    ):
+        self.monte_carlo = monte_carlo
+        self.predict_matches = predict_matches
+        self.config = config or EnsembleConfig()
+
+    async def predict(
+        self,
+        matches: List[Dict[str, Any]],
+        stake: float,
+        prediction_type: str = "ensemble",
+        monte_carlo: Optional[MonteCarloAnalyzer] = None,
+        allowed_components: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Args:
+            monte_carlo: Analyzer to use instead of the default one (e.g. a
+                reduced-fidelity copy)
+            allowed_components: Components permitted to run; requested ones
+                outside this set are reported as "shed"
+
+        Returns:
+            Dictionary with the Monte Carlo slip results (or None), blended
+            per-match probabilities, raw ML output and component statuses
+        """
+        loop = asyncio.get_running_loop()
+        monte_carlo = monte_carlo or self.monte_carlo
+        prediction_type = getattr(prediction_type, "value", prediction_type)
+        requested = COMPONENTS_BY_TYPE.get(prediction_type, COMPONENTS_BY_TYPE["ensemble"])
+        if allowed_components is not None:
+            shed = [name for name in requested if name not in allowed_components]
+            requested = tuple(name for name in requested if name in allowed_components)
+        else:
+            shed = []
+
+        runners = {
+            "monte_carlo": lambda: loop.run_in_executor(
+                None, monte_carlo.simulate_slip, matches, stake
+            ),
+            "machine_learning": lambda: self.predict_matches(matches),
+            "form_h2h": lambda: loop.run_in_executor(
+                None, lambda: [form_h2h_probabilities(m, self.config.base_draw_rate) for m in matches]
+            ),
+        }
+        outcomes = await asyncio.gather(*[
+            self._run_component(name, runners[name]) for name in requested
+        ])
+        components = dict(zip(requested, outcomes))
+        components.update({name: {"status": "shed", "elapsed": 0.0, "result": None} for name in shed})
+
+        mc_results = components.get("monte_carlo", {}).get("result")
+        ml_output = components.get("machine_learning", {}).get("result")
+        estimates = {
+            "monte_carlo": [r["probabilities"] for r in mc_results["match_results"]] if mc_results else None,
+            "machine_learning": self._ml_estimates(ml_output, matches),
+            "form_h2h": components.get("form_h2h", {}).get("result"),
+        }
+
+        return {
+            "slip": mc_results,
+            "ml_predictions": ml_output,
+            "match_probabilities": self._blend(matches, estimates),
+            "components": {
+                name: {k: v for k, v in outcome.items() if k != "result"}
+                for name, outcome in components.items()
+            },
+            "degraded": any(outcome["status"] != "ok" for outcome in components.values()),
+        }
+
+    async def _run_component(self, name: str, runner: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        deadline = self.config.deadlines.get(name)
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(runner(), timeout=deadline)
+            return {"status": "ok", "elapsed": time.perf_counter() - start, "result": result}
+        except asyncio.TimeoutError:
+            logger.warning(f"Ensemble component {name} missed its {deadline}s deadline")
+            return {"status": "timeout", "elapsed": time.perf_counter() - start, "result": None}
+        except Exception as e:
+            logger.error(f"Ensemble component {name} failed: {e}")
+            return {"status": "error", "elapsed": time.perf_counter() - start, "result": None, "error": str(e)}
+
+    def _ml_estimates(self, output: Any, matches: List[Dict[str, Any]]) -> Optional[List[Optional[Dict[str, float]]]]:
+        """Align predictor output (list or dict keyed by match_id) to matches"""
+        if output is None:
+            return None
+        if isinstance(output, dict):
+            return [_as_probabilities(output.get(m.get("match_id"))) for m in matches]
+        output = list(output)
+        if len(output) != len(matches):
+            return None
+        return [_as_probabilities(p) for p in output]
+
+    def _blend(
+        self,
+        matches: List[Dict[str, Any]],
+        estimates: Dict[str, Optional[List[Optional[Dict[str, float]]]]]
+    ) -> Dict[str, Dict[str, Any]]:
+        blended = {}
+        for index, match in enumerate(matches):
+            available = {
+                name: per_match[index]
+                for name, per_match in estimates.items()
+                if per_match is not None and per_match[index] is not None
+            }
+            if not available:
+                continue
+            weights = {name: self.config.weights.get(name, 1.0) for name in available}
+            total_weight = sum(weights.values())
+            probabilities = {
+                k: sum(weights[name] * probs[k] for name, probs in available.items()) / total_weight
+                for k in OUTCOMES
+            }
+            blended[match.get("match_id", str(index))] = {
+                **probabilities,
+                "components": sorted(available),
+            }
+        return blended
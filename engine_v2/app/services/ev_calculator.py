@@ -0,0 +1,160 @@
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class EVConfig:
+    risk_aversion: float = 0.1  # mean-variance penalty on the return (per unit stake)
+    strong_sharpe: float = 0.15
+    low_hit_probability: float = 0.05
+    high_confidence_probability: float = 0.5
+    max_legs: int = 6
+
+# (mask name, message) in the order recommendations are reported
+RECOMMENDATIONS = (
+    ("positive_ev", "Positive expected value - slip is priced in your favour"),
+    ("negative_ev", "Negative expected value - consider removing the weakest legs"),
+    ("strong_sharpe", "Strong risk-adjusted value"),
+    ("low_hit", "Low hit probability - expect long losing runs"),
+    ("high_confidence", "High probability of landing"),
+    ("too_many_legs", "Many legs compound the bookmaker margin - consider splitting the slip"),
+)
+
+def slip_arrays(slips: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pack simulated slips into padded (slips x legs) odds/probability arrays
+
+    Missing legs are padded with odds 1.0 and probability 1.0, which leave the
+    accumulator's total odds and hit probability unchanged; the leg mask marks
+    the real legs, so a leg priced at 1.0 still counts.
+
+    Returns:
+        (odds, probabilities, stakes, legs)
+    """
+    num_slips = len(slips)
+    num_legs = max((len(s.get("match_results", [])) for s in slips), default=0)
+    odds = np.ones((num_slips, num_legs))
+    probabilities = np.ones((num_slips, num_legs))
+    legs_mask = np.zeros((num_slips, num_legs), dtype=bool)
+    stakes = np.array([float(s.get("stake", 1.0)) for s in slips])
+
+    for i, slip in enumerate(slips):
+        legs = slip.get("match_results", [])
+        odds[i, :len(legs)] = [leg["market_odds"] for leg in legs]
+        probabilities[i, :len(legs)] = [leg["probabilities"]["home_win"] for leg in legs]
+        legs_mask[i, :len(legs)] = True
+
+    return odds, probabilities, stakes, legs_mask
+
+class EVCalculator:
+    """
+    Expected value and risk metrics for accumulator slips
+
+    A slip pays stake * total_odds if every leg lands (legs treated as
+    independent) and loses the stake otherwise, so its return is a scaled
+    Bernoulli variable and all metrics have closed forms.
+    """
+
+    def __init__(self, config: EVConfig = None):
+        self.config = config or EVConfig()
+
+    def analyze_slip(self, slip: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze a single simulated slip"""
+        analysis = self.analyze_slips(*slip_arrays([slip]))
+        return {
+            "expected_value": float(analysis["expected_value"][0]),
+            "variance": float(analysis["variance"][0]),
+            "sharpe_ratio": float(analysis["sharpe_ratio"][0]),
+            "risk_adjusted_return": float(analysis["risk_adjusted_return"][0]),
+            "win_probability": float(analysis["win_probability"][0]),
+            "recommendations": analysis["recommendations"][0],
+        }
+
+    def analyze_slips(
+        self,
+        odds: np.ndarray,
+        probabilities: Optional[np.ndarray] = None,
+        stakes: Any = 1.0,
+        legs: Optional[np.ndarray] = None,
+        hits: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze many slips in one vectorized pass
+
+        Args:
+            odds: Total odds per slip (S,) or per-leg odds (S, legs)
+            probabilities: Hit probability per slip (S,) or per leg (S, legs)
+            stakes: Stake per slip (S,) or a scalar
+            legs: Optional (S, legs) mask of real legs in padded per-leg
+                arrays; without it every column counts as a leg
+            hits: Optional simulated slip outcomes (S, iterations) used instead
+                of probabilities
+
+        Returns:
+            Dictionary of (S,) arrays plus a list of recommendations per slip
+        """
+        try:
+            odds = np.asarray(odds, dtype=np.float64)
+            total_odds = odds.prod(axis=1) if odds.ndim == 2 else odds
+
+            if hits is not None:
+                win_probability = np.asarray(hits, dtype=np.float64).mean(axis=1)
+            else:
+                probabilities = np.asarray(probabilities, dtype=np.float64)
+                win_probability = probabilities.prod(axis=1) if probabilities.ndim == 2 else probabilities
+
+            stakes = np.broadcast_to(np.asarray(stakes, dtype=np.float64), total_odds.shape)
+            if legs is not None:
+                num_legs = np.count_nonzero(legs, axis=1)
+            elif odds.ndim == 2:
+                num_legs = np.full(total_odds.shape, odds.shape[1])
+            else:
+                num_legs = np.ones(total_odds.shape, dtype=np.int64)
+
+            # Return per unit stake is odds - 1 with probability p, else -1
+            expected_return = win_probability * total_odds - 1
+            return_variance = total_odds ** 2 * win_probability * (1 - win_probability)
+            return_std = np.sqrt(return_variance)
+
+            expected_value = stakes * expected_return
+            variance = stakes ** 2 * return_variance
+            sharpe_ratio = np.divide(
+                expected_return, return_std,
+                out=np.zeros_like(expected_return), where=return_std > 0
+            )
+            risk_adjusted_return = expected_return - 0.5 * self.config.risk_aversion * return_variance
+
+            masks = {
+                "positive_ev": expected_value > 0,
+                "negative_ev": expected_value < 0,
+                "strong_sharpe": sharpe_ratio >= self.config.strong_sharpe,
+                "low_hit": win_probability < self.config.low_hit_probability,
+                "high_confidence": win_probability >= self.config.high_confidence_probability,
+                "too_many_legs": num_legs > self.config.max_legs,
+            }
+
+            return {
+                "total_odds": total_odds,
+                "win_probability": win_probability,
+                "expected_value": expected_value,
+                "variance": variance,
+                "std_deviation": np.sqrt(variance),
+                "sharpe_ratio": sharpe_ratio,
+                "risk_adjusted_return": risk_adjusted_return,
+                "recommendations": self._recommendations(masks, total_odds.shape[0]),
+            }
+
+        except Exception as e:
+            logger.error(f"Error analyzing slips: {e}")
+            raise
+
+    def _recommendations(self, masks: Dict[str, np.ndarray], num_slips: int) -> List[List[str]]:
+        """Turn the (slips x rules) threshold matrix into message lists"""
+        matrix = np.column_stack([masks[name] for name, _ in RECOMMENDATIONS]) if num_slips else np.zeros((0, 0), bool)
+        recommendations: List[List[str]] = [[] for _ in range(num_slips)]
+        for slip_index, rule_index in zip(*np.nonzero(matrix)):
+            recommendations[slip_index].append(RECOMMENDATIONS[rule_index][1])
+        return recommendations
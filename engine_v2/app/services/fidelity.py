@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ensemble components kept at every fidelity level vs. shed under pressure
+ESSENTIAL_COMPONENTS = ("monte_carlo", "form_h2h")
+ALL_COMPONENTS = ("monte_carlo", "machine_learning", "form_h2h")
+
+@dataclass
+class FidelityConfig:
+    max_simulations: int = 10000
+    min_simulations: int = 2000  # quality floor for the Monte Carlo draws
+    max_alternatives: int = 10
+    min_alternatives: int = 3
+    shed_components_below: float = 0.5  # level under which optional components are skipped
+    # (target, limit) per signal: no pressure at target, full pressure at limit
+    loop_lag: Tuple[float, float] = (0.02, 0.25)  # seconds
+    queue_depth: Tuple[float, float] = (2, 20)  # analyses in flight
+    cpu_load: Tuple[float, float] = (0.7, 1.0)  # 1-minute load average per core
+    sample_interval: float = 0.5
+    smoothing: float = 0.3  # EWMA weight of the newest sample
+
+@dataclass
+class Fidelity:
+    """Settings one request runs at"""
+    level: float
+    simulations: int
+    num_alternatives: int
+    components: Tuple[str, ...]
+    signals: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "components": list(self.components)}
+
+def _cpu_load() -> float:
+    """1-minute load average per core; 0 where the platform has none"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+def _scaled(value: float, bounds: Tuple[float, float]) -> float:
+    """Pressure in [0, 1]: 0 at or below target, 1 at or above limit"""
+    target, limit = bounds
+    return min(1.0, max(0.0, (value - target) / (limit - target)))
+
+class FidelityController:
+    """
+    Scale simulation work down as the service comes under load
+
+    A background sampler measures event-loop lag (how late a sleep wakes up)
+    and CPU load; queue depth is the number of analyses currently in flight
+    plus any extra queue reported by queue_depth_fn. queue_depth_fn may block
+    (e.g. a job table count), so the sampler calls it in the default executor
+    and requests only read the cached value. Each signal is mapped to
+    a pressure in [0, 1] between its target and limit, the worst one is
+    smoothed, and the fidelity level is 1 - pressure. Levels interpolate
+    iteration and alternative counts between the configured floor and
+    ceiling, and below shed_components_below the optional ensemble
+    components are skipped.
+    """
+
+    def __init__(
+        self,
+        config: FidelityConfig = None,
+        queue_depth_fn: Optional[Callable[[], int]] = None,
+        cpu_load_fn: Callable[[], float] = _cpu_load
+    ):
+        self.config = config or FidelityConfig()
+        self.queue_depth_fn = queue_depth_fn
+        self.cpu_load_fn = cpu_load_fn
+        self.in_flight = 0
+        self._extra_queue = 0
+        self._loop_lag = 0.0
+        self._cpu = 0.0
+        self._pressure = 0.0
+        self._sampler: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._sampler is None:
+            self._sampler = asyncio.create_task(self._sample_loop())
+
+    async def stop(self) -> None:
+        if self._sampler is not None:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except asyncio.CancelledError:
+                pass
+            self._sampler = None
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count a request as in flight for the queue-depth signal"""
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    async def _sample_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        interval = self.config.sample_interval
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - start - interval)
+            if self.queue_depth_fn is not None:
+                try:
+                    self._extra_queue = await loop.run_in_executor(None, self.queue_depth_fn)
+                except Exception as e:
+                    logger.warning(f"Queue depth sample failed: {e}")
+            self.record_sample(lag, self.cpu_load_fn())
+
+    def record_sample(self, loop_lag: float, cpu_load: float) -> None:
+        """Fold one lag/CPU measurement into the smoothed pressure"""
+        self._loop_lag = loop_lag
+        self._cpu = cpu_load
+        alpha = self.config.smoothing
+        self._pressure = alpha * self._signal_pressure() + (1 - alpha) * self._pressure
+
+    def queue_depth(self) -> int:
+        """In-flight analyses plus the extra queue from the last sample"""
+        return self.in_flight + self._extra_queue
+
+    def _signal_pressure(self) -> float:
+        return max(
+            _scaled(self._loop_lag, self.config.loop_lag),
+            _scaled(self.queue_depth(), self.config.queue_depth),
+            _scaled(self._cpu, self.config.cpu_load),
+        )
+
+    def current(self) -> Fidelity:
+        """Fidelity for a request starting now"""
+        cfg = self.config
+        # In-flight count reacts immediately; everything else comes from the sampler
+        queue_depth = self.queue_depth()
+        pressure = max(self._pressure, _scaled(queue_depth, cfg.queue_depth))
+        level = 1.0 - pressure
+
+        simulations = cfg.min_simulations + (cfg.max_simulations - cfg.min_simulations) * level
+        alternatives = cfg.min_alternatives + (cfg.max_alternatives - cfg.min_alternatives) * level
+        components = ALL_COMPONENTS if level >= cfg.shed_components_below else ESSENTIAL_COMPONENTS
+
+        return Fidelity(
+            level=round(level, 3),
+            simulations=max(cfg.min_simulations, int(round(simulations, -2))),
+            num_alternatives=int(round(alternatives)),
+            components=components,
+            signals={
+                "loop_lag": self._loop_lag,
+                "queue_depth": queue_depth,
+                "cpu_load": self._cpu,
+            },
+        )
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from app.services.job_store import FINISHED_STATES
+
+logger = logging.getLogger(__name__)
+
+class _JobTail:
+    """Events of one job read so far, and the task reading more"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.updated = asyncio.Event()
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        # Wake everyone waiting on the current event and start a fresh one
+        updated, self.updated = self.updated, asyncio.Event()
+        updated.set()
+
+class JobEventFeed:
+    """
+    Fan a job's event log out to any number of stream clients
+
+    Each job with at least one subscriber has a single tail polling the
+    store for events it has not read yet; subscribers replay what the tail
+    has collected and then wait for it, so the number of store reads does
+    not grow with the number of clients. The tail stops at the job's
+    terminal event, or as soon as its last subscriber leaves.
+    """
+
+    def __init__(self, fetch: Callable[[str, int], List[Dict[str, Any]]], poll_interval: float = 0.25):
+        self._fetch = fetch  # blocking events_since(job_id, after_seq)
+        self.poll_interval = poll_interval
+        self._tails: Dict[str, _JobTail] = {}
+
+    async def subscribe(self, job_id: str, after_seq: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Events of a job with seq above after_seq, ending with its terminal event"""
+        tail = self._tails.get(job_id)
+        if tail is None:
+            tail = self._tails[job_id] = _JobTail()
+            tail.task = asyncio.ensure_future(self._poll(job_id, tail))
+        tail.subscribers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(tail.events):
+                    event = tail.events[index]
+                    index += 1
+                    if event["seq"] > after_seq:
+                        yield event
+                    if event["event"] in FINISHED_STATES:
+                        return
+                if tail.error is not None:
+                    raise tail.error
+                await tail.updated.wait()
+        finally:
+            tail.subscribers -= 1
+            if tail.subscribers == 0:
+                tail.task.cancel()
+                if self._tails.get(job_id) is tail:
+                    del self._tails[job_id]
+
+    async def _poll(self, job_id: str, tail: _JobTail) -> None:
+        loop = asyncio.get_running_loop()
+        after_seq = 0
+        try:
+            while True:
+                events = await loop.run_in_executor(None, self._fetch, job_id, after_seq)
+                if events:
+                    tail.events.extend(events)
+                    after_seq = events[-1]["seq"]
+                    tail.notify()
+                    if any(event["event"] in FINISHED_STATES for event in events):
+                        return
+                await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Event tail for job {job_id} failed: {e}")
+            tail.error = e
+            tail.notify()
+
+    def tailing(self) -> int:
+        return len(self._tails)
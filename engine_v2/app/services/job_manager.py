@@ -0,0 +1,189 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, Optional, Set
+
+from app.services.job_store import JobStore
+from app.tasks.simulation_tasks import process_simulation_task
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> task executed in the worker pool as
+# task(job_id, db_path, ttl, claim_token, heartbeat_interval)
+TASKS = {
+    "batch_simulation": process_simulation_task,
+}
+
+@dataclass
+class JobConfig:
+    db_path: str = field(default_factory=lambda: os.getenv("JOB_DB_PATH", "data/jobs.sqlite3"))
+    max_workers: int = field(default_factory=lambda: int(os.getenv("JOB_WORKERS", "2")))
+    poll_interval: float = 0.5  # seconds between queue checks when idle
+    result_ttl_seconds: float = 24 * 3600
+    cleanup_interval: float = 300
+    stale_after_seconds: float = 120  # running jobs silent this long are requeued
+    heartbeat_interval: float = 15  # how often workers refresh a running job
+    max_attempts: int = 3  # runs that kill their worker this often are failed
+
+class JobManager:
+    """
+    Durable background job runner
+
+    Jobs are persisted in a JobStore and executed in a dedicated process pool,
+    so long batch analyses neither block the API event loop nor compete with
+    interactive requests for its CPU, and queued or interrupted jobs are picked
+    up again after a restart. Store calls made from the event loop run on a
+    single dedicated thread, which keeps one SQLite connection open.
+    """
+
+    def __init__(self, config: JobConfig = None):
+        self.config = config or JobConfig()
+        self._store: Optional[JobStore] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._active: Set[asyncio.Future] = set()
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-store")
+        self._last_cleanup = 0.0
+
+    @property
+    def store(self) -> JobStore:
+        # Opened on first use so importing the module never touches the disk
+        if self._store is None:
+            self._store = JobStore(self.config.db_path)
+        return self._store
+
+    async def start(self) -> None:
+        """Start the worker pool and the dispatcher loop"""
+        if self._dispatcher is not None:
+            return
+        self._pool = ProcessPoolExecutor(max_workers=self.config.max_workers)
+        self._wakeup = asyncio.Event()
+        requeued = await self._call(self.store.requeue_stale, self.config.stale_after_seconds)
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted jobs")
+        self._dispatcher = asyncio.create_task(self._dispatch_loop())
+        logger.info(f"Job manager started with {self.config.max_workers} workers")
+
+    async def stop(self) -> None:
+        """Stop dispatching; running jobs are left to be requeued on next start"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking store call on the store thread"""
+        return await asyncio.get_running_loop().run_in_executor(self._io, functools.partial(fn, *args))
+
+    async def submit(self, kind: str, payload: Dict[str, Any], master_slip_id: Optional[str] = None) -> str:
+        """Persist a job and wake the dispatcher"""
+        if kind not in TASKS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = await self._call(self.store.create_job, kind, payload, master_slip_id)
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self.store.get_job, job_id)
+
+    async def latest_for_master_slip(self, master_slip_id: str) -> Optional[Dict[str, Any]]:
+        return await self._call(self.store.latest_for_master_slip, master_slip_id)
+
+    async def cancel(self, job_id: str) -> Optional[str]:
+        return await self._call(self.store.request_cancel, job_id, self.config.result_ttl_seconds)
+
+    async def queue_depth(self) -> int:
+        return await self._call(self.store.queue_depth)
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                while len(self._active) < self.config.max_workers:
+                    claimed = await self._call(self.store.claim)
+                    if claimed is None:
+                        break
+                    await self._launch(loop, claimed)
+
+                if time.time() - self._last_cleanup > self.config.cleanup_interval:
+                    await self._call(self._housekeeping)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job dispatcher error: {e}", exc_info=True)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.config.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _launch(self, loop: asyncio.AbstractEventLoop, claimed: Dict[str, Any]) -> None:
+        job_id, kind, claim_token = claimed["job_id"], claimed["kind"], claimed["claim_token"]
+        task = TASKS[kind]
+        pool = self._pool
+        try:
+            future = loop.run_in_executor(
+                pool, task, job_id, self.config.db_path, self.config.result_ttl_seconds,
+                claim_token, self.config.heartbeat_interval
+            )
+        except Exception as e:
+            # The run never started, so the job goes back without using up an attempt
+            logger.error(f"Could not dispatch job {job_id}: {e}")
+            self._replace_pool(pool)
+            await self._call(self.store.release, job_id, claim_token, False)
+            self._wakeup.set()
+            return
+        self._active.add(future)
+
+        def _done(fut: asyncio.Future) -> None:
+            self._active.discard(fut)
+            self._wakeup.set()
+            if fut.cancelled() or fut.exception() is None:
+                return
+            error = fut.exception()
+            if isinstance(error, BrokenProcessPool):
+                # A worker died, taking every run in the pool with it. Any of
+                # them may have caused it, so each is retried until it has
+                # used up its attempts.
+                self._replace_pool(pool)
+                if claimed["attempt"] < self.config.max_attempts:
+                    logger.warning(f"Worker died under job {job_id}, requeueing it")
+                    self._io.submit(self.store.release, job_id, claim_token)
+                    return
+            logger.error(f"Job {job_id} crashed its worker: {error}")
+            self._io.submit(self.store.fail, job_id, str(error), self.config.result_ttl_seconds, claim_token)
+
+        future.add_done_callback(_done)
+        logger.info(f"Dispatched {kind} job {job_id}")
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Swap in a fresh worker pool once the current one is unusable"""
+        if self._pool is not broken or self._pool is None:
+            return
+        broken.shutdown(wait=False, cancel_futures=True)
+        self._pool = ProcessPoolExecutor(max_workers=self.config.max_workers)
+        logger.warning("Worker pool broke, started a new one")
+
+    def _housekeeping(self) -> None:
+        self._last_cleanup = time.time()
+        purged = self.store.purge_expired()
+        requeued = self.store.requeue_stale(self.config.stale_after_seconds)
+        if purged or requeued:
+            logger.info(f"Job cleanup: purged {purged} expired, requeued {requeued} stale")
+
+# Process-wide instance used by the API routers
+job_manager = JobManager()
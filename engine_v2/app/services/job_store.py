@@ -0,0 +1,426 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    master_slip_id TEXT,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    claim_token TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_master_slip ON jobs (master_slip_id, created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    event TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_events_job_seq ON job_events (job_id, seq);
+"""
+
+class JobStore:
+    """
+    Durable job table backed by a local SQLite file
+
+    Each thread keeps one connection to the file, so the store can be shared
+    by the API process and the worker processes that run the jobs. Every
+    claim of a job gets a fresh claim token; a worker's writes only apply
+    while the job is still running under its token, so a run that was
+    requeued and superseded cannot overwrite the newer run's result.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # WAL is a property of the database file, set once
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = getattr(self._local, "conn", None)
+        # A forked worker must not reuse its parent's connection
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+    def close(self) -> None:
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    def create_job(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        master_slip_id: Optional[str] = None
+    ) -> str:
+        """Persist a new queued job and return its id"""
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, master_slip_id, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, master_slip_id, QUEUED, json.dumps(payload, default=str), now, now),
+            )
+        return job_id
+
+    def get_job(self, job_id: str, include_payload: bool = False) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row, include_payload) if row else None
+
+    def latest_for_master_slip(self, master_slip_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE master_slip_id = ? ORDER BY created_at DESC LIMIT 1",
+                (master_slip_id,),
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically move the oldest queued job to running; safe across processes
+
+        Claiming a job that ran before (it was requeued) records a "restarted"
+        event, so stream clients discard the partial results of the old run.
+
+        Returns:
+            job_id, kind, attempt and the claim_token the run must present, or None
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT job_id, kind, attempts FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                claim_token = uuid.uuid4().hex
+                attempt = row["attempts"] + 1
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, claim_token = ?, attempts = ?, updated_at = ? WHERE job_id = ?",
+                    (RUNNING, claim_token, attempt, now, row["job_id"]),
+                )
+                if attempt > 1:
+                    conn.execute(
+                        "INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                        (row["job_id"], "restarted", json.dumps({"attempt": attempt}), now),
+                    )
+                conn.execute("COMMIT")
+                return {"job_id": row["job_id"], "kind": row["kind"], "attempt": attempt, "claim_token": claim_token}
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def release(self, job_id: str, claim_token: str, count_attempt: bool = True) -> bool:
+        """
+        Hand a claimed job back to the queue
+
+        Used when its run never finished through no fault of its own, e.g. the
+        worker pool broke. With count_attempt=False the claim is not counted,
+        for runs that never started.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, progress = 0, claim_token = NULL, updated_at = ?, "
+                "attempts = CASE WHEN ? THEN attempts ELSE attempts - 1 END "
+                "WHERE job_id = ? AND status = ? AND claim_token = ?",
+                (QUEUED, time.time(), count_attempt, job_id, RUNNING, claim_token),
+            )
+            return cursor.rowcount == 1
+
+    def claim_next(self) -> Optional[str]:
+        """claim(), returning only the job id"""
+        claimed = self.claim()
+        return claimed["job_id"] if claimed else None
+
+    def claim_token(self, job_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT claim_token FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["claim_token"] if row else None
+
+    def heartbeat(self, job_id: str, claim_token: str) -> bool:
+        """Refresh a running job's updated_at; False once the claim is no longer held"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE job_id = ? AND status = ? AND claim_token = ?",
+                (time.time(), job_id, RUNNING, claim_token),
+            )
+            return cursor.rowcount == 1
+
+    def queue_depth(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+
+    def update_progress(self, job_id: str, progress: float, claim_token: Optional[str] = None) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE job_id = ? AND status = ? "
+                "AND (? IS NULL OR claim_token = ?)",
+                (progress, time.time(), job_id, RUNNING, claim_token, claim_token),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, result: Dict[str, Any], ttl_seconds: float,
+                 claim_token: Optional[str] = None) -> bool:
+        return self._finish(job_id, COMPLETED, ttl_seconds, claim_token, result=json.dumps(result, default=str))
+
+    def fail(self, job_id: str, error: str, ttl_seconds: float, claim_token: Optional[str] = None) -> bool:
+        return self._finish(job_id, FAILED, ttl_seconds, claim_token, error=error)
+
+    def mark_cancelled(self, job_id: str, ttl_seconds: float, claim_token: Optional[str] = None) -> bool:
+        return self._finish(job_id, CANCELLED, ttl_seconds, claim_token)
+
+    def append_event(self, job_id: str, event: str, data: Dict[str, Any],
+                     claim_token: Optional[str] = None) -> Optional[int]:
+        """
+        Record a progress event for streaming clients
+
+        With a claim_token the event is only recorded while that run still
+        holds the job.
+
+        Returns:
+            The event's sequence number, or None if it was not recorded
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO job_events (job_id, event, data, created_at) "
+                "SELECT ?, ?, ?, ? WHERE ? IS NULL OR EXISTS "
+                "(SELECT 1 FROM jobs WHERE job_id = ? AND status = ? AND claim_token = ?)",
+                (job_id, event, json.dumps(data, default=str), time.time(),
+                 claim_token, job_id, RUNNING, claim_token),
+            )
+            return cursor.lastrowid if cursor.rowcount == 1 else None
+
+    def events_since(self, job_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        """Events of a job with a sequence number above after_seq, oldest first"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, event, data, created_at FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after_seq),
+            ).fetchall()
+        return [
+            {
+                "seq": row["seq"],
+                "event": row["event"],
+                "data": json.loads(row["data"]),
+                "created_at": row["created_at"],
+            }
+            for row in rows
+        ]
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        ttl_seconds: float,
+        claim_token: Optional[str] = None,
+        result: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        """
+        Move a running job to a final status and record the terminal event
+
+        Only applies while the job is running (under claim_token, if given),
+        so a superseded or already finished run changes nothing.
+
+        Returns:
+            Whether this call finished the job
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, progress = CASE WHEN ? = ? THEN 1 ELSE progress END, "
+                "updated_at = ?, expires_at = ? WHERE job_id = ? AND status = ? AND (? IS NULL OR claim_token = ?)",
+                (status, result, error, status, COMPLETED, now, now + ttl_seconds,
+                 job_id, RUNNING, claim_token, claim_token),
+            )
+            finished = cursor.rowcount == 1
+            if finished:
+                conn.execute(
+                    "INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, status, result or json.dumps({"error": error}), now),
+                )
+            conn.execute("COMMIT")
+        if not finished:
+            logger.warning(f"Job {job_id} no longer held by this run; {status} not recorded")
+        return finished
+
+    def request_cancel(self, job_id: str, ttl_seconds: float) -> Optional[str]:
+        """
+        Cancel a job; queued jobs stop immediately, running jobs at their next check
+
+        Returns:
+            The job status after the request, or None if the job does not exist
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            status = row["status"]
+            if status == QUEUED:
+                status = CANCELLED
+                conn.execute(
+                    "UPDATE jobs SET status = ?, cancel_requested = 1, updated_at = ?, expires_at = ? WHERE job_id = ?",
+                    (CANCELLED, now, now + ttl_seconds, job_id),
+                )
+                conn.execute(
+                    "INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, CANCELLED, json.dumps({"error": None}), now),
+                )
+            elif status == RUNNING:
+                conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE job_id = ?",
+                    (now, job_id),
+                )
+            conn.execute("COMMIT")
+            return status
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def requeue_stale(self, stale_after_seconds: float) -> int:
+        """
+        Put running jobs whose worker stopped reporting back in the queue
+
+        Workers heartbeat updated_at while they run, so a job that has been
+        silent for stale_after_seconds belonged to a process that died (e.g.
+        an API restart). Its claim token is cleared, so the old run can no
+        longer write to it.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, progress = 0, claim_token = NULL, updated_at = ? "
+                "WHERE status = ? AND updated_at < ?",
+                (QUEUED, now, RUNNING, now - stale_after_seconds),
+            )
+            return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs whose TTL has passed, along with their events"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM job_events WHERE job_id IN "
+                "(SELECT job_id FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?)",
+                (now,),
+            )
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (now,),
+            )
+            return cursor.rowcount
+
+    def _to_dict(self, row: sqlite3.Row, include_payload: bool = False) -> Dict[str, Any]:
+        job = {
+            "job_id": row["job_id"],
+            "kind": row["kind"],
+            "master_slip_id": row["master_slip_id"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "attempts": row["attempts"],
+            "cancel_requested": bool(row["cancel_requested"]),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "expires_at": row["expires_at"],
+        }
+        if include_payload:
+            job["payload"] = json.loads(row["payload"])
+        return job
+
+class JobHeartbeat:
+    """
+    Keep a running job's updated_at fresh from a background thread
+
+    Long steps (one match can take longer than the stale timeout) then do not
+    get the job requeued under a live worker. lost turns True when the claim
+    is no longer held, e.g. the job was requeued after all.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, claim_token: str, interval: float):
+        self.store = store
+        self.job_id = job_id
+        self.claim_token = claim_token
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def __enter__(self) -> "JobHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.wait(self.interval):
+                if not self.store.heartbeat(self.job_id, self.claim_token):
+                    self.lost = True
+                    return
+        except Exception as e:
+            logger.error(f"Heartbeat for job {self.job_id} failed: {e}")
+        finally:
+            self.store.close()
@@ -0,0 +1,149 @@
+import numpy as np
+from typing import Dict, Iterable, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Default lines reported by derive_markets
+TOTAL_GOALS_LINES = (0.5, 1.5, 2.5, 3.5, 4.5)
+ASIAN_HANDICAP_LINES = (-2.0, -1.5, -1.0, -0.75, -0.5, -0.25, 0.0, 0.25, 0.5, 1.0, 1.5)
+CORRECT_SCORE_TOP = 10
+
+def scoreline_histogram(
+    home_goals: np.ndarray,
+    away_goals: np.ndarray,
+    max_goals: Optional[int] = None
+) -> np.ndarray:
+    """
+    Count simulated scorelines with a single bincount
+
+    Each result is encoded as home * K + away. With max_goals=None, K is sized
+    to the largest score seen so the histogram is exact; otherwise goals above
+    max_goals are folded into the last bucket.
+
+    Returns:
+        (K, K) int64 array, rows = home goals, columns = away goals
+    """
+    home = np.asarray(home_goals).astype(np.int64, copy=False)
+    away = np.asarray(away_goals).astype(np.int64, copy=False)
+    if max_goals is None:
+        max_goals = int(max(home.max(initial=0), away.max(initial=0)))
+    else:
+        home = np.minimum(home, max_goals)
+        away = np.minimum(away, max_goals)
+    size = max_goals + 1
+    counts = np.bincount(home * size + away, minlength=size * size)
+    return counts.reshape(size, size)
+
+def fold_histogram(histogram: np.ndarray, max_goals: int) -> np.ndarray:
+    """Fold scores above max_goals into the last row/column"""
+    size = histogram.shape[0]
+    if size <= max_goals + 1:
+        padded = np.zeros((max_goals + 1, max_goals + 1), dtype=histogram.dtype)
+        padded[:size, :size] = histogram
+        return padded
+    index = np.minimum(np.arange(size), max_goals)
+    folded = np.zeros((max_goals + 1, max_goals + 1), dtype=histogram.dtype)
+    np.add.at(folded, (index[:, None], index[None, :]), histogram)
+    return folded
+
+def _normalise(histogram: np.ndarray) -> np.ndarray:
+    total = histogram.sum()
+    if total <= 0:
+        raise ValueError("Scoreline histogram is empty")
+    return histogram / total
+
+def outcome_counts(histogram: np.ndarray) -> Dict[str, float]:
+    """Home win / draw / away win mass (below, on and above the diagonal)"""
+    return {
+        "home_win": np.tril(histogram, -1).sum(),
+        "draw": np.trace(histogram),
+        "away_win": np.triu(histogram, 1).sum(),
+    }
+
+def goal_sums(histogram: np.ndarray) -> Dict[str, float]:
+    """Total home and away goals represented by the histogram"""
+    goals = np.arange(histogram.shape[0])
+    return {
+        "home": float(goals @ histogram.sum(axis=1)),
+        "away": float(goals @ histogram.sum(axis=0)),
+    }
+
+def _difference_distribution(probs: np.ndarray) -> np.ndarray:
+    """P(home - away = d) indexed by d + K - 1"""
+    size = probs.shape[0]
+    goals = np.arange(size)
+    diff = (goals[:, None] - goals[None, :]).ravel() + size - 1
+    return np.bincount(diff, weights=probs.ravel(), minlength=2 * size - 1)
+
+def total_goals_distribution(probs: np.ndarray) -> np.ndarray:
+    """P(home + away = t) indexed by t"""
+    size = probs.shape[0]
+    goals = np.arange(size)
+    totals = (goals[:, None] + goals[None, :]).ravel()
+    return np.bincount(totals, weights=probs.ravel(), minlength=2 * size - 1)
+
+def over_under(probs: np.ndarray, lines: Iterable[float] = TOTAL_GOALS_LINES) -> Dict[str, Dict[str, float]]:
+    """Over/under probabilities per total-goals line (push mass on whole lines)"""
+    distribution = total_goals_distribution(probs)
+    totals = np.arange(distribution.size)
+    markets = {}
+    for line in lines:
+        over = float(distribution[totals > line].sum())
+        under = float(distribution[totals < line].sum())
+        markets[f"{line:g}"] = {"over": over, "under": under, "push": max(0.0, 1.0 - over - under)}
+    return markets
+
+def both_teams_to_score(probs: np.ndarray) -> Dict[str, float]:
+    yes = float(probs[1:, 1:].sum())
+    return {"yes": yes, "no": 1.0 - yes}
+
+def correct_score(probs: np.ndarray, top: Optional[int] = CORRECT_SCORE_TOP) -> Dict[str, float]:
+    """Most likely scorelines as 'home-away' -> probability"""
+    flat = probs.ravel()
+    order = np.argsort(flat, kind="stable")[::-1]
+    if top is not None:
+        order = order[:top]
+    size = probs.shape[1]
+    return {f"{i // size}-{i % size}": float(flat[i]) for i in order if flat[i] > 0}
+
+def asian_handicap(probs: np.ndarray, lines: Iterable[float] = ASIAN_HANDICAP_LINES) -> Dict[str, Dict[str, float]]:
+    """
+    Home-side Asian handicap settlement probabilities
+
+    Quarter lines split the stake across the two neighbouring half/whole
+    lines, so each half carries half the probability mass: "win"/"loss"
+    include half-wins/half-losses at weight 0.5 and "push" the refunded part.
+    """
+    distribution = _difference_distribution(probs)
+    size = probs.shape[0]
+    margins = np.arange(distribution.size) - (size - 1)
+
+    def settle(line: float) -> np.ndarray:
+        adjusted = margins + line
+        return np.array([
+            distribution[adjusted > 0].sum(),
+            distribution[adjusted == 0].sum(),
+            distribution[adjusted < 0].sum(),
+        ])
+
+    markets = {}
+    for line in lines:
+        if (line * 4) % 2 == 1:
+            settled = (settle(line - 0.25) + settle(line + 0.25)) / 2
+        else:
+            settled = settle(line)
+        markets[f"{line:+g}"] = {"win": float(settled[0]), "push": float(settled[1]), "loss": float(settled[2])}
+    return markets
+
+def derive_markets(histogram: np.ndarray) -> Dict[str, object]:
+    """Answer every supported market from one scoreline histogram"""
+    probs = _normalise(histogram)
+    outcomes = outcome_counts(probs)
+    return {
+        "1x2": {k: float(v) for k, v in outcomes.items()},
+        "over_under": over_under(probs),
+        "btts": both_teams_to_score(probs),
+        "correct_score": correct_score(probs),
+        "asian_handicap": asian_handicap(probs),
+    }
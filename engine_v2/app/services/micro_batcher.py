@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of a batch inference function
+
+    Callers submit their own list of rows; rows from concurrent callers are
+    gathered for at most max_delay seconds (or until max_batch_size rows are
+    pending), passed to batch_fn in one call and the output scattered back.
+
+    batch_fn may return a list aligned with its input rows, or a dict keyed by
+    each row's key_field. Two callers whose rows share a key never go into the
+    same batch, so dict outputs scatter unambiguously. No batch exceeds
+    max_batch_size: a submission larger than that is split into chunks whose
+    outputs are joined back together for the caller.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        max_batch_size: int = 64,
+        max_delay: float = 0.005,
+        key_field: str = "match_id"
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.key_field = key_field
+        self._pending: List[Tuple[List[Dict[str, Any]], asyncio.Future]] = []
+        self._pending_keys: Set[Any] = set()
+        self._pending_rows = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.rows = 0
+
+    async def submit(self, rows: List[Dict[str, Any]]) -> Any:
+        """Queue rows for the next batch and wait for their share of the output"""
+        size = self.max_batch_size
+        if len(rows) <= size:
+            return await self._submit(rows)
+        parts = await asyncio.gather(*[
+            self._submit(rows[start:start + size]) for start in range(0, len(rows), size)
+        ])
+        if all(isinstance(part, dict) for part in parts):
+            return {key: value for part in parts for key, value in part.items()}
+        return [result for part in parts for result in part]
+
+    async def _submit(self, rows: List[Dict[str, Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        keys = {row.get(self.key_field) for row in rows}
+        if self._pending_keys & keys or self._pending_rows + len(rows) > self.max_batch_size:
+            self._flush()
+
+        self._pending.append((rows, future))
+        self._pending_keys |= keys
+        self._pending_rows += len(rows)
+
+        if self._pending_rows >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch = self._pending
+        self._pending = []
+        self._pending_keys = set()
+        self._pending_rows = 0
+        asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[List[Dict[str, Any]], asyncio.Future]]) -> None:
+        rows = [row for caller_rows, _ in batch for row in caller_rows]
+        self.batches += 1
+        self.rows += len(rows)
+        try:
+            output = await self.batch_fn(rows)
+            parts = self._scatter(batch, output)
+        except Exception as e:
+            logger.error(f"Batched inference over {len(rows)} rows failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), part in zip(batch, parts):
+            if not future.done():
+                future.set_result(part)
+
+    def _scatter(self, batch: List[Tuple[List[Dict[str, Any]], asyncio.Future]], output: Any) -> List[Any]:
+        """Split batch output back into one result per caller"""
+        if isinstance(output, dict):
+            return [
+                {row.get(self.key_field): output.get(row.get(self.key_field)) for row in caller_rows}
+                for caller_rows, _ in batch
+            ]
+
+        output = list(output)
+        parts, offset = [], 0
+        for caller_rows, _ in batch:
+            parts.append(output[offset:offset + len(caller_rows)])
+            offset += len(caller_rows)
+        if offset != len(output):
+            raise ValueError(f"Batch function returned {len(output)} results for {offset} rows")
+        return parts
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.rows / self.batches if self.batches else 0.0
@@ -1,17 +1,237 @@
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
+import copy
+import itertools
 import logging
-from dataclasses import dataclass
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from scipy import stats
 
+from app.services.markets import (
+    scoreline_histogram, fold_histogram, outcome_counts, goal_sums, derive_markets
+)
+
 logger = logging.getLogger(__name__)
 
+# Goals above this are folded into the last histogram bucket
+MAX_GOALS = 10
+
+# Truncation point for the analytic Poisson outcome model (tail mass < 1e-9 for rates < 5)
+ANALYTIC_MAX_GOALS = 25
+
+# Match parameters a sweep can perturb; factors are multiplicative
+PERTURBATION_KEYS = ("odds", "home_advantage", "home_avg_goals", "away_avg_goals", "venue_factor")
+
+# Defaults used when a match dictionary omits a model parameter
+_MATCH_DEFAULTS = {
+    "home_avg_goals": 1.5,
+    "away_avg_goals": 1.2,
+    "home_advantage": 0.2,
+    "venue_factor": 1.0,
+}
+
+# Variations per broadcast block when sweeping simulated histograms
+SWEEP_BLOCK_SIZE = 2048
+
+def perturbation_grid(**levels: List[float]) -> Dict[str, np.ndarray]:
+    """
+    Cartesian product of multiplicative factors, one row per variation
+    
+    Example:
+        perturbation_grid(odds=[0.95, 1.0, 1.05], home_advantage=[0.9, 1.1])
+        -> 6 variations, each factor applied to every match
+    """
+    unknown = set(levels) - set(PERTURBATION_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown perturbation keys: {sorted(unknown)}")
+    
+    keys = list(levels)
+    combos = np.array(list(itertools.product(*(levels[k] for k in keys))), dtype=np.float64)
+    return {key: combos[:, i] for i, key in enumerate(keys)}
+
+def sample_perturbations(
+    num_variations: int,
+    num_matches: int,
+    ranges: Dict[str, Tuple[float, float]],
+    rng: Optional[np.random.Generator] = None
+) -> Dict[str, np.ndarray]:
+    """Uniform random factors per variation and match, shaped (num_variations, num_matches)"""
+    unknown = set(ranges) - set(PERTURBATION_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown perturbation keys: {sorted(unknown)}")
+    
+    rng = rng or np.random.default_rng()
+    return {
+        key: rng.uniform(low, high, (num_variations, num_matches))
+        for key, (low, high) in ranges.items()
+    }
+
+def apply_perturbation(matches: List[Dict], factors: Dict[str, np.ndarray]) -> List[Dict]:
+    """
+    Return perturbed copies of the matches without touching the originals
+    
+    Args:
+        matches: Base match dictionaries
+        factors: Key -> per-match multiplier array of shape (num_matches,)
+    """
+    varied_matches = []
+    
+    for j, match in enumerate(matches):
+        varied_match = dict(match)
+        # Nested market is copied too, so variations never share it
+        varied_match['selected_market'] = dict(match.get('selected_market') or {})
+        
+        for key, values in factors.items():
+            factor = float(values[j])
+            if key == "odds":
+                varied_match['selected_market']['odds'] = (
+                    varied_match['selected_market'].get('odds', 1.85) * factor
+                )
+            else:
+                varied_match[key] = match.get(key, _MATCH_DEFAULTS[key]) * factor
+        
+        varied_matches.append(varied_match)
+    
+    return varied_matches
+
 @dataclass
 class MonteCarloConfig:
     simulations: int = 10000
     goal_distribution: str = "poisson"  # poisson, negative_binomial, custom
     random_seed: int = 42
     confidence_level: float = 0.95
+    workers: int = 1  # > 1 shards each match across a process pool
+    parallel_threshold: int = 200000  # below this, sharding overhead outweighs the gain
+    chunk_size: Optional[int] = None  # set to simulate in bounded-memory blocks
+    common_random_numbers: bool = True  # evaluate alternatives on one shared base simulation
+
+@dataclass
+class MatchSimulationStats:
+    """Mergeable sufficient statistics for one simulated match"""
+    iterations: int = 0
+    home_wins: int = 0
+    draws: int = 0
+    away_wins: int = 0
+    home_goals_sum: float = 0.0
+    away_goals_sum: float = 0.0
+    scoreline_histogram: np.ndarray = field(
+        default_factory=lambda: np.zeros((MAX_GOALS + 1, MAX_GOALS + 1), dtype=np.int64)
+    )
+
+    @classmethod
+    def from_samples(cls, home_goals: np.ndarray, away_goals: np.ndarray) -> "MatchSimulationStats":
+        """Reduce raw goal samples to sufficient statistics"""
+        # One exact bincount pass; every count below is read off the histogram
+        histogram = scoreline_histogram(home_goals, away_goals)
+        outcomes = outcome_counts(histogram)
+        goals = goal_sums(histogram)
+        
+        return cls(
+            iterations=int(home_goals.size),
+            home_wins=int(outcomes["home_win"]),
+            draws=int(outcomes["draw"]),
+            away_wins=int(outcomes["away_win"]),
+            home_goals_sum=goals["home"],
+            away_goals_sum=goals["away"],
+            scoreline_histogram=fold_histogram(histogram, MAX_GOALS),
+        )
+    
+    def merge(self, other: "MatchSimulationStats") -> "MatchSimulationStats":
+        """Combine two independent runs into one"""
+        return MatchSimulationStats(
+            iterations=self.iterations + other.iterations,
+            home_wins=self.home_wins + other.home_wins,
+            draws=self.draws + other.draws,
+            away_wins=self.away_wins + other.away_wins,
+            home_goals_sum=self.home_goals_sum + other.home_goals_sum,
+            away_goals_sum=self.away_goals_sum + other.away_goals_sum,
+            scoreline_histogram=self.scoreline_histogram + other.scoreline_histogram,
+        )
+    
+    def to_probabilities(self) -> Dict[str, float]:
+        """Same shape as MonteCarloAnalyzer.calculate_outcome_probabilities"""
+        total = self.iterations
+        home_mean = self.home_goals_sum / total
+        away_mean = self.away_goals_sum / total
+        
+        return {
+            "home_win": self.home_wins / total,
+            "draw": self.draws / total,
+            "away_win": self.away_wins / total,
+            "home_goals_mean": home_mean,
+            "away_goals_mean": away_mean,
+            "goals_total_mean": home_mean + away_mean,
+        }
+    
+    def to_markets(self) -> Dict[str, Any]:
+        """Derived markets (1X2, O/U, BTTS, correct score, Asian handicap)"""
+        return derive_markets(self.scoreline_histogram)
+
+@dataclass
+class ReferenceSimulation:
+    """Base simulation of one match, shared by alternatives as common random numbers"""
+    home_rate: float
+    away_rate: float
+    stats: MatchSimulationStats
+
+def _simulate_chunked(
+    home_rate: float,
+    away_rate: float,
+    iterations: int,
+    seed: np.random.SeedSequence,
+    chunk_size: Optional[int] = None
+) -> MatchSimulationStats:
+    """
+    Simulate in fixed-size blocks of uint8 goal counts, folding each block
+    into the running statistics so peak memory depends only on chunk_size
+    """
+    rng = np.random.default_rng(seed)
+    block = chunk_size or iterations
+    stats_total = MatchSimulationStats()
+    
+    remaining = iterations
+    while remaining > 0:
+        size = min(block, remaining)
+        home_goals = np.minimum(rng.poisson(home_rate, size), 255).astype(np.uint8)
+        away_goals = np.minimum(rng.poisson(away_rate, size), 255).astype(np.uint8)
+        stats_total = stats_total.merge(MatchSimulationStats.from_samples(home_goals, away_goals))
+        remaining -= size
+    
+    return stats_total
+
+def _simulate_shard(
+    home_rate: float,
+    away_rate: float,
+    iterations: int,
+    seed: np.random.SeedSequence,
+    chunk_size: Optional[int] = None
+) -> MatchSimulationStats:
+    """Process pool worker: simulate one shard and return only its statistics"""
+    return _simulate_chunked(home_rate, away_rate, iterations, seed, chunk_size)
+
+# Pools live for the whole process, shared by every analyzer so workers stay
+# warm between requests. One per size: analyzers configured with different
+# worker counts each get their own, so none is shut down under another's
+# pending shards.
+_process_pools: Dict[int, ProcessPoolExecutor] = {}
+_process_pool_lock = threading.Lock()
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the persistent simulation pool with this many workers, creating it on first use"""
+    with _process_pool_lock:
+        pool = _process_pools.get(workers)
+        if pool is None:
+            pool = _process_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+            logger.info(f"Started simulation process pool with {workers} workers")
+        return pool
+
+def shutdown_process_pool() -> None:
+    """Stop every simulation pool (called on application shutdown)"""
+    with _process_pool_lock:
+        for pool in _process_pools.values():
+            pool.shutdown(wait=True)
+        _process_pools.clear()
 
 class MonteCarloAnalyzer:
     """Monte Carlo simulation for football match outcomes"""
@@ -19,8 +239,21 @@ class MonteCarloAnalyzer:
     def __init__(self, config: MonteCarloConfig = None):
         self.config = config or MonteCarloConfig()
         np.random.seed(self.config.random_seed)
+        # Parent of the independent RNG streams handed to pool workers
+        self._seed_sequence = np.random.SeedSequence(self.config.random_seed)
         logger.info(f"Initialized MonteCarloAnalyzer with {self.config.simulations} simulations")
     
+    def with_config(self, **changes: Any) -> "MonteCarloAnalyzer":
+        """
+        Shallow copy running with some config fields replaced
+        
+        The copy shares this analyzer's seed sequence, so its draws stay
+        independent of the original's, and the global RNG is not reseeded.
+        """
+        clone = copy.copy(self)
+        clone.config = replace(self.config, **changes)
+        return clone
+    
     def simulate_match(
         self,
         home_avg_goals: float,
@@ -60,6 +293,88 @@ class MonteCarloAnalyzer:
             logger.error(f"Error in match simulation: {e}")
             raise
     
+    def simulate_match_parallel(
+        self,
+        home_avg_goals: float,
+        away_avg_goals: float,
+        home_advantage: float = 0.2,
+        venue_factor: float = 1.0
+    ) -> MatchSimulationStats:
+        """
+        Simulate a single match with the iteration budget sharded across the process pool
+        
+        Each shard draws from its own spawned RNG stream and returns sufficient
+        statistics, so nothing proportional to the iteration count crosses
+        process boundaries.
+        
+        Returns:
+            Merged MatchSimulationStats for all shards
+        """
+        adjusted_home = home_avg_goals * (1 + home_advantage) * venue_factor
+        return self._simulate_rates_parallel([(adjusted_home, away_avg_goals)])[0]
+    
+    def _simulate_rates_parallel(
+        self,
+        rates: List[Tuple[float, float]]
+    ) -> List[MatchSimulationStats]:
+        """Submit every shard of every match up front, then merge per match"""
+        try:
+            workers = max(1, self.config.workers)
+            shard_sizes = np.full(workers, self.config.simulations // workers)
+            shard_sizes[: self.config.simulations % workers] += 1
+            pool = get_process_pool(workers)
+            
+            pending = []
+            for home_rate, away_rate in rates:
+                seeds = self._seed_sequence.spawn(workers)
+                pending.append([
+                    pool.submit(
+                        _simulate_shard, home_rate, away_rate, int(size), seed, self.config.chunk_size
+                    )
+                    for size, seed in zip(shard_sizes, seeds)
+                    if size > 0
+                ])
+            
+            merged_stats = []
+            for futures in pending:
+                merged = MatchSimulationStats()
+                for future in futures:
+                    merged = merged.merge(future.result())
+                merged_stats.append(merged)
+            return merged_stats
+            
+        except Exception as e:
+            logger.error(f"Error in parallel match simulation: {e}")
+            raise
+    
+    def simulate_match_chunked(
+        self,
+        home_avg_goals: float,
+        away_avg_goals: float,
+        home_advantage: float = 0.2,
+        venue_factor: float = 1.0
+    ) -> MatchSimulationStats:
+        """
+        Simulate a single match in config.chunk_size blocks
+        
+        Returns sufficient statistics instead of per-iteration arrays, so memory
+        use is the same for 10k and 100M iterations.
+        """
+        try:
+            adjusted_home = home_avg_goals * (1 + home_advantage) * venue_factor
+            seed = self._seed_sequence.spawn(1)[0]
+            return _simulate_chunked(
+                adjusted_home, away_avg_goals, self.config.simulations, seed, self.config.chunk_size
+            )
+            
+        except Exception as e:
+            logger.error(f"Error in chunked match simulation: {e}")
+            raise
+    
+    def _use_parallel(self) -> bool:
+        """Whether the configured budget is large enough to shard"""
+        return self.config.workers > 1 and self.config.simulations >= self.config.parallel_threshold
+    
     def calculate_outcome_probabilities(
         self,
         home_goals: np.ndarray,
@@ -67,28 +382,140 @@ class MonteCarloAnalyzer:
     ) -> Dict[str, float]:
         """Calculate probabilities of match outcomes"""
         try:
-            home_wins = np.sum(home_goals > away_goals)
-            draws = np.sum(home_goals == away_goals)
-            away_wins = np.sum(home_goals < away_goals)
+            histogram = scoreline_histogram(home_goals, away_goals)
+            outcomes = outcome_counts(histogram)
+            goals = goal_sums(histogram)
             total = len(home_goals)
             
             return {
-                "home_win": home_wins / total,
-                "draw": draws / total,
-                "away_win": away_wins / total,
-                "home_goals_mean": np.mean(home_goals),
-                "away_goals_mean": np.mean(away_goals),
-                "goals_total_mean": np.mean(home_goals + away_goals),
+                "home_win": outcomes["home_win"] / total,
+                "draw": outcomes["draw"] / total,
+                "away_win": outcomes["away_win"] / total,
+                "home_goals_mean": goals["home"] / total,
+                "away_goals_mean": goals["away"] / total,
+                "goals_total_mean": (goals["home"] + goals["away"]) / total,
             }
             
         except Exception as e:
             logger.error(f"Error calculating outcome probabilities: {e}")
             raise
     
+    def calculate_market_probabilities(
+        self,
+        home_goals: np.ndarray,
+        away_goals: np.ndarray
+    ) -> Dict[str, Any]:
+        """Every derived market from one scoreline histogram of the samples"""
+        try:
+            return derive_markets(scoreline_histogram(home_goals, away_goals))
+        except Exception as e:
+            logger.error(f"Error calculating market probabilities: {e}")
+            raise
+    
+    def _match_rates(self, match: Dict[str, Any]) -> Tuple[float, float]:
+        """Adjusted (home, away) goal rates for a match dictionary"""
+        home_rate = (
+            match.get('home_avg_goals', 1.5)
+            * (1 + match.get('home_advantage', 0.2))
+            * match.get('venue_factor', 1.0)
+        )
+        return home_rate, match.get('away_avg_goals', 1.2)
+    
+    def _simulate_probabilities(self, match: Dict[str, Any]) -> Dict[str, float]:
+        """Fresh in-process simulation of one match"""
+        home_avg = match.get('home_avg_goals', 1.5)
+        away_avg = match.get('away_avg_goals', 1.2)
+        home_advantage = match.get('home_advantage', 0.2)
+        venue_factor = match.get('venue_factor', 1.0)
+        
+        if self.config.chunk_size:
+            return self.simulate_match_chunked(
+                home_avg, away_avg, home_advantage, venue_factor
+            ).to_probabilities()
+        
+        home_goals, away_goals = self.simulate_match(
+            home_avg, away_avg, home_advantage, venue_factor
+        )
+        return self.calculate_outcome_probabilities(home_goals, away_goals)
+    
+    def simulate_reference(self, matches: List[Dict[str, Any]]) -> List[ReferenceSimulation]:
+        """
+        Simulate each match once at its base parameters
+        
+        The resulting statistics act as common random numbers for every
+        alternative built from the same matches.
+        """
+        try:
+            rates = [self._match_rates(match) for match in matches]
+            
+            if self._use_parallel():
+                match_stats = self._simulate_rates_parallel(rates)
+            else:
+                match_stats = [
+                    _simulate_chunked(
+                        home_rate, away_rate, self.config.simulations,
+                        self._seed_sequence.spawn(1)[0], self.config.chunk_size
+                    )
+                    for home_rate, away_rate in rates
+                ]
+            
+            return [
+                ReferenceSimulation(home_rate, away_rate, match_stats[i])
+                for i, (home_rate, away_rate) in enumerate(rates)
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error in reference simulation: {e}")
+            raise
+    
+    def reweight_probabilities(
+        self,
+        reference: ReferenceSimulation,
+        home_rate: float,
+        away_rate: float
+    ) -> Dict[str, float]:
+        """
+        Outcome probabilities at new goal rates via likelihood-ratio reweighting
+        
+        Each scoreline bucket of the base histogram is weighted by
+        P(scoreline | new rates) / P(scoreline | base rates). The weights are
+        self-normalised, so unchanged rates reproduce the base probabilities
+        and small perturbations are measured on the same draws.
+        """
+        try:
+            goals = np.arange(MAX_GOALS + 1)
+            home_log_ratio = (
+                goals * np.log(home_rate / reference.home_rate) - (home_rate - reference.home_rate)
+            )
+            away_log_ratio = (
+                goals * np.log(away_rate / reference.away_rate) - (away_rate - reference.away_rate)
+            )
+            weights = reference.stats.scoreline_histogram * np.exp(
+                home_log_ratio[:, None] + away_log_ratio[None, :]
+            )
+            total = weights.sum()
+            
+            home_goals_mean = float(weights.sum(axis=1) @ goals / total)
+            away_goals_mean = float(weights.sum(axis=0) @ goals / total)
+            
+            return {
+                "home_win": float(np.tril(weights, -1).sum() / total),
+                "draw": float(np.trace(weights) / total),
+                "away_win": float(np.triu(weights, 1).sum() / total),
+                "home_goals_mean": home_goals_mean,
+                "away_goals_mean": away_goals_mean,
+                "goals_total_mean": home_goals_mean + away_goals_mean,
+            }
+            
+        except Exception as e:
+            logger.error(f"Error reweighting probabilities: {e}")
+            raise
+    
     def simulate_slip(
         self,
         matches: List[Dict[str, Any]],
-        stake: float
+        stake: float,
+        reference: Optional[List[ReferenceSimulation]] = None
     ) -> Dict[str, Any]:
         """
         Simulate an entire betting slip
@@ -96,6 +523,8 @@ class MonteCarloAnalyzer:
         Args:
             matches: List of match data dictionaries
             stake: Betting stake amount
+            reference: Optional base simulations (one per match, same order) to
+                reweight instead of drawing fresh samples
         
         Returns:
             Dictionary with slip simulation results
@@ -106,20 +535,20 @@ class MonteCarloAnalyzer:
             all_results = []
             total_odds = 1.0
             
-            for match in matches:
-                # Extract match data
-                home_avg = match.get('home_avg_goals', 1.5)
-                away_avg = match.get('away_avg_goals', 1.2)
-                home_advantage = match.get('home_advantage', 0.2)
-                venue_factor = match.get('venue_factor', 1.0)
-                
-                # Simulate match
-                home_goals, away_goals = self.simulate_match(
-                    home_avg, away_avg, home_advantage, venue_factor
-                )
-                
-                # Calculate probabilities
-                probs = self.calculate_outcome_probabilities(home_goals, away_goals)
+            # Sharded runs submit every match to the pool up front
+            fresh_stats = None
+            if reference is None and self._use_parallel():
+                fresh_stats = [r.stats for r in self.simulate_reference(matches)]
+            
+            for index, match in enumerate(matches):
+                if reference is not None:
+                    # Reweight the shared base draws instead of simulating again
+                    home_rate, away_rate = self._match_rates(match)
+                    probs = self.reweight_probabilities(reference[index], home_rate, away_rate)
+                elif fresh_stats is not None:
+                    probs = fresh_stats[index].to_probabilities()
+                else:
+                    probs = self._simulate_probabilities(match)
                 
                 # Get market odds and calculate expected value
                 market_odds = match.get('selected_market', {}).get('odds', 1.85)
@@ -138,8 +567,9 @@ class MonteCarloAnalyzer:
                 
                 total_odds *= market_odds
             
-            # Calculate slip-level metrics
-            slip_ev = sum(r["expected_value"] for r in all_results)
+            # Slip-level EV is the accumulator's: it pays only if every leg lands
+            hit_probability = float(np.prod([r["probabilities"]["home_win"] for r in all_results]))
+            slip_ev = (hit_probability * total_odds - 1) * stake
             possible_return = stake * total_odds
             confidence = self._calculate_confidence(all_results)
             risk_level = self._assess_risk_level(all_results)
@@ -203,14 +633,26 @@ class MonteCarloAnalyzer:
     def generate_alternative_slips(
         self,
         base_slip: Dict[str, Any],
-        num_alternatives: int = 10
+        num_alternatives: int = 10,
+        top_k: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Generate alternative slip variations
         
+        With top_k set, alternatives are screened first: analytic EV bounds
+        are computed for every variation and only those whose upper bound can
+        still reach the top_k lower bounds are simulated, so the expensive
+        work scales with top_k rather than num_alternatives.
+        
+        With config.common_random_numbers the base matches are simulated once
+        and every variation is evaluated by reweighting those draws, so the
+        cost is close to a single simulation and differences between
+        alternatives are not drowned in independent sampling noise.
+        
         Args:
             base_slip: The original slip configuration
             num_alternatives: Number of alternative slips to generate
+            top_k: Number of slips the caller will keep (enables pruning)
         
         Returns:
             List of alternative slip configurations
@@ -218,17 +660,34 @@ class MonteCarloAnalyzer:
         try:
             alternatives = []
             matches = base_slip.get("matches", [])
+            stake = base_slip.get("stake", 0.5)
+            variation_factors = self._variation_factors(num_alternatives, len(matches))
+            
+            candidates = range(num_alternatives)
+            if top_k is not None and matches and num_alternatives > top_k:
+                bounds = self.bound_alternatives(matches, stake, variation_factors)
+                # Anything whose best case is below the k-th best worst case cannot make the cut
+                cutoff = np.sort(bounds["ev_lower"])[-top_k]
+                candidates = np.flatnonzero(bounds["ev_upper"] >= cutoff)
+                logger.info(
+                    f"Screened {num_alternatives} alternatives, {len(candidates)} survive for simulation"
+                )
             
-            for i in range(num_alternatives):
+            reference = self.simulate_reference(matches) if self.config.common_random_numbers else None
+            
+            for i in candidates:
+                i = int(i)
                 alt_slip = {
                     "slip_id": f"ALT_{base_slip.get('master_slip_id', 'UNKNOWN')}_{i+1:03d}",
                     "variation_type": self._get_variation_type(i),
-                    "matches": self._vary_matches(matches, i),
-                    "stake": base_slip.get("stake", 0.5),
+                    "matches": apply_perturbation(matches, variation_factors[i]),
+                    "stake": stake,
                 }
                 
                 # Simulate the alternative slip
-                simulation_result = self.simulate_slip(alt_slip["matches"], alt_slip["stake"])
+                simulation_result = self.simulate_slip(
+                    alt_slip["matches"], alt_slip["stake"], reference=reference
+                )
                 alt_slip.update(simulation_result)
                 
                 alternatives.append(alt_slip)
@@ -251,26 +710,244 @@ class MonteCarloAnalyzer:
         ]
         return variation_types[index % len(variation_types)]
     
-    def _vary_matches(self, matches: List[Dict], variation_index: int) -> List[Dict]:
-        """Create variations of match selections"""
-        varied_matches = []
-        
-        for match in matches:
-            # Create a copy of the match
-            varied_match = match.copy()
-            
-            # Apply variation based on index
-            if variation_index % 3 == 0:
-                # Vary odds slightly
-                varied_match['selected_market']['odds'] *= np.random.uniform(0.95, 1.05)
-            elif variation_index % 3 == 1:
-                # Vary home advantage
-                varied_match['home_advantage'] *= np.random.uniform(0.9, 1.1)
+    def _variation_factors(self, num_alternatives: int, num_matches: int) -> List[Dict[str, np.ndarray]]:
+        """
+        Perturbation factors for the standard alternatives, drawn in one shot
+        
+        Index % 3 selects the kind: odds, home advantage, or goal averages.
+        """
+        shape = (num_alternatives, num_matches)
+        odds = np.random.uniform(0.95, 1.05, shape)
+        home_advantage = np.random.uniform(0.9, 1.1, shape)
+        home_goals = np.random.uniform(0.9, 1.1, shape)
+        away_goals = np.random.uniform(0.9, 1.1, shape)
+        
+        factors = []
+        for i in range(num_alternatives):
+            if i % 3 == 0:
+                factors.append({"odds": odds[i]})
+            elif i % 3 == 1:
+                factors.append({"home_advantage": home_advantage[i]})
             else:
-                # Vary goal averages
-                varied_match['home_avg_goals'] *= np.random.uniform(0.9, 1.1)
-                varied_match['away_avg_goals'] *= np.random.uniform(0.9, 1.1)
+                factors.append({"home_avg_goals": home_goals[i], "away_avg_goals": away_goals[i]})
+        return factors
+    
+    def sweep_parameters(
+        self,
+        matches: List[Dict[str, Any]],
+        stake: float,
+        perturbations: Dict[str, np.ndarray],
+        method: str = "analytic",
+        reference: Optional[List[ReferenceSimulation]] = None,
+        top_n: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluate many what-if variations of a slip in one broadcast computation
+        
+        Args:
+            matches: Base match dictionaries
+            stake: Betting stake amount
+            perturbations: Key (see PERTURBATION_KEYS) -> multiplicative factors,
+                shaped (V,) to apply to every match or (V, num_matches)
+            method: "analytic" (exact Poisson model) or "simulated"
+                (likelihood-ratio reweighting of the base simulation)
+            reference: Base simulation for the simulated method; built if omitted
+            top_n: Only return the best rows
+        
+        Returns:
+            Rows ranked by expected value (descending)
+        """
+        try:
+            num_matches = len(matches)
+            unknown = set(perturbations) - set(PERTURBATION_KEYS)
+            if unknown:
+                raise ValueError(f"Unknown perturbation keys: {sorted(unknown)}")
+            if not perturbations or num_matches == 0:
+                return []
             
-            varied_matches.append(varied_match)
+            arrays = self._evaluate_variations(matches, stake, perturbations, method, reference)
+            factors = arrays["factors"]
+            slip_ev = arrays["expected_value"]
+            confidence = arrays["confidence_score"]
+            total_odds = arrays["total_odds"]
+            risk_level = arrays["risk_level"]
+            match_ev = arrays["match_ev"]
+            home_win = arrays["home_win"]
+            
+            order = np.argsort(-slip_ev, kind="stable")
+            if top_n is not None:
+                order = order[:top_n]
+            
+            return [
+                {
+                    "variation": int(v),
+                    "factors": {key: values[v].tolist() for key, values in factors.items()},
+                    "expected_value": float(slip_ev[v]),
+                    "confidence_score": float(confidence[v]),
+                    "total_odds": float(total_odds[v]),
+                    "possible_return": float(stake * total_odds[v]),
+                    "risk_level": str(risk_level[v]),
+                    "value_bets": int((match_ev[v] > 0).sum()),
+                    "home_win_probabilities": home_win[v].tolist(),
+                }
+                for v in order
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error in parameter sweep: {e}")
+            raise
+    
+    def _evaluate_variations(
+        self,
+        matches: List[Dict[str, Any]],
+        stake: float,
+        perturbations: Dict[str, np.ndarray],
+        method: str = "analytic",
+        reference: Optional[List[ReferenceSimulation]] = None
+    ) -> Dict[str, np.ndarray]:
+        """Broadcast core of sweep_parameters; every value is an array over variations"""
+        num_matches = len(matches)
+        num_variations = len(next(iter(perturbations.values())))
+        factors = {
+            key: np.broadcast_to(
+                np.asarray(values, dtype=np.float64).reshape(num_variations, -1),
+                (num_variations, num_matches)
+            )
+            for key, values in perturbations.items()
+        }
+        ones = np.ones((num_variations, num_matches))
+        
+        def varied(key: str, base: np.ndarray) -> np.ndarray:
+            return base[None, :] * factors.get(key, ones)
+        
+        base = {
+            key: np.array([m.get(key, default) for m in matches], dtype=np.float64)
+            for key, default in _MATCH_DEFAULTS.items()
+        }
+        base_odds = np.array(
+            [(m.get('selected_market') or {}).get('odds', 1.85) for m in matches], dtype=np.float64
+        )
+        
+        odds = varied("odds", base_odds)
+        home_rates = (
+            varied("home_avg_goals", base["home_avg_goals"])
+            * (1 + varied("home_advantage", base["home_advantage"]))
+            * varied("venue_factor", base["venue_factor"])
+        )
+        away_rates = varied("away_avg_goals", base["away_avg_goals"])
+        
+        if method == "analytic":
+            home_win = self._analytic_home_win(home_rates, away_rates)
+        elif method == "simulated":
+            reference = reference or self.simulate_reference(matches)
+            home_win = self._reweighted_home_win(reference, home_rates, away_rates)
+        else:
+            raise ValueError(f"Unknown sweep method: {method}")
+        
+        # Slip-level metrics, same definitions as simulate_slip
+        match_ev = (home_win * odds - 1) * stake
+        avg_odds = odds.mean(axis=1)
+        value_bet_ratio = (match_ev > 0).mean(axis=1)
+        
+        return {
+            "factors": factors,
+            "odds": odds,
+            "home_win": home_win,
+            "match_ev": match_ev,
+            "expected_value": (home_win.prod(axis=1) * odds.prod(axis=1) - 1) * stake,
+            "total_odds": odds.prod(axis=1),
+            "confidence_score": self._vectorized_confidence(home_win, odds),
+            "risk_level": np.where(
+                (avg_odds < 2.0) & (value_bet_ratio > 0.7), "low",
+                np.where((avg_odds < 3.0) & (value_bet_ratio > 0.5), "medium", "high")
+            ),
+        }
+    
+    def _vectorized_confidence(self, home_win: np.ndarray, odds: np.ndarray) -> np.ndarray:
+        """_calculate_confidence over a (V, num_matches) grid"""
+        weights = 1 / odds
+        return (np.minimum(home_win * odds * 100, 100) * weights).sum(axis=1) / weights.sum(axis=1)
+    
+    def bound_alternatives(
+        self,
+        matches: List[Dict[str, Any]],
+        stake: float,
+        variation_factors: List[Dict[str, np.ndarray]]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Cheap analytic bounds on each alternative's EV and confidence
+        
+        The exact Poisson probability of every leg is widened by the sampling
+        error a config.simulations-draw estimate can show. The interval width
+        is Bonferroni-corrected over every leg of every alternative, so with
+        probability at least config.confidence_level the simulated EV and
+        confidence of all alternatives fall inside their [lower, upper]
+        at once, which is what pruning on these bounds relies on.
+        
+        Returns:
+            Arrays over variations: expected_value, ev_lower, ev_upper,
+            confidence_score, confidence_lower, confidence_upper
+        """
+        num_matches = len(matches)
+        perturbations = {
+            key: np.stack([f.get(key, np.ones(num_matches)) for f in variation_factors])
+            for key in PERTURBATION_KEYS
+            if any(key in f for f in variation_factors)
+        }
+        if not perturbations:
+            perturbations = {"odds": np.ones((len(variation_factors), num_matches))}
+        
+        arrays = self._evaluate_variations(matches, stake, perturbations, method="analytic")
+        home_win, odds = arrays["home_win"], arrays["odds"]
+        
+        intervals = home_win.size
+        z = stats.norm.ppf(1 - (1 - self.config.confidence_level) / (2 * intervals))
+        half_width = z * np.sqrt(home_win * (1 - home_win) / self.config.simulations)
+        low = np.clip(home_win - half_width, 0, 1)
+        high = np.clip(home_win + half_width, 0, 1)
+        
+        return {
+            "expected_value": arrays["expected_value"],
+            "ev_lower": (low.prod(axis=1) * odds.prod(axis=1) - 1) * stake,
+            "ev_upper": (high.prod(axis=1) * odds.prod(axis=1) - 1) * stake,
+            "confidence_score": arrays["confidence_score"],
+            "confidence_lower": self._vectorized_confidence(low, odds),
+            "confidence_upper": self._vectorized_confidence(high, odds),
+        }
+    
+    def _analytic_home_win(self, home_rates: np.ndarray, away_rates: np.ndarray) -> np.ndarray:
+        """P(home goals > away goals) under independent Poisson goals, broadcast over any shape"""
+        goals = np.arange(ANALYTIC_MAX_GOALS + 1)
+        home_pmf = stats.poisson.pmf(goals, home_rates[..., None])
+        away_cdf = np.cumsum(stats.poisson.pmf(goals, away_rates[..., None]), axis=-1)
+        return (home_pmf[..., 1:] * away_cdf[..., :-1]).sum(axis=-1)
+    
+    def _reweighted_home_win(
+        self,
+        reference: List[ReferenceSimulation],
+        home_rates: np.ndarray,
+        away_rates: np.ndarray
+    ) -> np.ndarray:
+        """Vectorised reweight_probabilities for (V, num_matches) rate arrays"""
+        goals = np.arange(MAX_GOALS + 1)
+        base_home = np.array([r.home_rate for r in reference])
+        base_away = np.array([r.away_rate for r in reference])
+        histograms = np.stack([r.stats.scoreline_histogram for r in reference]).astype(np.float64)
+        home_wins_hist = np.tril(histograms, -1)
+        
+        home_win = np.empty_like(home_rates)
+        for start in range(0, home_rates.shape[0], SWEEP_BLOCK_SIZE):
+            block = slice(start, start + SWEEP_BLOCK_SIZE)
+            home_weights = np.exp(
+                goals * np.log(home_rates[block, :, None] / base_home[None, :, None])
+                - (home_rates[block, :, None] - base_home[None, :, None])
+            )
+            away_weights = np.exp(
+                goals * np.log(away_rates[block, :, None] / base_away[None, :, None])
+                - (away_rates[block, :, None] - base_away[None, :, None])
+            )
+            wins = np.einsum("vmh,mha,vma->vm", home_weights, home_wins_hist, away_weights, optimize=True)
+            total = np.einsum("vmh,mha,vma->vm", home_weights, histograms, away_weights, optimize=True)
+            home_win[block] = wins / total
         
-        return varied_matches
\ No newline at end of file
+        return home_win
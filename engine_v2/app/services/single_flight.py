@@ -0,0 +1,49 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable
+
+logger = logging.getLogger(__name__)
+
+def request_key(payload: Dict[str, Any], exclude: Iterable[str] = ("timestamp",)) -> str:
+    """
+    Canonical content hash of a request body
+
+    Keys are sorted and the excluded top-level fields dropped, so two
+    submissions that differ only in e.g. their client timestamp share a key.
+    """
+    content = {k: v for k, v in payload.items() if k not in set(exclude)}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one computation
+
+    The first caller for a key starts the computation; callers arriving while
+    it is in flight await the same task and receive the same result (or
+    exception). Nothing is cached once the flight lands.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+            logger.debug(f"Joined in-flight computation {key[:12]}")
+
+        # Shield so one caller disconnecting does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
@@ -2,53 +2,152 @@
 # A. Move Intensive Operations to Background Workers
 # Instead of running Monte Carlo simulations in request handlers, use a task queue:
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import Executor
 from dataclasses import dataclass
 import asyncio
 
+from app.simulations.streaming import StreamingReturnStats
+
 @dataclass
 class SimulationConfig:
     iterations: int = 10000
     confidence_level: float = 0.95
     risk_tolerance: float = 0.1
+    chunk_size: int = 65536  # iterations generated per block; bounds peak memory
+    workers: int = 4  # executor tasks a batch is split across
+    random_seed: Optional[int] = None
 
 class MonteCarloSimulator:
     def __init__(self, config: SimulationConfig = None):
         self.config = config or SimulationConfig()
-        
+        self._seed_sequence = np.random.SeedSequence(self.config.random_seed)
+
     async def run_batch_simulations(
-        self, 
+        self,
         matches: List[Dict],
         market_odds: Dict,
-        stake: float
+        stake: float,
+        executor: Optional[Executor] = None
     ) -> Dict:
-        """Run parallel Monte Carlo simulations for multiple matches"""
+        """
+        Run Monte Carlo simulations for multiple matches concurrently
+
+        Matches are split into up to config.workers groups; each group is
+        simulated as one vectorized batch in the executor (NumPy releases the
+        GIL for the heavy array work, so threads overlap). Per-match odds
+        (match['odds']) take precedence over market_odds.
+        """
+        loop = asyncio.get_running_loop()
+        odds = [match.get('odds') or market_odds for match in matches]
+        groups = [
+            group for group in np.array_split(np.arange(len(matches)), max(1, self.config.workers))
+            if group.size
+        ]
+        seeds = self._seed_sequence.spawn(len(groups))
+
         tasks = [
-            self._simulate_single_match(match, market_odds, stake)
-            for match in matches
+            loop.run_in_executor(
+                executor,
+                self.simulate_matches,
+                [matches[i] for i in group],
+                [odds[i] for i in group],
+                stake,
+                np.random.default_rng(seed),
+            )
+            for group, seed in zip(groups, seeds)
         ]
-        results = await asyncio.gather(*tasks)
+        results = [summary for group_results in await asyncio.gather(*tasks) for summary in group_results]
         return self._aggregate_results(results)
-    
-    async def _simulate_single_match(self, match: Dict, odds: Dict, stake: float):
-        """Simulate a single match with vectorized operations"""
-        # Use NumPy for vectorized operations instead of loops
-        outcomes = np.random.choice(
-            [0, 1, 2],  # Home win, Draw, Away win
-            size=self.config.iterations,
-            p=self._calculate_probabilities(match)
-        )
-        
-        # Calculate returns
-        returns = np.where(
-            outcomes == 0, stake * odds['home'] - stake,
-            np.where(outcomes == 1, stake * odds['draw'] - stake,
-                    stake * odds['away'] - stake)
-        )
-        
+
+    def simulate_match(self, match: Dict, odds: Dict, stake: float) -> Dict:
+        """Simulate a single match in fixed-size blocks with streaming aggregation"""
+        return self.simulate_matches([match], [odds], stake)[0]
+
+    def simulate_matches(
+        self,
+        matches: List[Dict],
+        odds: List[Dict],
+        stake: float,
+        rng: Optional[np.random.Generator] = None
+    ) -> List[Dict]:
+        """
+        Simulate several matches together, one uniform matrix per block
+
+        Outcomes come from inverse-CDF lookup: each match's cumulative
+        home/draw/away distribution is offset by its row index so a single
+        searchsorted over the flattened CDFs classifies the whole
+        (matches x block) uniform matrix. Returns stream into one-pass
+        moments/ruin/quantile trackers, so no full return array is kept.
+        """
+        if not matches:
+            return []
+        rng = rng or np.random.default_rng(self._seed_sequence.spawn(1)[0])
+        num_matches = len(matches)
+
+        probabilities = np.array([self._calculate_probabilities(m) for m in matches])
+        cdf = np.cumsum(probabilities, axis=1)
+        cdf[:, -1] = 1.0
+        rows = np.arange(num_matches, dtype=np.float64)[:, None]
+        flat_cdf = (cdf + rows).ravel()
+        row_base = (np.arange(num_matches) * 3)[:, None]
+
+        # Net return of each outcome: Home win, Draw, Away win
+        payouts = np.array([
+            [stake * o['home'] - stake, stake * o['draw'] - stake, stake * o['away'] - stake]
+            for o in odds
+        ])
+        threshold = self._ruin_threshold(stake)
+        trackers = [StreamingReturnStats(ruin_threshold=threshold) for _ in matches]
+
+        for block_size in self._block_sizes():
+            uniforms = rng.random((num_matches, block_size))
+            uniforms += rows
+            outcomes = np.searchsorted(flat_cdf, uniforms, side='right') - row_base
+            np.minimum(outcomes, 2, out=outcomes)
+            returns = np.take_along_axis(payouts, outcomes, axis=1)
+            for tracker, match_returns in zip(trackers, returns):
+                tracker.update(match_returns)
+
+        return [self._summarize(tracker) for tracker in trackers]
+
+    def _block_sizes(self):
+        """Split the iteration budget into chunk_size blocks"""
+        chunk = max(1, self.config.chunk_size)
+        full_blocks, remainder = divmod(self.config.iterations, chunk)
+        for _ in range(full_blocks):
+            yield chunk
+        if remainder:
+            yield remainder
+
+    def _ruin_threshold(self, stake: float) -> float:
+        """Returns at or below this count as ruin (losing all but risk_tolerance of the stake)"""
+        return -stake * (1 - self.config.risk_tolerance)
+
+    def _calculate_probabilities(self, match: Dict) -> np.ndarray:
+        """Home/draw/away probabilities for a match, normalised to sum to 1"""
+        probs = match.get('probabilities') or {}
+        p = np.array([
+            probs.get('home', 1 / 3),
+            probs.get('draw', 1 / 3),
+            probs.get('away', 1 / 3),
+        ], dtype=np.float64)
+        return p / p.sum()
+
+    def _summarize(self, tracker: StreamingReturnStats) -> Dict:
+        return {
+            'expected_value': tracker.moments.mean,
+            'std_deviation': tracker.moments.std,
+            'risk_of_ruin': tracker.risk_of_ruin,
+            'percentile_analysis': tracker.sketch.percentiles(),
+        }
+
+    def _aggregate_results(self, results: List[Dict]) -> Dict:
+        """Combine per-match summaries (matches are simulated independently)"""
         return {
-            'expected_value': np.mean(returns),
-            'std_deviation': np.std(returns),
-            'risk_of_ruin': self._calculate_risk_of_ruin(returns),
-            'percentile_analysis': self._percentile_analysis(returns)
-        }
\ No newline at end of file
+            'matches': results,
+            'total_expected_value': float(sum(r['expected_value'] for r in results)),
+            'total_std_deviation': float(np.sqrt(sum(r['std_deviation'] ** 2 for r in results))),
+            'max_risk_of_ruin': max((r['risk_of_ruin'] for r in results), default=0.0),
+            'iterations': self.config.iterations,
+        }
@@ -0,0 +1,161 @@
+# simulations/streaming.py - One-pass aggregation for chunked simulations
+# Every accumulator here folds a block of samples at a time and can be merged
+# with another accumulator, so memory stays constant in the iteration count.
+import numpy as np
+from typing import Dict, Iterable, Optional
+from dataclasses import dataclass
+
+@dataclass
+class RunningMoments:
+    """Count, mean and variance accumulated with Chan's parallel update"""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = float("inf")
+    maximum: float = float("-inf")
+
+    def update(self, values: np.ndarray) -> None:
+        """Fold a block of samples into the running moments"""
+        if values.size == 0:
+            return
+        block = values.astype(np.float64, copy=False)
+        block_mean = float(block.mean())
+        block_m2 = float(((block - block_mean) ** 2).sum())
+        self._combine(int(block.size), block_mean, block_m2)
+        self.minimum = min(self.minimum, float(block.min()))
+        self.maximum = max(self.maximum, float(block.max()))
+
+    def merge(self, other: "RunningMoments") -> None:
+        """Merge moments computed over an independent set of samples"""
+        if other.count == 0:
+            return
+        self._combine(other.count, other.mean, other.m2)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def _combine(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        """Population variance (matches np.var / np.std defaults)"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+class QuantileSketch:
+    """
+    Merging t-digest style quantile sketch
+
+    Samples are kept as weighted centroids. Whenever the buffer grows past the
+    compression limit, centroids are re-bucketed on the arcsine scale so the
+    tails keep fine resolution while the middle is summarised coarsely. The
+    sketch holds at most ~compression centroids regardless of how many samples
+    were added.
+    """
+
+    def __init__(self, compression: int = 200):
+        self.compression = compression
+        self._means = np.empty(0, dtype=np.float64)
+        self._weights = np.empty(0, dtype=np.float64)
+        self.count = 0
+        self.minimum = float("inf")
+        self.maximum = float("-inf")
+
+    def update(self, values: np.ndarray) -> None:
+        """Fold a block of samples into the sketch"""
+        if values.size == 0:
+            return
+        # Collapse repeated values first; simulated returns are often discrete
+        unique, counts = np.unique(values.astype(np.float64, copy=False), return_counts=True)
+        self._add(unique, counts.astype(np.float64))
+        self.count += int(values.size)
+        self.minimum = min(self.minimum, float(unique[0]))
+        self.maximum = max(self.maximum, float(unique[-1]))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """Merge another sketch into this one"""
+        if other.count == 0:
+            return
+        self._add(other._means, other._weights)
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def _add(self, means: np.ndarray, weights: np.ndarray) -> None:
+        self._means = np.concatenate([self._means, means])
+        self._weights = np.concatenate([self._weights, weights])
+        if self._means.size > self.compression:
+            self._compress()
+
+    def _compress(self) -> None:
+        order = np.argsort(self._means, kind="mergesort")
+        means = self._means[order]
+        weights = self._weights[order]
+
+        cumulative = np.cumsum(weights)
+        mid_quantiles = (cumulative - weights / 2) / cumulative[-1]
+        # Arcsine scale: buckets are narrow near q=0 and q=1, wide in the middle
+        scale = np.arcsin(2 * mid_quantiles - 1) / np.pi + 0.5
+        buckets = np.minimum((scale * self.compression).astype(np.int64), self.compression - 1)
+
+        bucket_weights = np.bincount(buckets, weights=weights, minlength=self.compression)
+        bucket_sums = np.bincount(buckets, weights=means * weights, minlength=self.compression)
+        occupied = bucket_weights > 0
+
+        self._weights = bucket_weights[occupied]
+        self._means = bucket_sums[occupied] / self._weights
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-th quantile (0 <= q <= 1)"""
+        if self.count == 0:
+            return float("nan")
+        if self._means.size > self.compression:
+            self._compress()
+        order = np.argsort(self._means, kind="mergesort")
+        means = self._means[order]
+        weights = self._weights[order]
+
+        cumulative = np.cumsum(weights)
+        mid_points = (cumulative - weights / 2) / cumulative[-1]
+        # Anchor the ends at the exact extremes seen
+        positions = np.concatenate([[0.0], mid_points, [1.0]])
+        values = np.concatenate([[self.minimum], means, [self.maximum]])
+        return float(np.interp(q, positions, values))
+
+    def percentiles(self, levels: Iterable[float] = (5, 25, 50, 75, 95)) -> Dict[str, float]:
+        """Percentile table in the same shape the simulator reports"""
+        return {f"p{int(level)}": self.quantile(level / 100.0) for level in levels}
+
+@dataclass
+class StreamingReturnStats:
+    """Running moments, ruin counter and quantile sketch for one return stream"""
+    ruin_threshold: float
+    moments: Optional[RunningMoments] = None
+    sketch: Optional[QuantileSketch] = None
+    ruin_count: int = 0
+
+    def __post_init__(self):
+        self.moments = self.moments or RunningMoments()
+        self.sketch = self.sketch or QuantileSketch()
+
+    def update(self, returns: np.ndarray) -> None:
+        """Fold one block of simulated returns"""
+        self.moments.update(returns)
+        self.sketch.update(returns)
+        self.ruin_count += int(np.count_nonzero(returns <= self.ruin_threshold))
+
+    def merge(self, other: "StreamingReturnStats") -> None:
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        self.ruin_count += other.ruin_count
+
+    @property
+    def risk_of_ruin(self) -> float:
+        return self.ruin_count / self.moments.count if self.moments.count else 0.0
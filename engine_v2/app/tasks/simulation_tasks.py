@@ -0,0 +1,169 @@
+# tasks/simulation_tasks.py - Job bodies executed in the worker process pool
+import logging
+import math
+from typing import Any, Dict, List, Optional
+
+from app.services.job_store import JobStore, JobHeartbeat
+from app.simulations.monte_carlo import MonteCarloSimulator, SimulationConfig
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 15.0  # seconds; well inside the job manager's stale timeout
+BEST_SLIP_LEGS = 3  # largest partial slip streamed while a batch runs
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job was cancelled"""
+
+class JobSuperseded(Exception):
+    """Raised inside a task when its claim was lost (the job was requeued)"""
+
+def process_simulation_task(
+    job_id: str,
+    db_path: str,
+    result_ttl_seconds: float,
+    claim_token: Optional[str] = None,
+    heartbeat_interval: float = HEARTBEAT_INTERVAL
+) -> str:
+    """
+    Run one batch simulation job to completion
+
+    Executes in a worker process: all state is read from and written back to
+    the job store, so nothing but the job id and claim token cross the
+    process boundary. A heartbeat thread keeps the job marked alive while a
+    long match simulates, and every write presents the claim token, so a run
+    that lost its claim stops without touching the job.
+
+    Returns:
+        Final job status
+    """
+    store = JobStore(db_path)
+    job = store.get_job(job_id, include_payload=True)
+    if job is None:
+        return "missing"
+    claim_token = claim_token or store.claim_token(job_id)
+
+    try:
+        with JobHeartbeat(store, job_id, claim_token, heartbeat_interval) as heartbeat:
+            return _run_simulation(store, job, claim_token, heartbeat, result_ttl_seconds)
+    except JobSuperseded:
+        logger.warning(f"Simulation job {job_id} was requeued; abandoning this run")
+        return "superseded"
+    except JobCancelled:
+        store.mark_cancelled(job_id, result_ttl_seconds, claim_token)
+        return "cancelled"
+    except Exception as e:
+        logger.error(f"Simulation job {job_id} failed: {e}", exc_info=True)
+        store.fail(job_id, str(e), result_ttl_seconds, claim_token)
+        return "failed"
+    finally:
+        store.close()
+
+OUTCOMES = ("home", "draw", "away")
+
+def leg_selection(match: Dict[str, Any], odds: Dict[str, float]) -> Dict[str, Any]:
+    """The outcome of a match with the highest probability * odds, as a slip leg"""
+    probs = match.get("probabilities") or {}
+    raw = [float(probs.get(outcome, 1 / 3)) for outcome in OUTCOMES]
+    total = sum(raw)
+    picks = [
+        {"selection": outcome, "probability": p / total, "odds": float(odds[outcome])}
+        for outcome, p in zip(OUTCOMES, raw)
+    ]
+    return max(picks, key=lambda pick: pick["probability"] * pick["odds"])
+
+def best_slips(
+    results: List[Dict[str, Any]],
+    matches: List[Dict[str, Any]],
+    selections: List[Dict[str, Any]],
+    stake: float,
+    max_legs: int
+) -> List[Dict[str, Any]]:
+    """
+    Best accumulator of each size from 1 to max_legs among the matches simulated so far
+
+    A slip pays stake * total_odds only if every leg lands, so its expected
+    value is (prod(p) * prod(odds) - 1) * stake. Every leg's p * odds is
+    positive, so the best k-leg slip is the k legs with the highest p * odds.
+    """
+    order = sorted(
+        range(len(selections)),
+        key=lambda i: selections[i]["probability"] * selections[i]["odds"],
+        reverse=True,
+    )
+    slips = []
+    for num_legs in range(1, min(max_legs, len(order)) + 1):
+        legs = order[:num_legs]
+        hit_probability = math.prod(selections[i]["probability"] for i in legs)
+        total_odds = math.prod(selections[i]["odds"] for i in legs)
+        slips.append({
+            "legs": [
+                {
+                    "match_index": i,
+                    "match_id": matches[i].get("match_id"),
+                    **selections[i],
+                    "expected_value": results[i]["expected_value"],
+                    "risk_of_ruin": results[i]["risk_of_ruin"],
+                }
+                for i in legs
+            ],
+            "total_odds": float(total_odds),
+            "hit_probability": float(hit_probability),
+            "expected_value": float((hit_probability * total_odds - 1) * stake),
+            "std_deviation": float(stake * total_odds * math.sqrt(hit_probability * (1 - hit_probability))),
+            "risk_of_ruin": float(1 - hit_probability),
+        })
+    return slips
+
+def _run_simulation(
+    store: JobStore,
+    job: Dict[str, Any],
+    claim_token: Optional[str],
+    heartbeat: JobHeartbeat,
+    result_ttl_seconds: float
+) -> str:
+    job_id = job["job_id"]
+    payload = job["payload"]
+    matches = payload.get("matches", [])
+    market_odds = payload.get("market_odds", {})
+    stake = float(payload.get("stake", 1.0))
+    simulator = MonteCarloSimulator(SimulationConfig(
+        iterations=int(payload.get("iterations", SimulationConfig.iterations))
+    ))
+
+    max_legs = int(payload.get("best_slip_legs", BEST_SLIP_LEGS))
+
+    results = []
+    selections = []
+    best_legs = None
+    for index, match in enumerate(matches):
+        if heartbeat.lost:
+            raise JobSuperseded()
+        if store.is_cancel_requested(job_id):
+            raise JobCancelled()
+        odds = match.get("odds") or market_odds
+        summary = simulator.simulate_match(match, odds, stake)
+        results.append(summary)
+        selections.append(leg_selection(match, odds))
+        progress = (index + 1) / max(len(matches), 1)
+        if not store.update_progress(job_id, progress, claim_token):
+            raise JobSuperseded()
+
+        # Stream partial results so clients need not wait for the batch
+        store.append_event(job_id, "match_completed", {
+            "match_index": index,
+            "match_id": match.get("match_id"),
+            "progress": progress,
+            "summary": summary,
+            "singles_expected_value": float(sum(r["expected_value"] for r in results)),
+        }, claim_token)
+
+        # Intermediate best slips, whenever the leading selections change
+        slips = best_slips(results, matches, selections, stake, max_legs)
+        legs = [leg["match_index"] for leg in slips[-1]["legs"]]
+        if legs != best_legs:
+            best_legs = legs
+            store.append_event(job_id, "best_slips", {"progress": progress, "slips": slips}, claim_token)
+
+    if not store.complete(job_id, simulator._aggregate_results(results), result_ttl_seconds, claim_token):
+        raise JobSuperseded()
+    return "completed"
@@ -0,0 +1,52 @@
+import asyncio
+from app.services.monte_carlo import MonteCarloAnalyzer, MonteCarloConfig
+from app.services.ensemble import EnsemblePredictor, EnsembleConfig
+
+MATCHES = [
+    {
+        "match_id": f"m{i}",
+        "home_avg_goals": 1.6,
+        "away_avg_goals": 1.1,
+        "home_advantage": 0.2,
+        "venue_factor": 1.0,
+        "selected_market": {"odds": 1.9},
+        "home_form": {"matches_played": 5, "wins": 3, "draws": 1, "losses": 1,
+                      "avg_goals_scored": 1.8, "avg_goals_conceded": 0.9},
+        "away_form": {"matches_played": 5, "wins": 1, "draws": 2, "losses": 2,
+                      "avg_goals_scored": 1.0, "avg_goals_conceded": 1.4},
+        "head_to_head": {"total_matches": 4, "home_wins": 2, "away_wins": 1, "draws": 1},
+    }
+    for i in range(2)
+]
+
+def _ensemble(predict, ml_deadline=1.0):
+    config = EnsembleConfig()
+    config.deadlines["machine_learning"] = ml_deadline
+    monte_carlo = MonteCarloAnalyzer(MonteCarloConfig(simulations=2000, random_seed=1))
+    return EnsemblePredictor(monte_carlo, predict, config)
+
+def test_all_components_blend():
+    """Test every component contributes and blended probabilities sum to one"""
+    async def predict(matches):
+        return [{"home_win": 0.5, "draw": 0.3, "away_win": 0.2} for _ in matches]
+    
+    result = asyncio.run(_ensemble(predict).predict(MATCHES, 10.0))
+    
+    assert not result["degraded"]
+    assert result["slip"]["simulations"] == 2000
+    blended = result["match_probabilities"]["m0"]
+    assert blended["components"] == ["form_h2h", "machine_learning", "monte_carlo"]
+    assert abs(blended["home_win"] + blended["draw"] + blended["away_win"] - 1) < 1e-9
+
+def test_late_component_is_dropped():
+    """Test a component past its deadline is flagged and left out of the blend"""
+    async def slow_predict(matches):
+        await asyncio.sleep(1.0)
+        return []
+    
+    result = asyncio.run(_ensemble(slow_predict, ml_deadline=0.05).predict(MATCHES, 10.0))
+    
+    assert result["degraded"]
+    assert result["components"]["machine_learning"]["status"] == "timeout"
+    assert result["components"]["monte_carlo"]["status"] == "ok"
+    assert "machine_learning" not in result["match_probabilities"]["m1"]["components"]
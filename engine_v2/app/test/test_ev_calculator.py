@@ -0,0 +1,55 @@
+import numpy as np
+from app.services.ev_calculator import EVCalculator, slip_arrays
+
+def _slip(legs, stake=10.0):
+    return {
+        "stake": stake,
+        "match_results": [
+            {"market_odds": odds, "probabilities": {"home_win": p}} for odds, p in legs
+        ],
+    }
+
+def test_batch_matches_single_slip_analysis():
+    """Test the vectorized batch agrees with per-slip analysis and closed forms"""
+    calculator = EVCalculator()
+    slips = [
+        _slip([(2.0, 0.55), (1.8, 0.6)]),
+        _slip([(3.0, 0.3)], stake=5.0),
+        _slip([(1.5, 0.7), (2.2, 0.4), (4.0, 0.2)]),
+    ]
+    
+    batch = calculator.analyze_slips(*slip_arrays(slips))
+    
+    p = 0.55 * 0.6
+    odds = 2.0 * 1.8
+    assert np.isclose(batch["expected_value"][0], 10 * (p * odds - 1))
+    assert np.isclose(batch["variance"][0], 100 * odds ** 2 * p * (1 - p))
+    for i, slip in enumerate(slips):
+        single = calculator.analyze_slip(slip)
+        assert np.isclose(single["expected_value"], batch["expected_value"][i])
+        assert np.isclose(single["sharpe_ratio"], batch["sharpe_ratio"][i])
+        assert single["recommendations"] == batch["recommendations"][i]
+
+def test_simulated_hits_and_recommendations():
+    """Test hit indicators drive the probability and thresholds pick messages"""
+    calculator = EVCalculator()
+    hits = np.array([[1, 1, 0, 1], [0, 0, 0, 0]])
+    
+    batch = calculator.analyze_slips(np.array([2.0, 5.0]), stakes=1.0, hits=hits)
+    
+    assert np.allclose(batch["win_probability"], [0.75, 0.0])
+    assert np.allclose(batch["expected_value"], [0.5, -1.0])
+    assert any("Positive" in r for r in batch["recommendations"][0])
+    assert any("Low hit" in r for r in batch["recommendations"][1])
+
+def test_leg_count_uses_mask_not_odds():
+    """Test a real leg priced at 1.0 still counts towards the leg limit"""
+    calculator = EVCalculator()
+    slips = [_slip([(1.0, 0.99)] * 7), _slip([(2.0, 0.5)])]
+    
+    odds, probabilities, stakes, legs = slip_arrays(slips)
+    batch = calculator.analyze_slips(odds, probabilities, stakes, legs)
+    
+    assert legs.sum(axis=1).tolist() == [7, 1]
+    assert any("Many legs" in r for r in batch["recommendations"][0])
+    assert not any("Many legs" in r for r in batch["recommendations"][1])
@@ -0,0 +1,66 @@
+import asyncio
+from app.services.fidelity import FidelityController, FidelityConfig, ESSENTIAL_COMPONENTS, ALL_COMPONENTS
+from app.services.monte_carlo import MonteCarloAnalyzer, MonteCarloConfig
+
+def test_full_fidelity_when_idle():
+    """Test an idle service runs at the configured ceiling"""
+    controller = FidelityController(FidelityConfig(), cpu_load_fn=lambda: 0.0)
+    fidelity = controller.current()
+    
+    assert fidelity.level == 1.0
+    assert fidelity.simulations == 10000
+    assert fidelity.num_alternatives == 10
+    assert fidelity.components == ALL_COMPONENTS
+
+def test_pressure_scales_down_to_floor():
+    """Test loop lag and queue depth push fidelity toward the quality floor"""
+    config = FidelityConfig(smoothing=1.0)
+    controller = FidelityController(config, queue_depth_fn=lambda: 0)
+    
+    controller.record_sample(loop_lag=0.135, cpu_load=0.0)  # half way to the lag limit
+    half = controller.current()
+    assert 0.4 < half.level < 0.6
+    assert config.min_simulations < half.simulations < config.max_simulations
+    
+    controller.record_sample(loop_lag=0.0, cpu_load=0.0)
+    controller.in_flight = 50
+    saturated = controller.current()
+    assert saturated.simulations == config.min_simulations
+    assert saturated.num_alternatives == config.min_alternatives
+    assert saturated.components == ESSENTIAL_COMPONENTS
+
+def test_reduced_analyzer_copy_leaves_original():
+    """Test fidelity copies change the iteration count without touching the shared analyzer"""
+    analyzer = MonteCarloAnalyzer(MonteCarloConfig(simulations=5000))
+    reduced = analyzer.with_config(simulations=1000)
+    
+    home_goals, _ = reduced.simulate_match(1.5, 1.2, 0.2, 1.0)
+    
+    assert len(home_goals) == 1000
+    assert analyzer.config.simulations == 5000
+
+def test_queue_depth_sampled_in_background():
+    """Test the extra queue is read by the sampler, never by current()"""
+    calls = []
+    
+    def queue_depth():
+        calls.append(1)
+        return 20
+    
+    async def scenario():
+        controller = FidelityController(FidelityConfig(sample_interval=0.01), queue_depth_fn=queue_depth)
+        before = controller.current()
+        await controller.start()
+        await asyncio.sleep(0.1)
+        await controller.stop()
+        sampled = len(calls)
+        after = controller.current()
+        return before, after, sampled
+    
+    before, after, sampled = asyncio.run(scenario())
+    
+    assert before.signals["queue_depth"] == 0
+    assert sampled > 0
+    assert len(calls) == sampled
+    assert after.signals["queue_depth"] == 20
+    assert after.components == ESSENTIAL_COMPONENTS
@@ -0,0 +1,69 @@
+import asyncio
+
+from app.services.job_events import JobEventFeed
+from app.services.job_store import JobStore, COMPLETED
+
+def test_subscribers_share_one_tail(tmp_path):
+    """Test concurrent clients of a job are served by a single store poll loop"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job("batch_simulation", {})
+    claim_token = store.claim()["claim_token"]
+    fetches = []
+    
+    def fetch(job_id, after_seq):
+        fetches.append(after_seq)
+        return store.events_since(job_id, after_seq)
+    
+    feed = JobEventFeed(fetch, poll_interval=0.01)
+    
+    async def collect(after_seq=0):
+        return [event["event"] async for event in feed.subscribe(job_id, after_seq)]
+    
+    async def run():
+        clients = [asyncio.ensure_future(collect()) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        first = store.append_event(job_id, "match_completed", {}, claim_token)
+        await asyncio.sleep(0.05)
+        late = asyncio.ensure_future(collect(after_seq=first))
+        await asyncio.sleep(0.05)
+        store.complete(job_id, {"ok": True}, 60, claim_token)
+        return await asyncio.gather(*clients), await late
+    
+    clients, late = asyncio.run(run())
+    
+    assert clients == [["match_completed", COMPLETED]] * 5
+    assert late == [COMPLETED]
+    assert len(fetches) < 30  # one loop at 0.01s over ~0.15s, not one per client
+    assert feed.tailing() == 0
+
+def test_last_subscriber_leaving_stops_the_tail(tmp_path):
+    """Test a client that goes away while the job is idle stops its polling"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job("batch_simulation", {})
+    fetches = []
+    
+    def fetch(job_id, after_seq):
+        fetches.append(after_seq)
+        return store.events_since(job_id, after_seq)
+    
+    feed = JobEventFeed(fetch, poll_interval=0.01)
+    
+    async def run():
+        async def listen():
+            async for _ in feed.subscribe(job_id):
+                pass
+        
+        client = asyncio.ensure_future(listen())
+        await asyncio.sleep(0.05)
+        assert feed.tailing() == 1
+        client.cancel()
+        await asyncio.gather(client, return_exceptions=True)
+        polled = len(fetches)
+        await asyncio.sleep(0.05)
+        return polled
+    
+    polled = asyncio.run(run())
+    
+    assert polled > 0
+    assert len(fetches) == polled
+    assert feed.tailing() == 0
@@ -0,0 +1,155 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.services import job_manager as job_manager_module
+from app.services.job_manager import JobConfig, JobManager
+from app.services.job_store import JobStore, JobHeartbeat, QUEUED, RUNNING, COMPLETED, CANCELLED, FAILED
+from app.tasks.simulation_tasks import process_simulation_task
+
+def _payload():
+    return {
+        "master_slip_id": "slip-1",
+        "stake": 10.0,
+        "iterations": 2000,
+        "market_odds": {"home": 2.0, "draw": 3.4, "away": 3.8},
+        "matches": [
+            {"probabilities": {"home": 0.5, "draw": 0.27, "away": 0.23}},
+            {"probabilities": {"home": 0.35, "draw": 0.3, "away": 0.35}},
+        ],
+    }
+
+def test_job_lifecycle(tmp_path):
+    """Test a job is claimed once, executed and its result persisted"""
+    db_path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(db_path)
+    job_id = store.create_job("batch_simulation", _payload(), "slip-1")
+    
+    assert store.get_job(job_id)["status"] == QUEUED
+    assert store.claim_next() == job_id
+    assert store.claim_next() is None
+    assert store.get_job(job_id)["status"] == RUNNING
+    
+    assert process_simulation_task(job_id, db_path, 60) == COMPLETED
+    job = store.latest_for_master_slip("slip-1")
+    assert job["status"] == COMPLETED
+    assert job["progress"] == 1
+    assert len(job["result"]["matches"]) == 2
+    
+    events = store.events_since(job_id)
+    names = [event["event"] for event in events]
+    assert names.count("match_completed") == 2
+    assert "best_slips" in names
+    slips = [event["data"]["slips"] for event in events if event["event"] == "best_slips"][-1]
+    assert [len(slip["legs"]) for slip in slips] == [1, 2]
+    # Accumulator EV of the 2-leg slip: home @ 2.0 (p=0.5) and away @ 3.8 (p=0.35)
+    assert [leg["selection"] for leg in slips[1]["legs"]] == ["away", "home"]
+    assert slips[1]["hit_probability"] == pytest.approx(0.5 * 0.35)
+    assert slips[1]["expected_value"] == pytest.approx((0.5 * 0.35 * 2.0 * 3.8 - 1) * 10.0)
+    assert names[-1] == COMPLETED
+    assert events[-1]["data"] == job["result"]
+    assert store.events_since(job_id, events[-1]["seq"]) == []
+
+def _kill_worker(job_id, db_path, ttl, claim_token, heartbeat_interval):
+    os._exit(1)
+
+def _finish_job(job_id, db_path, ttl, claim_token, heartbeat_interval):
+    JobStore(db_path).complete(job_id, {"ok": True}, ttl, claim_token)
+    return COMPLETED
+
+def test_release_returns_claimed_job_to_queue(tmp_path):
+    """Test a released job is queued again and its old claim can no longer write"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job("batch_simulation", _payload())
+    claimed = store.claim()
+    
+    assert claimed["attempt"] == 1
+    assert store.release(job_id, claimed["claim_token"], count_attempt=False)
+    assert not store.release(job_id, claimed["claim_token"])
+    assert store.get_job(job_id)["status"] == QUEUED
+    assert store.claim()["attempt"] == 1
+
+def test_dead_worker_does_not_stall_the_queue(tmp_path, monkeypatch):
+    """Test a job that kills its worker is retried, then failed, and later jobs still run"""
+    monkeypatch.setitem(job_manager_module.TASKS, "kill_worker", _kill_worker)
+    monkeypatch.setitem(job_manager_module.TASKS, "finish", _finish_job)
+    config = JobConfig(db_path=str(tmp_path / "jobs.sqlite3"), max_workers=1, poll_interval=0.05, max_attempts=2)
+    
+    async def run():
+        manager = JobManager(config)
+        await manager.start()
+        try:
+            crashing = await manager.submit("kill_worker", {})
+            healthy = await manager.submit("finish", {})
+            deadline = time.time() + 30
+            while time.time() < deadline:
+                jobs = [await manager.get(crashing), await manager.get(healthy)]
+                if all(job["status"] in (COMPLETED, FAILED) for job in jobs):
+                    return jobs
+                await asyncio.sleep(0.05)
+            raise AssertionError(f"jobs did not finish: {jobs}")
+        finally:
+            await manager.stop()
+    
+    crashed, finished = asyncio.run(run())
+    assert crashed["status"] == FAILED
+    assert crashed["attempts"] == 2
+    assert finished["status"] == COMPLETED
+    assert finished["result"] == {"ok": True}
+
+def test_cancel_and_stale_requeue(tmp_path):
+    """Test queued jobs cancel immediately and silent running jobs are requeued"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    queued = store.create_job("batch_simulation", _payload())
+    running = store.create_job("batch_simulation", _payload())
+    
+    assert store.request_cancel(queued, 60) == CANCELLED
+    assert store.claim_next() == running
+    assert store.requeue_stale(stale_after_seconds=3600) == 0
+    assert store.requeue_stale(stale_after_seconds=-1) == 1
+    assert store.get_job(running)["status"] == QUEUED
+    
+    assert store.request_cancel(running, 60) == CANCELLED
+    assert store.purge_expired() == 0
+
+def test_superseded_run_cannot_finish(tmp_path):
+    """Test a requeued job only accepts writes from the run that claimed it last"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job("batch_simulation", _payload())
+    first = store.claim()
+    
+    assert store.requeue_stale(stale_after_seconds=-1) == 1
+    second = store.claim()
+    assert second["job_id"] == job_id
+    assert second["claim_token"] != first["claim_token"]
+    
+    assert not store.heartbeat(job_id, first["claim_token"])
+    assert not store.update_progress(job_id, 0.5, first["claim_token"])
+    assert store.append_event(job_id, "match_completed", {}, first["claim_token"]) is None
+    assert not store.complete(job_id, {"run": 1}, 60, first["claim_token"])
+    assert store.get_job(job_id)["status"] == RUNNING
+    
+    assert store.complete(job_id, {"run": 2}, 60, second["claim_token"])
+    assert not store.complete(job_id, {"run": 2}, 60, second["claim_token"])
+    job = store.get_job(job_id)
+    assert job["status"] == COMPLETED
+    assert job["result"] == {"run": 2}
+    assert [event["event"] for event in store.events_since(job_id)] == ["restarted", COMPLETED]
+
+def test_heartbeat_keeps_long_job_claimed(tmp_path):
+    """Test a worker's heartbeat stops a slow job being requeued, and notices a lost claim"""
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    job_id = store.create_job("batch_simulation", _payload())
+    claimed = store.claim()
+    
+    with JobHeartbeat(store, job_id, claimed["claim_token"], interval=0.01) as heartbeat:
+        time.sleep(0.2)
+        assert store.requeue_stale(stale_after_seconds=0.1) == 0
+        assert not heartbeat.lost
+    
+    assert store.requeue_stale(stale_after_seconds=-1) == 1
+    with JobHeartbeat(store, job_id, claimed["claim_token"], interval=0.01) as heartbeat:
+        time.sleep(0.05)
+    assert heartbeat.lost
@@ -0,0 +1,35 @@
+import numpy as np
+from app.services.markets import scoreline_histogram, fold_histogram, derive_markets
+from app.services.monte_carlo import MatchSimulationStats
+
+def test_markets_match_direct_sample_counts():
+    """Test every market read from the histogram equals a direct pass over samples"""
+    rng = np.random.default_rng(7)
+    home = rng.poisson(1.6, 50000)
+    away = rng.poisson(1.1, 50000)
+    
+    markets = derive_markets(scoreline_histogram(home, away))
+    
+    assert np.isclose(markets["1x2"]["home_win"], np.mean(home > away))
+    assert np.isclose(markets["1x2"]["draw"], np.mean(home == away))
+    assert np.isclose(markets["over_under"]["2.5"]["over"], np.mean(home + away > 2.5))
+    assert np.isclose(markets["btts"]["yes"], np.mean((home > 0) & (away > 0)))
+    assert np.isclose(markets["correct_score"]["1-1"], np.mean((home == 1) & (away == 1)))
+    
+    handicap = markets["asian_handicap"]
+    assert np.isclose(handicap["-1.5"]["win"], np.mean(home - away >= 2))
+    assert np.isclose(handicap["+0"]["push"], np.mean(home == away))
+    # Quarter line: half on -0.5, half on -1
+    expected_loss = 0.5 * np.mean(home <= away) + 0.5 * np.mean(home < away + 1)
+    assert np.isclose(handicap["-0.75"]["loss"], expected_loss)
+
+def test_stats_counts_exact_beyond_histogram_cap():
+    """Test outcome counts stay exact when scores exceed the stored histogram size"""
+    home = np.array([12, 0, 3, 15])
+    away = np.array([11, 0, 5, 15])
+    
+    stats = MatchSimulationStats.from_samples(home, away)
+    
+    assert (stats.home_wins, stats.draws, stats.away_wins) == (1, 2, 1)
+    assert stats.scoreline_histogram.sum() == 4
+    assert stats.scoreline_histogram.shape == fold_histogram(np.ones((2, 2)), 10).shape
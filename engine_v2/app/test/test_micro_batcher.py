@@ -0,0 +1,68 @@
+import asyncio
+from app.services.micro_batcher import MicroBatcher
+
+def test_concurrent_callers_share_one_batch():
+    """Test rows from concurrent callers are inferred together and scattered back"""
+    calls = []
+    
+    async def predict(rows):
+        calls.append(len(rows))
+        return [row["x"] * 2 for row in rows]
+    
+    batcher = MicroBatcher(predict, max_batch_size=100, max_delay=0.01)
+    
+    async def run():
+        return await asyncio.gather(*[
+            batcher.submit([{"match_id": f"{i}-{j}", "x": i * 10 + j} for j in range(3)])
+            for i in range(4)
+        ])
+    
+    results = asyncio.run(run())
+    
+    assert calls == [12]
+    assert results[2] == [40, 42, 44]
+
+def test_dict_output_and_key_collisions():
+    """Test dict outputs scatter by key and colliding keys go to separate batches"""
+    calls = []
+    
+    async def predict(rows):
+        calls.append([row["match_id"] for row in rows])
+        return {row["match_id"]: row["x"] for row in rows}
+    
+    batcher = MicroBatcher(predict, max_batch_size=100, max_delay=0.01)
+    
+    async def run():
+        return await asyncio.gather(
+            batcher.submit([{"match_id": "A", "x": 1}]),
+            batcher.submit([{"match_id": "A", "x": 2}, {"match_id": "B", "x": 3}]),
+        )
+    
+    first, second = asyncio.run(run())
+    
+    assert len(calls) == 2
+    assert first == {"A": 1}
+    assert second == {"A": 2, "B": 3}
+
+def test_oversized_submission_is_split():
+    """Test no batch exceeds max_batch_size, however many rows one caller submits"""
+    calls = []
+    
+    async def predict(rows):
+        calls.append(len(rows))
+        return [row["x"] for row in rows]
+    
+    batcher = MicroBatcher(predict, max_batch_size=4, max_delay=0.01)
+    
+    async def run():
+        return await asyncio.gather(
+            batcher.submit([{"match_id": "first", "x": -1}]),
+            batcher.submit([{"match_id": i, "x": i} for i in range(10)]),
+        )
+    
+    first, second = asyncio.run(run())
+    
+    assert max(calls) <= 4
+    assert sum(calls) == 11
+    assert first == [-1]
+    assert second == list(range(10))
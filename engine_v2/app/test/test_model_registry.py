@@ -0,0 +1,49 @@
+import numpy as np
+from app.ml_models.registry import ModelRegistry
+
+def test_publish_and_lazy_mmap(tmp_path):
+    """Test arrays come back memory-mapped and read-only"""
+    registry = ModelRegistry(str(tmp_path))
+    weights = np.arange(12, dtype=np.float32).reshape(3, 4)
+    registry.publish("outcome", {"weights": weights}, {"features": 4}, version="v1")
+    
+    artifact = registry.get("outcome")
+    array = artifact["weights"]
+    
+    assert isinstance(array, np.memmap)
+    assert not array.flags.writeable
+    assert np.array_equal(array, weights)
+    assert artifact.metadata["features"] == 4
+    assert registry.preload() == {"outcome": "v1"}
+
+def test_hot_swap_keeps_old_artifact_valid(tmp_path):
+    """Test a new version is picked up without restart while old readers keep working"""
+    registry = ModelRegistry(str(tmp_path), check_interval=0)
+    registry.publish("outcome", {"weights": np.zeros(3)}, version="v1")
+    old = registry.get("outcome")
+    old_weights = old["weights"]
+    
+    registry.publish("outcome", {"weights": np.ones(3)}, version="v2")
+    new = registry.get("outcome")
+    
+    assert new.version == "v2"
+    assert np.array_equal(new["weights"], np.ones(3))
+    assert np.array_equal(old_weights, np.zeros(3))
+    
+    registry.publish("outcome", {"weights": np.full(3, 2.0)}, version="v3")
+    assert registry.prune("outcome", keep=1) == ["v1", "v2"]
+
+def test_prune_by_publish_time_and_unique_default_versions(tmp_path):
+    """Test pruning follows publish order, not version names, and default versions never collide"""
+    registry = ModelRegistry(str(tmp_path))
+    for version in ("v8", "v9", "v10"):
+        registry.publish("outcome", {"weights": np.zeros(2)}, version=version)
+    
+    assert registry.prune("outcome", keep=2) == ["v8"]
+    assert registry.current_version("outcome") == "v10"
+    
+    first = registry.publish("ratings", {"weights": np.zeros(2)})
+    second = registry.publish("ratings", {"weights": np.ones(2)})
+    assert first != second
+    assert registry.current_version("ratings") == second
+    assert registry.prune("ratings", keep=1) == [first]
@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
-from app.services.monte_carlo import MonteCarloAnalyzer, MonteCarloConfig
+from app.services.monte_carlo import MonteCarloAnalyzer, MonteCarloConfig, get_process_pool, _simulate_shard
+from app.services.ev_calculator import EVCalculator, slip_arrays
 
 @pytest.fixture
 def monte_carlo():
@@ -93,4 +94,154 @@ def test_generate_alternative_slips(monte_carlo):
     
     assert len(alternatives) == 3
     assert all("slip_id" in alt for alt in alternatives)
-    assert all("expected_value" in alt for alt in alternatives)
\ No newline at end of file
+    assert all("expected_value" in alt for alt in alternatives)
+
+
+def test_simulate_match_parallel_merges_shards():
+    """Test sharded simulation returns statistics covering the full budget"""
+    analyzer = MonteCarloAnalyzer(
+        MonteCarloConfig(simulations=20001, random_seed=7, workers=2, parallel_threshold=1)
+    )
+    stats = analyzer.simulate_match_parallel(1.8, 1.2, 0.2, 1.0)
+    probs = stats.to_probabilities()
+    
+    assert stats.iterations == 20001
+    assert stats.home_wins + stats.draws + stats.away_wins == 20001
+    assert stats.scoreline_histogram.sum() == 20001
+    assert abs(probs["home_win"] + probs["draw"] + probs["away_win"] - 1.0) < 1e-9
+    assert probs["home_goals_mean"] > probs["away_goals_mean"]
+
+def test_process_pools_of_different_sizes_coexist():
+    """Test asking for a pool of another size leaves pending work on the first one intact"""
+    two = get_process_pool(2)
+    pending = two.submit(_simulate_shard, 1.8, 1.2, 5000, np.random.SeedSequence(3))
+    three = get_process_pool(3)
+    
+    assert three is not two
+    assert get_process_pool(2) is two
+    assert pending.result().iterations == 5000
+
+def test_simulate_slip_parallel_mode():
+    """Test slip simulation routes through the process pool above the threshold"""
+    analyzer = MonteCarloAnalyzer(
+        MonteCarloConfig(simulations=4000, workers=2, parallel_threshold=1000)
+    )
+    matches = [
+        {"match_id": "match_1", "home_avg_goals": 1.8, "away_avg_goals": 1.2, "selected_market": {"odds": 1.85}},
+        {"match_id": "match_2", "home_avg_goals": 1.1, "away_avg_goals": 1.6, "selected_market": {"odds": 2.40}},
+    ]
+    result = analyzer.simulate_slip(matches, 0.5)
+    
+    assert result["simulations"] == 4000
+    assert len(result["match_results"]) == 2
+    assert 0 < result["match_results"][0]["probabilities"]["home_win"] < 1
+
+def test_simulate_match_chunked_matches_budget():
+    """Test chunked simulation folds every block into the statistics"""
+    analyzer = MonteCarloAnalyzer(MonteCarloConfig(simulations=10500, chunk_size=1000))
+    stats = analyzer.simulate_match_chunked(1.8, 1.2, 0.2, 1.0)
+    
+    assert stats.iterations == 10500
+    assert stats.scoreline_histogram.sum() == 10500
+    assert stats.to_probabilities()["home_win"] > stats.to_probabilities()["away_win"]
+
+def test_reweight_probabilities_matches_analytic():
+    """Test likelihood-ratio reweighting tracks the Poisson model at new rates"""
+    from scipy import stats
+    analyzer = MonteCarloAnalyzer(MonteCarloConfig(simulations=200000, random_seed=11))
+    reference = analyzer.simulate_reference([{"home_avg_goals": 1.5, "away_avg_goals": 1.2}])[0]
+    
+    unchanged = analyzer.reweight_probabilities(reference, reference.home_rate, reference.away_rate)
+    assert abs(unchanged["home_win"] - reference.stats.home_wins / reference.stats.iterations) < 1e-3
+    
+    home_rate, away_rate = reference.home_rate * 1.1, reference.away_rate * 0.9
+    reweighted = analyzer.reweight_probabilities(reference, home_rate, away_rate)
+    goals = np.arange(30)
+    joint = np.outer(stats.poisson.pmf(goals, home_rate), stats.poisson.pmf(goals, away_rate))
+    assert abs(reweighted["home_win"] - np.tril(joint, -1).sum()) < 0.01
+    assert abs(reweighted["home_win"] + reweighted["draw"] + reweighted["away_win"] - 1.0) < 1e-9
+
+def test_generate_alternative_slips_leaves_base_untouched(monte_carlo):
+    """Test variations never mutate the caller's match dictionaries"""
+    base_slip = {
+        "master_slip_id": "test_slip_002",
+        "stake": 0.5,
+        "matches": [{"match_id": "match_1", "home_avg_goals": 1.8, "away_avg_goals": 1.2, "selected_market": {"odds": 1.85}}],
+    }
+    
+    alternatives = monte_carlo.generate_alternative_slips(base_slip, num_alternatives=6)
+    
+    assert len(alternatives) == 6
+    assert base_slip["matches"][0]["selected_market"]["odds"] == 1.85
+    assert "home_advantage" not in base_slip["matches"][0]
+
+def test_sweep_parameters_ranks_variations(monte_carlo):
+    """Test grid sweeps agree between the analytic and simulated outcome models"""
+    from app.services.monte_carlo import perturbation_grid
+    matches = [
+        {"match_id": "match_1", "home_avg_goals": 1.8, "away_avg_goals": 1.2, "selected_market": {"odds": 1.85}},
+        {"match_id": "match_2", "home_avg_goals": 1.4, "away_avg_goals": 1.3, "selected_market": {"odds": 2.10}},
+    ]
+    grid = perturbation_grid(odds=[0.95, 1.0, 1.05], home_avg_goals=[0.9, 1.0, 1.1])
+    
+    analytic = monte_carlo.sweep_parameters(matches, 1.0, grid)
+    analyzer = MonteCarloAnalyzer(MonteCarloConfig(simulations=200000, random_seed=3))
+    simulated = analyzer.sweep_parameters(matches, 1.0, grid, method="simulated")
+    
+    assert len(analytic) == 9
+    evs = [row["expected_value"] for row in analytic]
+    assert evs == sorted(evs, reverse=True)
+    assert analytic[0]["factors"]["odds"] == [1.05, 1.05]
+    by_variation = {row["variation"]: row for row in simulated}
+    for row in analytic:
+        assert abs(row["expected_value"] - by_variation[row["variation"]]["expected_value"]) < 0.05
+
+def test_generate_alternative_slips_prunes_with_bounds():
+    """Test screening keeps at least top_k alternatives and simulates fewer than requested"""
+    # Bounds hold for all 200 alternatives at once, so they need enough draws to be tight
+    monte_carlo = MonteCarloAnalyzer(MonteCarloConfig(simulations=20000, random_seed=42))
+    base_slip = {
+        "master_slip_id": "test_slip_003",
+        "stake": 1.0,
+        "matches": [
+            {"match_id": "match_1", "home_avg_goals": 1.8, "away_avg_goals": 1.2, "selected_market": {"odds": 1.85}},
+            {"match_id": "match_2", "home_avg_goals": 1.2, "away_avg_goals": 1.4, "selected_market": {"odds": 2.60}},
+        ],
+    }
+    
+    alternatives = monte_carlo.generate_alternative_slips(base_slip, num_alternatives=200, top_k=5)
+    
+    assert 5 <= len(alternatives) < 200
+    evs = [alt["expected_value"] for alt in alternatives]
+    assert evs == sorted(evs, reverse=True)
+
+def test_bound_alternatives_widen_with_candidate_count(monte_carlo):
+    """Test the bounds are corrected for the number of alternatives screened together"""
+    matches = [
+        {"match_id": "match_1", "home_avg_goals": 1.8, "away_avg_goals": 1.2, "selected_market": {"odds": 1.85}},
+        {"match_id": "match_2", "home_avg_goals": 1.2, "away_avg_goals": 1.4, "selected_market": {"odds": 2.60}},
+    ]
+    factors = monte_carlo._variation_factors(100, len(matches))
+    
+    alone = monte_carlo.bound_alternatives(matches, 1.0, factors[:1])
+    screened = monte_carlo.bound_alternatives(matches, 1.0, factors)
+    
+    assert screened["ev_lower"][0] < alone["ev_lower"][0] <= alone["expected_value"][0]
+    assert screened["ev_upper"][0] > alone["ev_upper"][0] >= alone["expected_value"][0]
+
+
+def test_alternative_ev_matches_ev_calculator(monte_carlo):
+    """Test alternatives are ranked on the same accumulator EV the calculator reports"""
+    base_slip = {
+        "master_slip_id": "test_slip_004",
+        "stake": 2.0,
+        "matches": [
+            {"match_id": "match_1", "home_avg_goals": 1.8, "away_avg_goals": 1.2, "selected_market": {"odds": 1.85}},
+            {"match_id": "match_2", "home_avg_goals": 1.2, "away_avg_goals": 1.4, "selected_market": {"odds": 2.60}},
+        ],
+    }
+    
+    alternatives = monte_carlo.generate_alternative_slips(base_slip, num_alternatives=20, top_k=5)
+    analysis = EVCalculator().analyze_slips(*slip_arrays(alternatives))
+    
+    assert np.allclose([alt["expected_value"] for alt in alternatives], analysis["expected_value"])
@@ -0,0 +1,31 @@
+import asyncio
+from app.services.single_flight import SingleFlight, request_key
+
+def test_request_key_ignores_timestamp_and_order():
+    """Test keys depend on content only, not timestamp or key order"""
+    a = {"master_slip_id": "S1", "stake": 10, "timestamp": "2024-01-01T00:00:00"}
+    b = {"stake": 10, "master_slip_id": "S1", "timestamp": "2024-01-01T00:00:05"}
+    c = {"master_slip_id": "S1", "stake": 20, "timestamp": "2024-01-01T00:00:00"}
+    
+    assert request_key(a) == request_key(b)
+    assert request_key(a) != request_key(c)
+
+def test_concurrent_duplicates_share_one_computation():
+    """Test a burst of identical calls runs the computation once"""
+    flight = SingleFlight()
+    runs = []
+    
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+    
+    async def burst():
+        return await asyncio.gather(*[flight.do("k", compute) for _ in range(8)])
+    
+    results = asyncio.run(burst())
+    
+    assert len(runs) == 1
+    assert all(r is results[0] for r in results)
+    assert flight.coalesced == 7
+    assert flight.in_flight() == 0
@@ -0,0 +1,60 @@
+import numpy as np
+from app.simulations.streaming import RunningMoments, QuantileSketch
+from app.simulations.monte_carlo import MonteCarloSimulator, SimulationConfig
+
+def test_running_moments_match_numpy():
+    """Test blockwise moments agree with a single pass over all samples"""
+    rng = np.random.default_rng(3)
+    samples = rng.normal(2.0, 1.5, 50000)
+    
+    moments = RunningMoments()
+    for block in np.array_split(samples, 7):
+        moments.update(block)
+    
+    assert moments.count == samples.size
+    assert abs(moments.mean - samples.mean()) < 1e-9
+    assert abs(moments.std - samples.std()) < 1e-9
+
+def test_quantile_sketch_bounded_and_accurate():
+    """Test the sketch stays small while tracking percentiles"""
+    rng = np.random.default_rng(5)
+    samples = rng.exponential(1.0, 200000)
+    
+    sketch = QuantileSketch(compression=100)
+    for block in np.array_split(samples, 20):
+        sketch.update(block)
+    
+    assert sketch.count == samples.size
+    assert sketch._means.size <= 100
+    for q in (0.05, 0.5, 0.95):
+        assert abs(sketch.quantile(q) - np.quantile(samples, q)) < 0.05
+
+def test_simulator_streams_returns():
+    """Test the batch simulator reports streaming risk metrics"""
+    import asyncio
+    simulator = MonteCarloSimulator(SimulationConfig(iterations=30000, chunk_size=4096))
+    match = {"probabilities": {"home": 0.5, "draw": 0.3, "away": 0.2}}
+    odds = {"home": 2.0, "draw": 3.2, "away": 4.5}
+    
+    result = asyncio.run(simulator.run_batch_simulations([match, match], odds, 1.0))
+    
+    assert result["iterations"] == 30000
+    assert len(result["matches"]) == 2
+    expected = 0.5 * 1.0 + 0.3 * 2.2 + 0.2 * 3.5
+    assert abs(result["matches"][0]["expected_value"] - expected) < 0.05
+    assert set(result["matches"][0]["percentile_analysis"]) == {"p5", "p25", "p50", "p75", "p95"}
+
+def test_inverse_cdf_outcome_frequencies():
+    """Test the shared uniform matrix reproduces each match's outcome distribution"""
+    simulator = MonteCarloSimulator(SimulationConfig(iterations=200000, chunk_size=50000, random_seed=11))
+    matches = [
+        {"probabilities": {"home": 0.6, "draw": 0.25, "away": 0.15}},
+        {"probabilities": {"home": 0.0, "draw": 0.5, "away": 0.5}},
+    ]
+    odds = {"home": 2.0, "draw": 3.0, "away": 5.0}
+    
+    home_heavy, no_home = simulator.simulate_matches(matches, [odds, odds], 1.0)
+    
+    assert abs(home_heavy["expected_value"] - (0.6 * 1.0 + 0.25 * 2.0 + 0.15 * 4.0)) < 0.02
+    assert abs(no_home["expected_value"] - (0.5 * 2.0 + 0.5 * 4.0)) < 0.02
+    assert no_home["risk_of_ruin"] == 0.0
@@ -0,0 +1,312 @@
+# python_generator/aggregates.py
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+POINTS = {'home': 3, 'draw': 1, 'away': 0, 'W': 3, 'D': 1, 'L': 0}
+
+RECENT_MEETINGS = 10
+SEARCH_LIMIT = 20
+FORM_WINDOW = 10  # matches per team form
+FORM_STRING_LENGTH = 5
+
+def _result(home_score: int, away_score: int) -> str:
+    if home_score > away_score:
+        return 'home'
+    if away_score > home_score:
+        return 'away'
+    return 'draw'
+
+def window_patterns(results: List[str]) -> List[str]:
+    """identify_patterns over a newest-first result window"""
+    patterns = []
+    if len(results) < 3:
+        return patterns
+
+    streak, current = 1, results[0]
+    for result in results[1:]:
+        if result == current:
+            streak += 1
+        else:
+            if streak >= 3:
+                patterns.append(f"{current}_streak_{streak}")
+            streak, current = 1, result
+
+    if len(results) >= 4 and all(results[i] == results[i - 2] for i in range(2, len(results))):
+        patterns.append("alternating_pattern")
+
+    home, away, total = results.count('home'), results.count('away'), len(results)
+    if home > 0 and away > 0:
+        if home / total > 0.7:
+            patterns.append("strong_home_bias")
+        elif away / total > 0.7:
+            patterns.append("strong_away_bias")
+    return patterns
+
+class PairAggregate:
+    """
+    Running head-to-head state for one (home, away) pairing
+
+    Totals cover the last `limit` meetings (None: all of them): each result
+    enters a ring buffer and is subtracted again when it falls out. The
+    newest RECENT_MEETINGS of those meetings and the current streak are kept
+    for the recent analysis.
+    """
+
+    def __init__(self, limit: Optional[int] = SEARCH_LIMIT):
+        self.window: Deque[Tuple[str, int, int]] = deque(maxlen=limit)
+        self.home_wins = self.away_wins = self.draws = 0
+        self.home_goals = self.away_goals = 0
+        # Newest first; like the search route, never more than `limit` meetings
+        recent = RECENT_MEETINGS if limit is None else min(limit, RECENT_MEETINGS)
+        self.recent: Deque[Dict] = deque(maxlen=recent)
+        self.recent_counts = {'home': 0, 'draw': 0, 'away': 0}
+        self.streak_result: Optional[str] = None
+        self.streak_length = 0
+
+    def _count(self, result: str, home_goals: int, away_goals: int, sign: int):
+        if result == 'home':
+            self.home_wins += sign
+        elif result == 'away':
+            self.away_wins += sign
+        else:
+            self.draws += sign
+        self.home_goals += sign * home_goals
+        self.away_goals += sign * away_goals
+
+    def add(self, home_score: int, away_score: int, match_date: str = '',
+            league: str = '', venue: str = 'home'):
+        result = _result(home_score, away_score)
+
+        if self.window.maxlen is not None and len(self.window) == self.window.maxlen:
+            self._count(*self.window[0], sign=-1)
+        self.window.append((result, home_score, away_score))
+        self._count(result, home_score, away_score, sign=1)
+
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_counts[self.recent[-1]['result']] -= 1
+        self.recent.appendleft({
+            'date': match_date,
+            'result': result,
+            'score': f"{home_score}-{away_score}",
+            'competition': league,
+            'venue': venue,
+        })
+        self.recent_counts[result] += 1
+
+        if result == self.streak_result:
+            self.streak_length += 1
+        else:
+            self.streak_result, self.streak_length = result, 1
+
+    @property
+    def total(self) -> int:
+        return self.home_wins + self.away_wins + self.draws
+
+    def recent_analysis(self) -> Dict:
+        """analyze_recent_meetings from the running counts and the recent buffer"""
+        total = len(self.recent)
+        if total == 0:
+            return {'trend': 'neutral', 'momentum': 0, 'patterns': []}
+
+        results = [m['result'] for m in self.recent]
+        home_pct = self.recent_counts['home'] / total * 100
+        away_pct = self.recent_counts['away'] / total * 100
+
+        momentum = 0
+        if total >= 6:
+            momentum = (sum(POINTS[r] for r in results[:3]) - sum(POINTS[r] for r in results[3:6])) / 9
+
+        if home_pct > 60:
+            trend = 'strong_home'
+        elif home_pct > 55:
+            trend = 'moderate_home'
+        elif away_pct > 60:
+            trend = 'strong_away'
+        elif away_pct > 55:
+            trend = 'moderate_away'
+        elif abs(home_pct - away_pct) < 10:
+            trend = 'balanced'
+        else:
+            trend = 'neutral'
+
+        return {
+            'trend': trend,
+            'momentum': round(momentum, 3),
+            'recent_home_win_pct': round(home_pct, 1),
+            'recent_away_win_pct': round(away_pct, 1),
+            'recent_draw_pct': round(self.recent_counts['draw'] / total * 100, 1),
+            'patterns': window_patterns(results),
+            'sequence': ''.join(r[0].upper() for r in results),
+        }
+
+    def record(self) -> Dict:
+        last_meetings = list(self.recent)
+        return {
+            'home_wins': self.home_wins,
+            'away_wins': self.away_wins,
+            'draws': self.draws,
+            'total_meetings': self.total,
+            'home_goals': self.home_goals,
+            'away_goals': self.away_goals,
+            'last_meeting_date': last_meetings[0]['date'] if last_meetings else None,
+            'last_meeting_result': last_meetings[0]['result'] if last_meetings else None,
+            'last_meetings': last_meetings,
+            'recent_analysis': self.recent_analysis(),
+            'current_streak': {'result': self.streak_result, 'length': self.streak_length},
+        }
+
+class TeamFormAggregate:
+    """
+    Rolling form over a team's last `window` matches (optionally one venue)
+
+    Per-match outcomes sit in a ring buffer with running sums, so adding a
+    result and evicting the oldest are both O(1).
+    """
+
+    FIELDS = ('wins', 'draws', 'losses', 'goals_scored', 'goals_conceded', 'clean_sheets', 'failed_to_score')
+
+    def __init__(self, window: int = FORM_WINDOW):
+        self.matches: Deque[Dict] = deque(maxlen=window)
+        self.sums = dict.fromkeys(self.FIELDS, 0)
+        self.streak_outcome: Optional[str] = None
+        self.streak_length = 0
+
+    def add(self, goals_scored: int, goals_conceded: int, match_date: str = '',
+            opponent: str = '', venue: str = 'home'):
+        outcome = 'W' if goals_scored > goals_conceded else ('L' if goals_scored < goals_conceded else 'D')
+        entry = {
+            'outcome': outcome,
+            'goals_scored': goals_scored,
+            'goals_conceded': goals_conceded,
+            'opponent': opponent,
+            'venue': venue,
+            'date': match_date,
+        }
+        counts = {
+            'wins': outcome == 'W',
+            'draws': outcome == 'D',
+            'losses': outcome == 'L',
+            'goals_scored': goals_scored,
+            'goals_conceded': goals_conceded,
+            'clean_sheets': goals_conceded == 0,
+            'failed_to_score': goals_scored == 0,
+        }
+
+        if len(self.matches) == self.matches.maxlen:
+            evicted = self.matches[0]['_counts']
+            for field in self.FIELDS:
+                self.sums[field] -= evicted[field]
+        entry['_counts'] = counts
+        self.matches.append(entry)
+        for field in self.FIELDS:
+            self.sums[field] += counts[field]
+
+        if outcome == self.streak_outcome:
+            self.streak_length += 1
+        else:
+            self.streak_outcome, self.streak_length = outcome, 1
+
+    def form(self) -> Dict:
+        """Summary in the shape of aggregate_recent_forms' output"""
+        played = len(self.matches)
+        if played == 0:
+            return {}
+        sums = self.sums
+        outcomes = [m['outcome'] for m in self.matches]  # oldest first
+        points = 3 * sums['wins'] + sums['draws']
+
+        # No API form record here: rating is points per available point on a
+        # 0-10 scale, momentum the last three vs the three before (-1..1)
+        momentum = 0.0
+        if played >= 6:
+            momentum = (sum(POINTS[o] for o in outcomes[-3:]) - sum(POINTS[o] for o in outcomes[-6:-3])) / 9
+
+        return {
+            'matches_played': played,
+            'wins': sums['wins'],
+            'draws': sums['draws'],
+            'losses': sums['losses'],
+            'goals_scored': sums['goals_scored'],
+            'goals_conceded': sums['goals_conceded'],
+            'avg_goals_scored': round(sums['goals_scored'] / played, 2),
+            'avg_goals_conceded': round(sums['goals_conceded'] / played, 2),
+            'clean_sheets': sums['clean_sheets'],
+            'failed_to_score': sums['failed_to_score'],
+            'form_rating': round(points / (3 * played) * 10, 2),
+            'form_momentum': round(momentum, 3),
+            'win_probability': round(sums['wins'] / played, 3),
+            'form_string': ''.join(outcomes[-FORM_STRING_LENGTH:]),
+            'raw_form': [
+                {k: v for k, v in m.items() if k != '_counts'} for m in reversed(self.matches)
+            ],
+            'current_streak': {'outcome': self.streak_outcome, 'length': self.streak_length},
+        }
+
+class AggregateEngine:
+    """
+    Head-to-head and form aggregates kept current one result at a time
+
+    record_result() updates the pairing and both teams' overall and venue
+    forms in constant time, so lookups reflect a match as soon as it is
+    recorded. Results must be fed in kick-off order. lookup() has the same
+    signature and output as H2HIndex.lookup, so the engine can be attached
+    to EnhancedHeadToHeadAnalyzer as its h2h_index.
+    """
+
+    def __init__(self, h2h_limit: Optional[int] = SEARCH_LIMIT, form_window: int = FORM_WINDOW):
+        self.h2h_limit = h2h_limit
+        self.form_window = form_window
+        self.pairs: Dict[Tuple[str, str], PairAggregate] = {}
+        self.forms: Dict[Tuple[str, Optional[str]], TeamFormAggregate] = {}
+        self.last_date = ''
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Dict], **kwargs) -> "AggregateEngine":
+        """Replay completed matches (sorted by match_date here)"""
+        engine = cls(**kwargs)
+        completed = [m for m in matches if m.get('home_score') is not None and m.get('away_score') is not None]
+        for match in sorted(completed, key=lambda m: m.get('match_date') or ''):
+            engine.record_result(match)
+        return engine
+
+    def _form(self, team: str, venue: Optional[str]) -> TeamFormAggregate:
+        key = (team, venue)
+        if key not in self.forms:
+            self.forms[key] = TeamFormAggregate(self.form_window)
+        return self.forms[key]
+
+    def record_result(self, match: Dict):
+        """Fold one finished match (API match shape) into every aggregate it touches"""
+        home, away = match['home_team_code'], match['away_team_code']
+        home_score, away_score = int(match['home_score']), int(match['away_score'])
+        match_date = match.get('match_date') or ''
+        if match_date and match_date < self.last_date:
+            logger.warning(f"Result for {home} v {away} on {match_date} arrived after {self.last_date}")
+        self.last_date = max(self.last_date, match_date)
+
+        pair = self.pairs.get((home, away))
+        if pair is None:
+            pair = self.pairs[(home, away)] = PairAggregate(self.h2h_limit)
+        pair.add(home_score, away_score, match_date, match.get('league', ''), match.get('venue', 'home'))
+
+        for team, opponent, scored, conceded, venue in (
+            (home, away, home_score, away_score, 'home'),
+            (away, home, away_score, home_score, 'away'),
+        ):
+            self._form(team, None).add(scored, conceded, match_date, opponent, venue)
+            self._form(team, venue).add(scored, conceded, match_date, opponent, venue)
+
+    def __contains__(self, pair: Tuple[str, str]) -> bool:
+        return pair in self.pairs
+
+    def lookup(self, home_team: str, away_team: str) -> Optional[Dict]:
+        pair = self.pairs.get((home_team, away_team))
+        return pair.record() if pair else None
+
+    def team_form(self, team: str, venue: Optional[str] = None) -> Optional[Dict]:
+        """Current form for a team, overall or at one venue ('home'/'away')"""
+        aggregate = self.forms.get((team, venue))
+        return aggregate.form() if aggregate else None
@@ -1,4 +1,5 @@
 # python_generator/team_form_analyzer.py
+import asyncio
 import requests
 import numpy as np
 import json
@@ -7,6 +8,13 @@ from dataclasses import dataclass
 from datetime import datetime
 import logging
 
+from api_client import AsyncApiClient, CachedApiClient, DEFAULT_HEADERS, shared_client
+from data_loader import ApiLoaders
+from snapshot import SnapshotClient
+from form_features import BatchFormResult, pack_match_data, score_batch
+from feature_store import FeatureStore, fingerprint
+from aggregates import AggregateEngine
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,15 +30,23 @@ class FormPrediction:
     probabilities: Dict[str, float]  # home, draw, away probabilities
 
 class EnhancedTeamFormAnalyzer:
-    def __init__(self, api_base_url: str = "http://localhost:8000/api"):
+    def __init__(self, api_base_url: str = "http://localhost:8000/api",
+                 max_concurrency: int = 50, requests_per_second: float = 100.0,
+                 http_client: Optional[CachedApiClient] = None,
+                 aggregates: Optional[AggregateEngine] = None):
         self.api_base_url = api_base_url
-        self.session = requests.Session()
         
-        # Configure session headers
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        })
+        # GETs go through the cache shared with the other analyzers
+        self.http = http_client or shared_client()
+        self.session = self.http.session
+        self.default_headers = dict(DEFAULT_HEADERS)
+        
+        # Live form from recorded results, preferred over the recent-forms route
+        self.aggregates = aggregates
+        
+        # Limits for the concurrent (async) fetch path
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
         
         # Feature weights for ML predictions
         self.feature_weights = {
@@ -48,12 +64,17 @@ class EnhancedTeamFormAnalyzer:
             'confidence_threshold': 0.65,
         }
     
+    @classmethod
+    def from_snapshot(cls, path: str, **kwargs) -> "EnhancedTeamFormAnalyzer":
+        """Analyzer reading a local snapshot (SQLite file or JSONL directory) instead of the API"""
+        return cls(http_client=SnapshotClient.open(path), **kwargs)
+    
     def fetch_match_data(self, match_id: int) -> Optional[Dict]:
         """Fetch complete match data including teams and forms"""
         try:
             # Fetch match details
             match_url = f"{self.api_base_url}/matches/{match_id}"
-            match_response = self.session.get(match_url, timeout=10)
+            match_response = self.http.get(match_url, timeout=10)
             
             if match_response.status_code != 200:
                 logger.error(f"Failed to fetch match {match_id}: {match_response.status_code}")
@@ -101,7 +122,7 @@ class EnhancedTeamFormAnalyzer:
         """Fetch team details and statistics"""
         try:
             url = f"{self.api_base_url}/teams/{team_code}"
-            response = self.session.get(url, timeout=5)
+            response = self.http.get(url, timeout=5)
             
             if response.status_code == 200:
                 return response.json().get('data', {})
@@ -122,7 +143,7 @@ class EnhancedTeamFormAnalyzer:
             }
             
             url = f"{self.api_base_url}/team-forms"
-            response = self.session.get(url, params=params, timeout=5)
+            response = self.http.get(url, params=params, timeout=5)
             
             if response.status_code == 200:
                 data = response.json().get('data', [])
@@ -138,6 +159,10 @@ class EnhancedTeamFormAnalyzer:
     
     def fetch_team_recent_forms(self, team_code: str, venue: str, limit: int = 5) -> Optional[Dict]:
         """Fetch team's recent forms"""
+        form = self.engine_form(team_code, venue)
+        if form:
+            return form
+        
         try:
             params = {
                 'team_id': team_code,
@@ -148,7 +173,7 @@ class EnhancedTeamFormAnalyzer:
             }
             
             url = f"{self.api_base_url}/team-forms"
-            response = self.session.get(url, params=params, timeout=5)
+            response = self.http.get(url, params=params, timeout=5)
             
             if response.status_code == 200:
                 data = response.json().get('data', [])
@@ -166,7 +191,7 @@ class EnhancedTeamFormAnalyzer:
         """Fetch head-to-head data for match"""
         try:
             url = f"{self.api_base_url}/head-to-head/{match_id}"
-            response = self.session.get(url, timeout=5)
+            response = self.http.get(url, timeout=5)
             
             if response.status_code == 200:
                 return response.json().get('data', {})
@@ -176,6 +201,68 @@ class EnhancedTeamFormAnalyzer:
             logger.error(f"Error fetching head-to-head for match {match_id}: {e}")
             return None
     
+    async def fetch_match_data_loaded(self, loaders: ApiLoaders, match_id: int) -> Optional[Dict]:
+        """
+        Async fetch_match_data through batching loaders
+        
+        Lookups from every match in a batch that are issued in the same
+        scheduler tick are coalesced into one bulk request per resource.
+        """
+        try:
+            match_data, head_to_head = await asyncio.gather(
+                loaders.matches.load(match_id),
+                loaders.head_to_head.load(match_id),
+            )
+            
+            if not match_data:
+                logger.error(f"No data for match {match_id}")
+                return None
+            
+            match_data = dict(match_data)
+            home_team_code = match_data.get('home_team_code')
+            away_team_code = match_data.get('away_team_code')
+            
+            if not home_team_code or not away_team_code:
+                logger.error(f"Missing team codes for match {match_id}")
+                return None
+            
+            (match_data['home_team_details'], match_data['away_team_details'],
+             match_data['home_team_form'], match_data['away_team_form']) = await asyncio.gather(
+                loaders.teams.load(home_team_code),
+                loaders.teams.load(away_team_code),
+                self._load_team_form(loaders, match_id, home_team_code, 'home'),
+                self._load_team_form(loaders, match_id, away_team_code, 'away'),
+            )
+            match_data['head_to_head'] = head_to_head
+            
+            return match_data
+            
+        except Exception as e:
+            logger.error(f"Error fetching match {match_id}: {e}")
+            return None
+    
+    async def _load_team_form(self, loaders: ApiLoaders, match_id: int,
+                              team_code: str, venue: str, limit: int = 5) -> Optional[Dict]:
+        """Form for the match, falling back to aggregated recent forms like fetch_team_form_for_match"""
+        form = await loaders.team_forms.load((match_id, team_code, venue))
+        if form:
+            return form
+        
+        form = self.engine_form(team_code, venue)
+        if form:
+            return form
+        
+        recent = await loaders.recent_forms.load((team_code, venue, limit))
+        if recent:
+            return self.aggregate_recent_forms(recent)
+        return None
+    
+    def engine_form(self, team_code: str, venue: str) -> Optional[Dict]:
+        """Form kept current by the attached AggregateEngine, if it has seen the team"""
+        if self.aggregates is None:
+            return None
+        return self.aggregates.team_form(team_code, venue)
+    
     def aggregate_recent_forms(self, forms: List[Dict]) -> Dict:
         """Calculate aggregate statistics from multiple forms"""
         if not forms:
@@ -404,10 +491,13 @@ class EnhancedTeamFormAnalyzer:
     
     def analyze_match(self, match_id: int) -> Dict:
         """Complete match analysis including form, team stats, and predictions"""
+        # Fetch all match data
+        match_data = self.fetch_match_data(match_id)
+        return self.analyze_match_data(match_id, match_data)
+    
+    def analyze_match_data(self, match_id: int, match_data: Optional[Dict]) -> Dict:
+        """Analyze already-fetched match data (shared by the sync and async paths)"""
         try:
-            # Fetch all match data
-            match_data = self.fetch_match_data(match_id)
-            
             if not match_data:
                 logger.error(f"No data available for match {match_id}")
                 return {
@@ -472,7 +562,8 @@ class EnhancedTeamFormAnalyzer:
                     form_prediction, home_strength, away_strength
                 ),
                 'ml_features': self.prepare_ml_features(
-                    home_form, away_form, home_team, away_team, head_to_head
+                    home_form, away_form, home_team, away_team, head_to_head,
+                    comparison=form_prediction.features
                 ),
             }
             
@@ -676,9 +767,10 @@ class EnhancedTeamFormAnalyzer:
     
     def prepare_ml_features(self, home_form: Dict, away_form: Dict,
                            home_team: Dict, away_team: Dict,
-                           h2h_data: Dict) -> Dict:
-        """Prepare features for ML model training"""
-        comparison = self.calculate_form_comparison(home_form, away_form)
+                           h2h_data: Dict, comparison: Optional[Dict] = None) -> Dict:
+        """Prepare features for ML model training (pass comparison to reuse one already computed)"""
+        if comparison is None:
+            comparison = self.calculate_form_comparison(home_form, away_form)
         
         features = {
             # Form features
@@ -720,22 +812,101 @@ class EnhancedTeamFormAnalyzer:
         
         return features
     
-    def batch_analyze_matches(self, match_ids: List[int]) -> Dict:
-        """Analyze multiple matches in batch"""
+    def predict_batch(self, match_data: List[Optional[Dict]]) -> BatchFormResult:
+        """
+        Form, strength, head-to-head and combined predictions for many matches
+        
+        Vectorised equivalent of running analyze_match_data's prediction
+        steps per match: match_data entries are fetch_match_data results and
+        the returned arrays are in the same order.
+        """
+        return score_batch(pack_match_data(match_data), self.feature_weights, self.ml_params)
+    
+    def store_ml_features(self, store: FeatureStore, match_data: Dict[int, Dict]) -> np.ndarray:
+        """
+        prepare_ml_features rows for {match_id: match data}, via a feature store
+        
+        Only matches that are new or whose data changed since they were stored
+        are recomputed (in one vectorised batch); returns the rows in
+        match_data order, with columns store.feature_names.
+        """
+        match_ids = list(match_data)
+        fingerprints = [fingerprint(match_data[match_id]) for match_id in match_ids]
+        
+        def compute(indices: List[int]) -> Dict[str, np.ndarray]:
+            batch = [match_data[match_ids[i]] for i in indices]
+            return score_batch(pack_match_data(batch), self.feature_weights, self.ml_params).ml_features
+        
+        return store.get_or_compute(match_ids, fingerprints, compute)
+    
+    def batch_analyze_matches(self, match_ids: List[int], concurrent: bool = False) -> Dict:
+        """
+        Analyze multiple matches in batch
+        
+        By default matches are fetched one by one over the blocking session.
+        concurrent=True fetches the data for all matches at once on the async
+        client; inside a running event loop (use batch_analyze_matches_async
+        there) it falls back to the sequential path.
+        """
+        if concurrent:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(self.batch_analyze_matches_async(match_ids))
+            logger.warning("batch_analyze_matches called inside an event loop; fetching sequentially")
+        
         results = []
         errors = []
         
         for match_id in match_ids:
             try:
                 result = self.analyze_match(match_id)
-                if 'error' in result:
-                    errors.append({'match_id': match_id, 'error': result['error']})
-                else:
-                    results.append(result)
+                self._collect_result(match_id, result, results, errors)
             except Exception as e:
                 errors.append({'match_id': match_id, 'error': str(e)})
         
-        # Calculate overall statistics
+        return self.summarize_batch(results, errors)
+    
+    async def batch_analyze_matches_async(self, match_ids: List[int]) -> Dict:
+        """Analyze multiple matches, fetching all their data concurrently"""
+        async with AsyncApiClient(
+            headers=self.default_headers,
+            max_concurrency=self.max_concurrency,
+            requests_per_second=self.requests_per_second,
+        ) as transport:
+            # Cached view: a team playing in several fixtures is fetched once
+            client = self.http.bind(transport)
+            # Loaders turn the per-match lookups into bulk requests where the API has them
+            loaders = ApiLoaders(client, self.api_base_url)
+            try:
+                match_data = await asyncio.gather(*(
+                    self.fetch_match_data_loaded(loaders, match_id) for match_id in match_ids
+                ))
+            finally:
+                # Stale reads may have started refreshes on this transport
+                await client.drain()
+            logger.info(f"Batch of {len(match_ids)} matches: {loaders.request_stats()}")
+        
+        results = []
+        errors = []
+        
+        for match_id, data in zip(match_ids, match_data):
+            try:
+                result = self.analyze_match_data(match_id, data)
+                self._collect_result(match_id, result, results, errors)
+            except Exception as e:
+                errors.append({'match_id': match_id, 'error': str(e)})
+        
+        return self.summarize_batch(results, errors)
+    
+    def _collect_result(self, match_id: int, result: Dict, results: List[Dict], errors: List[Dict]):
+        if 'error' in result:
+            errors.append({'match_id': match_id, 'error': result['error']})
+        else:
+            results.append(result)
+    
+    def summarize_batch(self, results: List[Dict], errors: List[Dict]) -> Dict:
+        """Overall statistics for a batch of analyses"""
         predictions = [r['predictions']['final']['prediction'] for r in results]
         confidences = [r['predictions']['final']['confidence'] for r in results]
         
@@ -0,0 +1,403 @@
+# python_generator/api_client.py
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional, Any, Set, Tuple
+from urllib.parse import urlsplit, urlencode
+import logging
+
+import requests
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts up to `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AsyncApiClient:
+    """
+    Pooled async HTTP client for the Laravel API
+
+    One httpx connection pool is shared by every request; a semaphore caps the
+    number of requests in flight and a token bucket per host caps the request
+    rate, so large batches fan out without overwhelming the API. httpx is only
+    needed here, so it is imported when the first async client is made.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None,
+                 max_concurrency: int = 50, requests_per_second: float = 100.0,
+                 burst: Optional[float] = None, timeout: float = 10.0):
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+
+        import httpx
+        self._client = httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def _bucket_for(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(self.requests_per_second, self.burst)
+            self._buckets[host] = bucket
+        return bucket
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None,
+                  headers: Optional[Dict[str, str]] = None) -> "httpx.Response":
+        """GET under the concurrency limit and the host's rate limit"""
+        await self._bucket_for(url).acquire()
+
+        async with self._semaphore:
+            if timeout is None:
+                return await self._client.get(url, params=params, headers=headers)
+            return await self._client.get(url, params=params, headers=headers, timeout=timeout)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+class ApiResponse:
+    """
+    Transport-independent snapshot of an HTTP response
+
+    Exposes the status_code / headers / json() subset the analyzers use.
+    json() parses on every call, so callers can mutate the result without
+    touching the cached copy.
+    """
+
+    def __init__(self, status_code: int, content: bytes, headers: Dict[str, str], url: str = ""):
+        self.status_code = status_code
+        self.content = content
+        # Lower-cased so lookups work the same for either transport
+        self.headers = {k.lower(): v for k, v in headers.items()}
+        self.url = url
+
+    @classmethod
+    def from_requests(cls, response: requests.Response) -> "ApiResponse":
+        return cls(response.status_code, response.content, response.headers, response.url)
+
+    @classmethod
+    def from_httpx(cls, response: "httpx.Response") -> "ApiResponse":
+        return cls(response.status_code, response.content, response.headers, str(response.url))
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+@dataclass
+class CacheEntry:
+    response: ApiResponse
+    etag: Optional[str]
+    fresh_until: float
+    stale_until: float
+    refreshing: bool = False
+
+class CachedApiClient:
+    """
+    Shared GET cache in front of the Laravel API, usable from sync and async code
+
+    - Fresh entries (younger than ttl) are served from memory.
+    - Stale entries (up to ttl + stale_ttl) are served immediately while one
+      background request revalidates them (stale-while-revalidate).
+    - Older entries are revalidated with If-None-Match when the API sent an
+      ETag; a 304 extends the cached copy instead of transferring it again.
+    - Identical GETs already in flight are joined instead of repeated.
+
+    Only HTTP 200 responses are cached, at most max_entries of them (least
+    recently used evicted first). The sync path uses a requests session; the
+    async path uses whichever AsyncApiClient is bound with bind(). Callers
+    that write through the session invalidate() the GETs the write affects.
+    """
+
+    def __init__(self, headers: Optional[Dict[str, str]] = None, ttl: float = 60.0,
+                 stale_ttl: float = 300.0, max_entries: int = 10000, refresh_workers: int = 4):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+        self._background: Dict[AsyncApiClient, Set[asyncio.Task]] = {}
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers)
+
+        self.stats = {
+            'hits': 0, 'stale_hits': 0, 'misses': 0,
+            'revalidated': 0, 'coalesced': 0, 'upstream_requests': 0,
+        }
+
+    @staticmethod
+    def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((k, str(v)) for k, v in params.items()))}"
+
+    def _lookup(self, key: str) -> Tuple[Optional[CacheEntry], str]:
+        """Entry for key and its state: 'fresh', 'stale', 'expired' or 'missing'"""
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None, 'missing'
+            self._cache.move_to_end(key)
+            now = time.monotonic()
+            if now < entry.fresh_until:
+                self.stats['hits'] += 1
+                return entry, 'fresh'
+            if now < entry.stale_until:
+                self.stats['stale_hits'] += 1
+                return entry, 'stale'
+            self.stats['misses'] += 1
+            return entry, 'expired'
+
+    def _store(self, key: str, response: ApiResponse, previous: Optional[CacheEntry]) -> ApiResponse:
+        """Fold an upstream response into the cache; returns what the caller should see"""
+        now = time.monotonic()
+        with self._lock:
+            if response.status_code == 304 and previous is not None:
+                self.stats['revalidated'] += 1
+                previous.fresh_until = now + self.ttl
+                previous.stale_until = now + self.ttl + self.stale_ttl
+                previous.refreshing = False
+                self._cache[key] = previous
+                return previous.response
+
+            if previous is not None:
+                previous.refreshing = False
+            if response.status_code != 200:
+                return response
+
+            self._cache[key] = CacheEntry(
+                response=response,
+                etag=response.headers.get('etag'),
+                fresh_until=now + self.ttl,
+                stale_until=now + self.ttl + self.stale_ttl,
+            )
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            return response
+
+    def _claim_refresh(self, entry: CacheEntry) -> bool:
+        """True for exactly one caller per stale entry"""
+        with self._lock:
+            if entry.refreshing:
+                return False
+            entry.refreshing = True
+            return True
+
+    @staticmethod
+    def _conditional_headers(entry: Optional[CacheEntry]) -> Optional[Dict[str, str]]:
+        if entry is not None and entry.etag:
+            return {'If-None-Match': entry.etag}
+        return None
+
+    def invalidate(self, url: Optional[str] = None, params: Optional[Dict[str, Any]] = None):
+        """
+        Drop cached responses: one query when params are given, otherwise the
+        url under every query string, or everything when url is None
+        """
+        with self._lock:
+            if url is None:
+                self._cache.clear()
+            elif params:
+                self._cache.pop(self.cache_key(url, params), None)
+            else:
+                for key in [k for k in self._cache if k == url or k.startswith(url + '?')]:
+                    del self._cache[key]
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None) -> ApiResponse:
+        """Cached GET over the blocking session; raises requests.RequestException"""
+        key = self.cache_key(url, params)
+        entry, state = self._lookup(key)
+
+        if state == 'fresh':
+            return entry.response
+        if state == 'stale':
+            if self._claim_refresh(entry):
+                self._refresher.submit(self._refresh_quietly, key, url, params, timeout, entry)
+            return entry.response
+
+        return self._fetch(key, url, params, timeout, entry)
+
+    def _fetch(self, key: str, url: str, params: Optional[Dict[str, Any]],
+               timeout: Optional[float], entry: Optional[CacheEntry]) -> ApiResponse:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+                self.stats['upstream_requests'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            raw = self.session.get(url, params=params, timeout=timeout,
+                                   headers=self._conditional_headers(entry))
+            response = self._store(key, ApiResponse.from_requests(raw), entry)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh_quietly(self, key: str, url: str, params: Optional[Dict[str, Any]],
+                         timeout: Optional[float], entry: CacheEntry):
+        try:
+            self._fetch(key, url, params, timeout, entry)
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            # Also on cancellation, or the entry would never be refreshed again
+            with self._lock:
+                entry.refreshing = False
+
+    def bind(self, transport: AsyncApiClient) -> "BoundCachedClient":
+        """Async view of this cache that fetches through `transport`"""
+        return BoundCachedClient(self, transport)
+
+    async def aget(self, transport: AsyncApiClient, url: str,
+                   params: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None) -> ApiResponse:
+        """Cached GET over an async transport; raises httpx.HTTPError"""
+        key = self.cache_key(url, params)
+        entry, state = self._lookup(key)
+
+        if state == 'fresh':
+            return entry.response
+        if state == 'stale':
+            if self._claim_refresh(entry):
+                task = asyncio.ensure_future(self._arefresh_quietly(transport, key, url, params, timeout, entry))
+                pending = self._background.setdefault(transport, set())
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            return entry.response
+
+        return await self._afetch(transport, key, url, params, timeout, entry)
+
+    async def drain(self, transport: AsyncApiClient):
+        """Wait for the background refreshes running on `transport`; call before closing it"""
+        pending = self._background.pop(transport, set())
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _afetch(self, transport: AsyncApiClient, key: str, url: str,
+                      params: Optional[Dict[str, Any]], timeout: Optional[float],
+                      entry: Optional[CacheEntry]) -> ApiResponse:
+        future = self._inflight_async.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_async[key] = future
+        self.stats['upstream_requests'] += 1
+        try:
+            raw = await transport.get(url, params=params, timeout=timeout,
+                                      headers=self._conditional_headers(entry))
+            response = self._store(key, ApiResponse.from_httpx(raw), entry)
+            future.set_result(response)
+            return response
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so followers own the error, not the event loop
+            future.exception()
+            raise
+        finally:
+            self._inflight_async.pop(key, None)
+
+    async def _arefresh_quietly(self, transport: AsyncApiClient, key: str, url: str,
+                                params: Optional[Dict[str, Any]], timeout: Optional[float],
+                                entry: CacheEntry):
+        try:
+            await self._afetch(transport, key, url, params, timeout, entry)
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            # CancelledError (e.g. asyncio.run tearing down a batch) is not an
+            # Exception; without this the entry stays claimed forever
+            with self._lock:
+                entry.refreshing = False
+
+class BoundCachedClient:
+    """CachedApiClient bound to one AsyncApiClient; same get() signature as the transport"""
+
+    def __init__(self, cache: CachedApiClient, transport: AsyncApiClient):
+        self.cache = cache
+        self.transport = transport
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None) -> ApiResponse:
+        return await self.cache.aget(self.transport, url, params=params, timeout=timeout)
+
+    async def drain(self):
+        await self.cache.drain(self.transport)
+
+DEFAULT_HEADERS = {
+    'Content-Type': 'application/json',
+    'Accept': 'application/json',
+}
+
+_shared_client: Optional[CachedApiClient] = None
+_shared_lock = threading.Lock()
+
+def shared_client() -> CachedApiClient:
+    """Process-wide cache shared by every analyzer"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = CachedApiClient(headers=DEFAULT_HEADERS)
+        return _shared_client
@@ -0,0 +1,206 @@
+# python_generator/data_loader.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+import logging
+
+from api_client import BoundCachedClient
+
+logger = logging.getLogger(__name__)
+
+class BulkUnsupported(Exception):
+    """Raised by a bulk fetch when the API has no bulk route for it"""
+
+class DataLoader:
+    """
+    Coalesce per-key loads issued in the same event-loop tick into bulk calls
+
+    Every load() made before the loop gets back to the scheduler joins one
+    pending batch; the batch is then fetched with batch_fn in chunks of
+    max_batch_size. Keys the bulk response does not contain (or every key,
+    once batch_fn raised BulkUnsupported) are fetched one by one with
+    item_fn. Results are memoised for the loader's lifetime, so create one
+    loader per batch of work.
+    """
+
+    def __init__(self, item_fn: Callable[[Hashable], Awaitable[Any]],
+                 batch_fn: Optional[Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]] = None,
+                 max_batch_size: int = 100, name: str = "loader"):
+        self.item_fn = item_fn
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.name = name
+        self.bulk_supported = batch_fn is not None
+
+        self._futures: Dict[Hashable, asyncio.Future] = {}
+        self._pending: List[Hashable] = []
+        self._scheduled = False
+
+        self.stats = {'loads': 0, 'bulk_calls': 0, 'item_calls': 0}
+
+    async def load(self, key: Hashable) -> Any:
+        self.stats['loads'] += 1
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            self._pending.append(key)
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: List[Hashable]) -> List[Any]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self):
+        keys, self._pending, self._scheduled = self._pending, [], False
+        for start in range(0, len(keys), self.max_batch_size):
+            asyncio.ensure_future(self._run_batch(keys[start:start + self.max_batch_size]))
+
+    async def _run_batch(self, keys: List[Hashable]):
+        results: Dict[Hashable, Any] = {}
+
+        if self.bulk_supported:
+            try:
+                self.stats['bulk_calls'] += 1
+                results = await self.batch_fn(keys)
+            except BulkUnsupported:
+                logger.info(f"{self.name}: bulk route unavailable, using per-item requests")
+                self.bulk_supported = False
+            except Exception as e:
+                logger.error(f"{self.name}: bulk fetch of {len(keys)} keys failed: {e}")
+
+        missing = [key for key in keys if key not in results]
+        if missing:
+            self.stats['item_calls'] += len(missing)
+            fetched = await asyncio.gather(*(self.item_fn(key) for key in missing), return_exceptions=True)
+            results.update(zip(missing, fetched))
+
+        for key in keys:
+            future = self._futures[key]
+            if future.done():
+                continue
+            value = results.get(key)
+            if isinstance(value, Exception):
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+def _index_rows(data: Any, key_fn: Callable[[Dict], Hashable]) -> Dict[Hashable, Any]:
+    """Bulk payloads may be a list of rows or a dict already keyed by id"""
+    if isinstance(data, dict):
+        return {str(k): v for k, v in data.items()}
+    return {key_fn(row): row for row in data or [] if isinstance(row, dict)}
+
+def _check_filtered(path: str, returned: Any, requested: set):
+    """
+    A list route that ignores the bulk filter answers with rows outside the
+    request; an empty or partial answer is just keys the API does not have
+    """
+    if any(key not in requested for key in returned):
+        raise BulkUnsupported(path)
+
+class ApiLoaders:
+    """
+    Batching loaders for the Laravel resources the analyzers read
+
+    Bulk routes used when available:
+        GET /matches?ids=1,2        GET /teams?codes=ARS,CHE
+        GET /team-forms?match_ids=1,2   GET /head-to-head?match_ids=1,2
+    A 404/405, or a response carrying rows outside the request (the filter
+    was ignored), disables the bulk route for the rest of the batch; rows a
+    bulk response does not include are fetched from the per-item routes.
+    """
+
+    def __init__(self, client: BoundCachedClient, api_base_url: str, max_batch_size: int = 100):
+        self.client = client
+        self.api_base_url = api_base_url
+
+        self.matches = DataLoader(self._match_item, self._match_bulk, max_batch_size, "matches")
+        self.teams = DataLoader(self._team_item, self._team_bulk, max_batch_size, "teams")
+        self.team_forms = DataLoader(self._form_item, self._form_bulk, max_batch_size, "team-forms")
+        self.recent_forms = DataLoader(self._recent_forms_item, None, max_batch_size, "recent-forms")
+        self.head_to_head = DataLoader(self._h2h_item, self._h2h_bulk, max_batch_size, "head-to-head")
+
+    @property
+    def loaders(self) -> List[DataLoader]:
+        return [self.matches, self.teams, self.team_forms, self.recent_forms, self.head_to_head]
+
+    async def _bulk_rows(self, path: str, param: str, keys: List[Any]) -> Any:
+        url = f"{self.api_base_url}/{path}"
+        response = await self.client.get(url, params={param: ','.join(str(k) for k in keys)}, timeout=10)
+        if response.status_code in (404, 405):
+            raise BulkUnsupported(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"Bulk {path} returned {response.status_code}")
+        return response.json().get('data')
+
+    async def _bulk(self, path: str, param: str, keys: List[Any],
+                    key_fn: Callable[[Dict], Hashable]) -> Dict[Hashable, Any]:
+        rows = _index_rows(await self._bulk_rows(path, param, keys), key_fn)
+        _check_filtered(path, rows, {str(key) for key in keys})
+        return {key: rows[str(key)] for key in keys if str(key) in rows}
+
+    async def _item(self, url: str, params: Optional[Dict] = None, timeout: float = 5) -> Any:
+        response = await self.client.get(url, params=params, timeout=timeout)
+        if response.status_code != 200:
+            return None
+        return response.json().get('data')
+
+    async def _match_bulk(self, ids: List[int]) -> Dict[Hashable, Any]:
+        return await self._bulk('matches', 'ids', ids, lambda row: str(row.get('id')))
+
+    async def _match_item(self, match_id: int) -> Any:
+        return await self._item(f"{self.api_base_url}/matches/{match_id}", timeout=10)
+
+    async def _team_bulk(self, codes: List[str]) -> Dict[Hashable, Any]:
+        return await self._bulk('teams', 'codes', codes, lambda row: str(row.get('code')))
+
+    async def _team_item(self, team_code: str) -> Any:
+        return await self._item(f"{self.api_base_url}/teams/{team_code}")
+
+    async def _form_bulk(self, keys: List[tuple]) -> Dict[Hashable, Any]:
+        """Forms for (match_id, team_code, venue) keys from one match_ids query"""
+        match_ids = sorted({match_id for match_id, _, _ in keys})
+        rows = await self._bulk_rows('team-forms', 'match_ids', match_ids)
+        if isinstance(rows, dict):
+            # Keyed by match id, one form or a list of forms per match
+            rows = [form for forms in rows.values() for form in (forms if isinstance(forms, list) else [forms])]
+
+        rows = [row for row in rows or [] if isinstance(row, dict)]
+        _check_filtered('team-forms', {str(row.get('match_id')) for row in rows},
+                        {str(match_id) for match_id in match_ids})
+
+        wanted = {tuple(map(str, key)): key for key in keys}
+        found: Dict[Hashable, Any] = {}
+        for row in rows:
+            key = wanted.get((str(row.get('match_id')), str(row.get('team_id')), str(row.get('venue'))))
+            if key is not None and key not in found:
+                found[key] = row
+        return found
+
+    async def _form_item(self, key: tuple) -> Any:
+        match_id, team_code, venue = key
+        data = await self._item(
+            f"{self.api_base_url}/team-forms",
+            params={'match_id': match_id, 'team_id': team_code, 'venue': venue},
+        )
+        return data[0] if data else None
+
+    async def _recent_forms_item(self, key: tuple) -> Any:
+        team_code, venue, limit = key
+        return await self._item(
+            f"{self.api_base_url}/team-forms",
+            params={'team_id': team_code, 'venue': venue, 'limit': limit,
+                    'order_by': 'created_at', 'order': 'desc'},
+        )
+
+    async def _h2h_bulk(self, match_ids: List[int]) -> Dict[Hashable, Any]:
+        return await self._bulk('head-to-head', 'match_ids', match_ids, lambda row: str(row.get('match_id')))
+
+    async def _h2h_item(self, match_id: int) -> Any:
+        return await self._item(f"{self.api_base_url}/head-to-head/{match_id}")
+
+    def request_stats(self) -> Dict[str, Dict[str, int]]:
+        return {loader.name: dict(loader.stats) for loader in self.loaders}
@@ -0,0 +1,227 @@
+# python_generator/feature_store.py
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+import logging
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+logger = logging.getLogger(__name__)
+
+MIN_CAPACITY = 1024
+
+def fingerprint(data: Any) -> int:
+    """Stable 64-bit content hash of a JSON-serialisable input record"""
+    payload = json.dumps(data, sort_keys=True, default=str).encode()
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), 'little')
+
+def rows_to_columns(rows: Sequence[Dict[str, Any]], names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """Feature dicts -> columns; a row without a feature gets NaN"""
+    if names is None:
+        names = list(dict.fromkeys(name for row in rows for name in row))
+    return {
+        name: np.fromiter((row.get(name, np.nan) for row in rows), dtype=np.float64, count=len(rows))
+        for name in names
+    }
+
+class FeatureStore:
+    """
+    Columnar on-disk store of ML feature rows keyed by match_id
+
+    Each (name, version) lives in its own directory:
+        ids.npy           int64 match ids
+        fingerprints.npy  uint64 hash of the inputs each row was computed from
+        features.npy      float64 (capacity, F) matrix in column-major order
+        meta.json         row count, capacity and feature names
+    Files are memory-mapped, so matrix() is a zero-copy view and each
+    feature column is contiguous on disk. Upserts overwrite rows in place
+    and append new ones, growing the files by doubling. Rows past the count
+    in meta.json are ignored, so an interrupted append leaves the store
+    readable. One writer per directory.
+    """
+
+    def __init__(self, root: str, name: str, version: str = "1",
+                 feature_names: Optional[List[str]] = None):
+        self.path = os.path.join(root, name, f"v{version}")
+        self.name = name
+        self.version = version
+        self.feature_names: List[str] = list(feature_names or [])
+        self.count = 0
+        self.capacity = 0
+        self._ids: Optional[np.ndarray] = None
+        self._fingerprints: Optional[np.ndarray] = None
+        self._features: Optional[np.ndarray] = None
+        self._features_ro: Optional[np.ndarray] = None
+
+        if os.path.exists(self._file('meta.json')):
+            self._open()
+            if feature_names is not None and list(feature_names) != self.feature_names:
+                raise ValueError(
+                    f"Feature store {self.path} has features {self.feature_names}; "
+                    f"use a new version for a different feature set"
+                )
+
+    def _file(self, filename: str) -> str:
+        return os.path.join(self.path, filename)
+
+    def _open(self):
+        with open(self._file('meta.json')) as f:
+            meta = json.load(f)
+        self.feature_names = meta['features']
+        self.count = meta['count']
+        self.capacity = meta['capacity']
+        self._ids = np.load(self._file('ids.npy'), mmap_mode='r+')
+        self._fingerprints = np.load(self._file('fingerprints.npy'), mmap_mode='r+')
+        self._features = np.load(self._file('features.npy'), mmap_mode='r+')
+        # Second, read-only mapping of the same pages for the views handed out
+        self._features_ro = np.load(self._file('features.npy'), mmap_mode='r')
+
+    def _write_meta(self):
+        meta = {
+            'name': self.name,
+            'version': self.version,
+            'features': self.feature_names,
+            'count': self.count,
+            'capacity': self.capacity,
+            'updated_at': datetime.now().isoformat(),
+        }
+        tmp = self._file('meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file('meta.json'))
+
+    def _grow(self, needed: int):
+        """Reallocate the column files with room for `needed` rows"""
+        capacity = max(MIN_CAPACITY, self.capacity * 2, needed)
+        os.makedirs(self.path, exist_ok=True)
+        width = len(self.feature_names)
+
+        specs = (
+            ('ids.npy', np.int64, (capacity,), False, self._ids),
+            ('fingerprints.npy', np.uint64, (capacity,), False, self._fingerprints),
+            ('features.npy', np.float64, (capacity, width), True, self._features),
+        )
+        for filename, dtype, shape, fortran, current in specs:
+            tmp = self._file(filename + '.tmp')
+            grown = open_memmap(tmp, mode='w+', dtype=dtype, shape=shape, fortran_order=fortran)
+            if current is not None:
+                grown[:self.count] = current[:self.count]
+            grown.flush()
+            del grown
+            os.replace(tmp, self._file(filename))
+
+        self.capacity = capacity
+        self._write_meta()
+        self._open()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def match_ids(self) -> np.ndarray:
+        if self._ids is None:
+            return np.empty(0, dtype=np.int64)
+        return self._ids[:self.count]
+
+    def positions(self, match_ids: Sequence[int]) -> np.ndarray:
+        """Row of each match id, -1 where it is not stored"""
+        match_ids = np.asarray(match_ids, dtype=np.int64)
+        stored = self.match_ids()
+        if stored.size == 0:
+            return np.full(match_ids.shape, -1, dtype=np.int64)
+        order = np.argsort(stored, kind='stable')
+        found = np.searchsorted(stored, match_ids, sorter=order)
+        found = np.minimum(found, stored.size - 1)
+        rows = order[found]
+        return np.where(stored[rows] == match_ids, rows, -1)
+
+    def needs_update(self, match_ids: Sequence[int], fingerprints: Sequence[int]) -> np.ndarray:
+        """True for matches that are missing or were stored from different inputs"""
+        rows = self.positions(match_ids)
+        stale = rows < 0
+        present = ~stale
+        if present.any():
+            stored = self._fingerprints[rows[present]]
+            stale[present] = stored != np.asarray(fingerprints, dtype=np.uint64)[present]
+        return stale
+
+    def upsert(self, match_ids: Sequence[int], features: Union[Dict[str, np.ndarray], np.ndarray],
+               fingerprints: Sequence[int]):
+        """Write feature rows, replacing stored rows with the same match id"""
+        match_ids = np.asarray(match_ids, dtype=np.int64)
+        fingerprints = np.asarray(fingerprints, dtype=np.uint64)
+        if match_ids.size == 0:
+            return
+
+        if isinstance(features, dict):
+            if not self.feature_names:
+                self.feature_names = list(features)
+            missing = set(self.feature_names) - set(features)
+            if missing:
+                raise ValueError(f"Missing features for {self.path}: {sorted(missing)}")
+            matrix = np.column_stack([np.asarray(features[name], dtype=np.float64) for name in self.feature_names])
+        else:
+            matrix = np.asarray(features, dtype=np.float64)
+            if matrix.shape[1] != len(self.feature_names):
+                raise ValueError(f"Expected {len(self.feature_names)} features, got {matrix.shape[1]}")
+
+        # Last occurrence wins when a batch repeats a match id
+        _, last = np.unique(match_ids[::-1], return_index=True)
+        keep = np.sort(match_ids.size - 1 - last)
+        match_ids, fingerprints, matrix = match_ids[keep], fingerprints[keep], matrix[keep]
+
+        rows = self.positions(match_ids)
+        new = rows < 0
+        if self.count + int(new.sum()) > self.capacity:
+            self._grow(self.count + int(new.sum()))
+
+        rows[new] = np.arange(self.count, self.count + int(new.sum()))
+        self._ids[rows] = match_ids
+        self._fingerprints[rows] = fingerprints
+        self._features[rows] = matrix
+        for column in (self._ids, self._fingerprints, self._features):
+            column.flush()
+
+        self.count += int(new.sum())
+        self._write_meta()
+
+    def matrix(self) -> np.ndarray:
+        """Read-only zero-copy (count, F) view of every stored row"""
+        if self._features_ro is None:
+            return np.empty((0, len(self.feature_names)))
+        return self._features_ro[:self.count]
+
+    def column(self, name: str) -> np.ndarray:
+        """Zero-copy view of one feature column"""
+        return self.matrix()[:, self.feature_names.index(name)]
+
+    def load(self, match_ids: Sequence[int], names: Optional[List[str]] = None) -> np.ndarray:
+        """(len(match_ids), F) rows in request order; NaN for unknown ids"""
+        rows = self.positions(match_ids)
+        columns = [self.feature_names.index(n) for n in names] if names else slice(None)
+        width = len(names) if names else len(self.feature_names)
+        out = np.full((rows.size, width), np.nan)
+        present = rows >= 0
+        if present.any():
+            out[present] = self._features[rows[present]][:, columns]
+        return out
+
+    def get_or_compute(self, match_ids: Sequence[int], fingerprints: Sequence[int],
+                       compute: Callable[[List[int]], Union[Dict[str, np.ndarray], np.ndarray]]) -> np.ndarray:
+        """
+        Feature rows for match_ids, computing only the stale ones
+
+        compute receives the indices (into match_ids) of the matches whose
+        features are missing or whose fingerprint changed, and returns their
+        features in that order.
+        """
+        match_ids = list(match_ids)
+        fingerprints = list(fingerprints)
+        stale = np.flatnonzero(self.needs_update(match_ids, fingerprints))
+        if stale.size:
+            logger.info(f"{self.name} v{self.version}: computing {stale.size} of {len(match_ids)} feature rows")
+            features = compute(stale.tolist())
+            self.upsert([match_ids[i] for i in stale], features, [fingerprints[i] for i in stale])
+        return self.load(match_ids)
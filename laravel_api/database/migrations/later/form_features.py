@@ -0,0 +1,303 @@
+# python_generator/form_features.py
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from dataclasses import dataclass
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (field, default) per form column, defaults as in calculate_form_comparison
+FORM_COLUMNS = (
+    ('form_rating', 5.0),
+    ('form_momentum', 0.0),
+    ('avg_goals_scored', 0.0),
+    ('avg_goals_conceded', 0.0),
+    ('win_probability', 0.33),
+    ('clean_sheets', 0.0),
+    ('matches_played', 1.0),
+    ('failed_to_score', 0.0),
+)
+TEAM_COLUMNS = (
+    ('overall_rating', 5.0),
+    ('home_strength', 5.0),
+)
+H2H_COLUMNS = (
+    ('home_wins', 0.0),
+    ('away_wins', 0.0),
+    ('draws', 0.0),
+    ('total_meetings', 1.0),
+)
+
+OUTCOMES = np.array(['home', 'draw', 'away'])
+
+@dataclass
+class FormArrays:
+    """
+    Form, team and head-to-head inputs for N matches as column arrays
+
+    Each side's columns are (N,) float arrays keyed by field name, plus
+    form_points (W=3, D=1 over form_string) and a `present` mask standing in
+    for the scalar code's "is the dict empty" checks.
+    """
+    home_form: Dict[str, np.ndarray]
+    away_form: Dict[str, np.ndarray]
+    home_team: Dict[str, np.ndarray]
+    away_team: Dict[str, np.ndarray]
+    h2h: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.h2h['present'])
+
+def _pack(rows: Sequence[Optional[Dict]], columns) -> Dict[str, np.ndarray]:
+    rows = [row or {} for row in rows]
+    packed = {
+        name: np.fromiter((row.get(name, default) for row in rows), dtype=np.float64, count=len(rows))
+        for name, default in columns
+    }
+    packed['present'] = np.fromiter((bool(row) for row in rows), dtype=bool, count=len(rows))
+    return packed
+
+def _form_points(rows: Sequence[Optional[Dict]]) -> np.ndarray:
+    strings = [(row or {}).get('form_string', '') or '' for row in rows]
+    return np.fromiter((3 * s.count('W') + s.count('D') for s in strings), dtype=np.float64, count=len(strings))
+
+def pack_match_data(matches: Sequence[Optional[Dict]]) -> FormArrays:
+    """Pack fetch_match_data-shaped dicts; missing sections count as empty"""
+    matches = [m or {} for m in matches]
+
+    def side(key):
+        return [m.get(key) for m in matches]
+
+    home_forms, away_forms = side('home_team_form'), side('away_team_form')
+    home_form = _pack(home_forms, FORM_COLUMNS)
+    home_form['form_points'] = _form_points(home_forms)
+    away_form = _pack(away_forms, FORM_COLUMNS)
+    away_form['form_points'] = _form_points(away_forms)
+
+    return FormArrays(
+        home_form=home_form,
+        away_form=away_form,
+        home_team=_pack(side('home_team_details'), TEAM_COLUMNS),
+        away_team=_pack(side('away_team_details'), TEAM_COLUMNS),
+        h2h=_pack(side('head_to_head'), H2H_COLUMNS),
+    )
+
+@dataclass
+class BatchFormResult:
+    """Per-match outputs of score_batch, one array entry per input match"""
+    comparison: Dict[str, np.ndarray]  # calculate_form_comparison fields
+    has_comparison: np.ndarray  # False where either form was missing
+    advantage_score: np.ndarray
+    form_probabilities: np.ndarray  # (N, 3) home/draw/away
+    form_prediction: np.ndarray  # 'home' / 'draw' / 'away'
+    form_confidence: np.ndarray
+    home_strength: np.ndarray
+    away_strength: np.ndarray
+    h2h_factor: np.ndarray
+    final_probabilities: np.ndarray  # (N, 3)
+    final_prediction: np.ndarray
+    final_confidence: np.ndarray
+    ml_features: Dict[str, np.ndarray]  # prepare_ml_features fields
+
+    def predictions(self, index: int) -> Dict:
+        """One match in the shape of analyze_match_data's 'predictions' entry"""
+        form_probs = self.form_probabilities[index]
+        final_probs = self.final_probabilities[index]
+        return {
+            'form_based': {
+                'prediction': str(self.form_prediction[index]),
+                'confidence': float(self.form_confidence[index]),
+                'probabilities': dict(zip(OUTCOMES.tolist(), form_probs.tolist())),
+            },
+            'final': {
+                'prediction': str(self.final_prediction[index]),
+                'confidence': float(self.final_confidence[index]),
+                'probabilities': dict(zip(OUTCOMES.tolist(), final_probs.tolist())),
+                'factors': {
+                    'form_weight': 0.6,
+                    'strength_weight': 0.3,
+                    'h2h_weight': 0.1,
+                    'h2h_factor': float(self.h2h_factor[index]),
+                },
+            },
+        }
+
+def round_like_builtin(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    np.round matching the builtin round() of the scalar methods
+
+    np.round scales by 10**decimals in binary, so values sitting on a
+    decimal half can go the other way; those few are re-rounded with round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if near_tie.size:
+        flat_values, flat = values.reshape(-1), rounded.reshape(-1)
+        flat[near_tie] = [round(float(v), decimals) for v in flat_values[near_tie]]
+    return rounded
+
+def _rate(count: np.ndarray, matches: np.ndarray) -> np.ndarray:
+    return count / np.maximum(matches, 1)
+
+def form_comparison(home: Dict[str, np.ndarray], away: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """calculate_form_comparison over columns, with the same per-field rounding"""
+    home_supremacy = home['avg_goals_scored'] - away['avg_goals_conceded']
+    away_supremacy = away['avg_goals_scored'] - home['avg_goals_conceded']
+    return {
+        'form_advantage': round_like_builtin(home['form_rating'] - away['form_rating'], 2),
+        'momentum_advantage': round_like_builtin(home['form_momentum'] - away['form_momentum'], 3),
+        'goal_supremacy': round_like_builtin(home_supremacy - away_supremacy, 2),
+        'win_probability_advantage': round_like_builtin(home['win_probability'] - away['win_probability'], 3),
+        'form_points_advantage': round_like_builtin(home['form_points'] - away['form_points'], 1),
+        'clean_sheet_advantage': round_like_builtin(
+            _rate(home['clean_sheets'], home['matches_played'])
+            - _rate(away['clean_sheets'], away['matches_played']), 3),
+        'scoring_consistency_advantage': round_like_builtin(
+            _rate(away['failed_to_score'], away['matches_played'])
+            - _rate(home['failed_to_score'], home['matches_played']), 3),
+        'home_form_rating': round_like_builtin(home['form_rating'], 2),
+        'away_form_rating': round_like_builtin(away['form_rating'], 2),
+        'home_momentum': round_like_builtin(home['form_momentum'], 3),
+        'away_momentum': round_like_builtin(away['form_momentum'], 3),
+        'home_avg_goals_scored': round_like_builtin(home['avg_goals_scored'], 2),
+        'away_avg_goals_scored': round_like_builtin(away['avg_goals_scored'], 2),
+        'home_avg_goals_conceded': round_like_builtin(home['avg_goals_conceded'], 2),
+        'away_avg_goals_conceded': round_like_builtin(away['avg_goals_conceded'], 2),
+    }
+
+def team_strength(team: Dict[str, np.ndarray], form: Dict[str, np.ndarray]) -> np.ndarray:
+    """calculate_team_strength: 5.0 where the team record is missing"""
+    strength = (
+        team['overall_rating'] * 0.4 +
+        form['form_rating'] * 0.3 +
+        team['home_strength'] * 0.2 +
+        (form['form_momentum'] * 2 + 5.0) * 0.1
+    )
+    return np.where(team['present'], round_like_builtin(strength, 2), 5.0)
+
+def head_to_head_factor(h2h: Dict[str, np.ndarray]) -> np.ndarray:
+    """analyze_head_to_head's factor: 0 without data or meetings"""
+    total = h2h['home_wins'] + h2h['away_wins'] + h2h['draws']
+    safe_total = np.where(total > 0, total, 1.0)
+    factor = round_like_builtin((h2h['home_wins'] - h2h['away_wins']) / safe_total * 2, 3)
+    return np.where(h2h['present'] & (total > 0), factor, 0.0)
+
+def _pick(home: np.ndarray, draw: np.ndarray, away: np.ndarray,
+          home_wins: np.ndarray, away_wins: np.ndarray):
+    """Prediction and its probability; anything not home or away is a draw"""
+    choice = np.where(home_wins, 0, np.where(away_wins, 2, 1))
+    confidence = np.choose(choice, [home, draw, away])
+    return OUTCOMES[choice], confidence
+
+def score_batch(arrays: FormArrays, feature_weights: Dict[str, float],
+                ml_params: Dict[str, float]) -> BatchFormResult:
+    """
+    predict_from_form, calculate_team_strength, analyze_head_to_head,
+    combine_predictions and prepare_ml_features for N matches at once
+
+    Every feature is computed once, as a column, and reused by the steps
+    that need it. Results match the scalar methods, including their intermediate
+    rounding.
+    """
+    home, away = arrays.home_form, arrays.away_form
+    comparison = form_comparison(home, away)
+    has_comparison = home['present'] & away['present']
+
+    # predict_from_form
+    w = feature_weights
+    advantage = (
+        comparison['form_advantage'] * w['form_rating'] +
+        comparison['momentum_advantage'] * w['form_momentum'] * 10 +
+        comparison['goal_supremacy'] * w['goal_supremacy'] * 2 +
+        comparison['win_probability_advantage'] * w['win_probability'] * 3 +
+        comparison['clean_sheet_advantage'] * w['clean_sheets'] * 10
+    )
+    base = np.stack([0.33 + advantage * 0.5, np.full_like(advantage, 0.34), 0.33 - advantage * 0.5], axis=1)
+    probs = np.clip(base / base.sum(axis=1, keepdims=True), 0.1, 0.9)
+    probs /= probs.sum(axis=1, keepdims=True)
+
+    form_prediction, form_confidence = _pick(
+        probs[:, 0], probs[:, 1], probs[:, 2],
+        probs[:, 0] > ml_params['home_win_threshold'],
+        probs[:, 2] > ml_params['away_win_threshold'],
+    )
+    form_confidence = np.where(np.abs(advantage) > 1.0, np.minimum(0.95, form_confidence * 1.2), form_confidence)
+
+    # Matches without both forms get predict_from_form's neutral default
+    form_probs = np.where(has_comparison[:, None], round_like_builtin(probs, 3), [0.33, 0.34, 0.33])
+    form_prediction = np.where(has_comparison, form_prediction, 'draw')
+    form_confidence = np.where(has_comparison, round_like_builtin(form_confidence, 3), 0.5)
+
+    # combine_predictions
+    home_strength = team_strength(arrays.home_team, home)
+    away_strength = team_strength(arrays.away_team, away)
+    h2h_factor = head_to_head_factor(arrays.h2h)
+
+    strength_diff = home_strength - away_strength
+    combined = np.stack([
+        form_probs[:, 0] * 0.6 + (0.33 + strength_diff * 0.05) * 0.3 + 0.33 * 0.1 + h2h_factor * 0.1,
+        form_probs[:, 1] * 0.6 + 0.34 * 0.3 + 0.34 * 0.1,
+        form_probs[:, 2] * 0.6 + (0.33 - strength_diff * 0.05) * 0.3 + 0.33 * 0.1 - h2h_factor * 0.1,
+    ], axis=1)
+    combined /= combined.sum(axis=1, keepdims=True)
+    c_home, c_draw, c_away = combined[:, 0], combined[:, 1], combined[:, 2]
+    final_prediction, final_confidence = _pick(
+        c_home, c_draw, c_away,
+        (c_home > c_away) & (c_home > c_draw),
+        (c_away > c_home) & (c_away > c_draw),
+    )
+
+    return BatchFormResult(
+        comparison=comparison,
+        has_comparison=has_comparison,
+        advantage_score=np.where(has_comparison, advantage, 0.0),
+        form_probabilities=form_probs,
+        form_prediction=form_prediction,
+        form_confidence=form_confidence,
+        home_strength=home_strength,
+        away_strength=away_strength,
+        h2h_factor=h2h_factor,
+        final_probabilities=round_like_builtin(combined, 3),
+        final_prediction=final_prediction,
+        final_confidence=round_like_builtin(final_confidence, 3),
+        ml_features=ml_features(arrays, comparison, has_comparison),
+    )
+
+def ml_features(arrays: FormArrays, comparison: Dict[str, np.ndarray],
+                has_comparison: np.ndarray) -> Dict[str, np.ndarray]:
+    """prepare_ml_features over columns, reusing the form comparison"""
+    home, away = arrays.home_form, arrays.away_form
+    home_rating, away_rating = arrays.home_team['overall_rating'], arrays.away_team['overall_rating']
+    meetings = np.maximum(arrays.h2h['total_meetings'], 1)
+
+    def compared(name):
+        return np.where(has_comparison, comparison[name], 0.0)
+
+    features = {
+        'form_advantage': compared('form_advantage'),
+        'momentum_advantage': compared('momentum_advantage'),
+        'goal_supremacy': compared('goal_supremacy'),
+        'win_probability_advantage': compared('win_probability_advantage'),
+        'home_rating': home_rating,
+        'away_rating': away_rating,
+        'rating_difference': home_rating - away_rating,
+        'home_avg_goals_scored': home['avg_goals_scored'],
+        'away_avg_goals_scored': away['avg_goals_scored'],
+        'home_avg_goals_conceded': home['avg_goals_conceded'],
+        'away_avg_goals_conceded': away['avg_goals_conceded'],
+        'h2h_home_win_rate': arrays.h2h['home_wins'] / meetings,
+        'h2h_away_win_rate': arrays.h2h['away_wins'] / meetings,
+        'h2h_draw_rate': arrays.h2h['draws'] / meetings,
+        'total_avg_goals': (home['avg_goals_scored'] + away['avg_goals_scored'] +
+                            home['avg_goals_conceded'] + away['avg_goals_conceded']) / 2,
+        'defensive_stability': (_rate(home['clean_sheets'], home['matches_played']) -
+                                _rate(away['clean_sheets'], away['matches_played'])),
+    }
+    return {name: round_like_builtin(values, 4) for name, values in features.items()}
+
+def feature_matrix(features: Dict[str, np.ndarray], names: Optional[List[str]] = None) -> np.ndarray:
+    """(N, F) matrix of the named feature columns, e.g. ml_features for a model"""
+    names = names or list(features)
+    return np.column_stack([features[name] for name in names])
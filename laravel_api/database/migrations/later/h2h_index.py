@@ -0,0 +1,288 @@
+# python_generator/h2h_index.py
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Result codes, from the home side's point of view
+RESULTS = np.array(['home', 'draw', 'away'])
+HOME, DRAW, AWAY = 0, 1, 2
+NO_RESULT = -1
+
+RECENT_MEETINGS = 10  # meetings analyze_recent_meetings looks at
+SEARCH_LIMIT = 20  # meetings /matches/search returns per pair
+MAX_STREAKS = 3  # completed 3+ streaks that fit in RECENT_MEETINGS results
+
+TRENDS = np.array(['strong_home', 'moderate_home', 'strong_away', 'moderate_away', 'balanced', 'neutral'])
+
+class H2HIndex:
+    """
+    League-wide head-to-head table built once from the historical matches
+
+    Completed matches are grouped by (home_team_code, away_team_code), newest
+    first, and every per-pair quantity the analyzer derives from a
+    /matches/search response is computed for all pairs at once with grouped
+    array operations: win/draw/loss and goal totals, the last ten results as
+    a code matrix, momentum, trend and the identify_patterns flags. Lookups
+    are a dict probe plus a few array reads.
+
+    Aggregates cover the `limit` most recent meetings per pair (20, like the
+    search route); pass limit=None to use the full history.
+    """
+
+    def __init__(self, matches: Iterable[Dict], limit: Optional[int] = SEARCH_LIMIT):
+        self.limit = limit
+        rows = [
+            m for m in matches
+            if m.get('home_team_code') and m.get('away_team_code')
+            and m.get('home_score') is not None and m.get('away_score') is not None
+        ]
+        self._build(rows)
+        logger.info(f"H2H index: {len(rows)} matches, {len(self._pairs)} pairings")
+
+    @classmethod
+    def from_snapshot(cls, snapshot, limit: Optional[int] = SEARCH_LIMIT) -> "H2HIndex":
+        return cls(snapshot.matches(), limit=limit)
+
+    def _build(self, rows: List[Dict]):
+        n = len(rows)
+        home = np.array([m['home_team_code'] for m in rows], dtype=str)
+        away = np.array([m['away_team_code'] for m in rows], dtype=str)
+        dates = np.array([m.get('match_date') or '' for m in rows], dtype=str)
+        home_score = np.fromiter((m['home_score'] for m in rows), dtype=np.int64, count=n)
+        away_score = np.fromiter((m['away_score'] for m in rows), dtype=np.int64, count=n)
+
+        teams, team_ids = np.unique(np.concatenate([home, away]), return_inverse=True)
+        pair = team_ids[:n].astype(np.int64) * max(len(teams), 1) + team_ids[n:]
+
+        # Newest first within each pair; equal dates keep table order
+        _, date_rank = np.unique(dates, return_inverse=True)
+        order = np.lexsort((-date_rank, pair))
+        pair = pair[order]
+
+        keys, starts, counts = np.unique(pair, return_index=True, return_counts=True)
+        num_pairs = len(keys)
+        group = np.repeat(np.arange(num_pairs), counts)
+        rank = np.arange(n) - np.repeat(starts, counts)
+
+        home_score, away_score = home_score[order], away_score[order]
+        result = (1 + np.sign(away_score - home_score)).astype(np.int8)
+
+        used = rank < self.limit if self.limit is not None else np.ones(n, dtype=bool)
+        g = group[used]
+
+        def per_pair(weights):
+            return np.bincount(g, weights=weights[used], minlength=num_pairs).astype(np.int64)
+
+        self.home_wins = per_pair(result == HOME)
+        self.draws = per_pair(result == DRAW)
+        self.away_wins = per_pair(result == AWAY)
+        self.home_goals = per_pair(home_score)
+        self.away_goals = per_pair(away_score)
+        self.total = self.home_wins + self.draws + self.away_wins
+
+        # Last RECENT_MEETINGS results per pair, padded with NO_RESULT
+        recent_mask = used & (rank < RECENT_MEETINGS)
+        self.sequence = np.full((num_pairs, RECENT_MEETINGS), NO_RESULT, dtype=np.int8)
+        self.sequence[group[recent_mask], rank[recent_mask]] = result[recent_mask]
+        self.sequence_length = np.minimum(self.total, RECENT_MEETINGS)
+
+        self._recent_stats()
+        self._patterns()
+
+        # Row data for last_meetings, in pair/newest-first order
+        self._starts = starts
+        self._dates = dates[order]
+        self._home_score = home_score
+        self._away_score = away_score
+        self._result = result
+        self._league = np.array([m.get('league', '') for m in rows], dtype=object)[order]
+        self._venue = np.array([m.get('venue', 'home') for m in rows], dtype=object)[order]
+
+        width = max(len(teams), 1)
+        self._pairs: Dict[Tuple[str, str], int] = {
+            (teams[k // width], teams[k % width]): p for p, k in enumerate(keys.tolist())
+        }
+
+    def _recent_stats(self):
+        """analyze_recent_meetings' counts, momentum and trend for every pair"""
+        seq, length = self.sequence, self.sequence_length
+        safe_length = np.maximum(length, 1)
+        self.recent_home = (seq == HOME).sum(axis=1)
+        self.recent_draws = (seq == DRAW).sum(axis=1)
+        self.recent_away = (seq == AWAY).sum(axis=1)
+        self.recent_home_pct = np.where(length > 0, self.recent_home / safe_length * 100, 0.0)
+        self.recent_away_pct = np.where(length > 0, self.recent_away / safe_length * 100, 0.0)
+        self.recent_draw_pct = np.where(length > 0, self.recent_draws / safe_length * 100, 0.0)
+
+        points = np.select([seq == HOME, seq == DRAW], [3, 1], 0)
+        momentum = (points[:, :3].sum(axis=1) - points[:, 3:6].sum(axis=1)) / 9
+        self.momentum = np.where(length >= 6, momentum, 0.0)
+
+        home_pct, away_pct = self.recent_home_pct, self.recent_away_pct
+        self.trend = np.select(
+            [home_pct > 60, home_pct > 55, away_pct > 60, away_pct > 55, np.abs(home_pct - away_pct) < 10],
+            [0, 1, 2, 3, 4],
+            5,
+        )
+
+    def _patterns(self):
+        """identify_patterns over the recent sequences, one column at a time"""
+        seq, length = self.sequence, self.sequence_length
+        num_pairs = len(seq)
+        rows = np.arange(num_pairs)
+
+        # Streaks of 3+ are recorded when a different result ends them
+        self.streak_result = np.full((num_pairs, MAX_STREAKS), NO_RESULT, dtype=np.int8)
+        self.streak_length = np.zeros((num_pairs, MAX_STREAKS), dtype=np.int8)
+        streaks = np.zeros(num_pairs, dtype=np.int64)
+        streak = np.ones(num_pairs, dtype=np.int64)
+        current = seq[:, 0].copy()
+        for i in range(1, RECENT_MEETINGS):
+            valid = i < length
+            same = seq[:, i] == current
+            ended = valid & ~same & (streak >= 3)
+            slot_rows = rows[ended]
+            self.streak_result[slot_rows, streaks[ended]] = current[ended]
+            self.streak_length[slot_rows, streaks[ended]] = streak[ended]
+            streaks += ended
+            streak = np.where(valid, np.where(same, streak + 1, 1), streak)
+            current = np.where(valid & ~same, seq[:, i], current)
+        self.streak_count = streaks
+
+        alternating = length >= 4
+        for i in range(2, RECENT_MEETINGS):
+            alternating &= (i >= length) | (seq[:, i] == seq[:, i - 2])
+        self.alternating = alternating
+
+        safe_length = np.maximum(length, 1)
+        mixed = (self.recent_home > 0) & (self.recent_away > 0) & (length >= 3)
+        self.home_bias = mixed & (self.recent_home / safe_length > 0.7)
+        self.away_bias = mixed & ~self.home_bias & (self.recent_away / safe_length > 0.7)
+
+    def __len__(self) -> int:
+        return len(self._pairs)
+
+    def __contains__(self, pair: Tuple[str, str]) -> bool:
+        return pair in self._pairs
+
+    def pair_index(self, home_team: str, away_team: str) -> Optional[int]:
+        return self._pairs.get((home_team, away_team))
+
+    def patterns(self, p: int) -> List[str]:
+        patterns = [
+            f"{RESULTS[self.streak_result[p, s]]}_streak_{self.streak_length[p, s]}"
+            for s in range(self.streak_count[p])
+        ]
+        if self.alternating[p]:
+            patterns.append("alternating_pattern")
+        if self.home_bias[p]:
+            patterns.append("strong_home_bias")
+        elif self.away_bias[p]:
+            patterns.append("strong_away_bias")
+        return patterns
+
+    def recent_analysis(self, p: int) -> Dict:
+        """analyze_recent_meetings output for pair p"""
+        length = int(self.sequence_length[p])
+        if length == 0:
+            return {'trend': 'neutral', 'momentum': 0, 'patterns': []}
+        codes = self.sequence[p, :length]
+        return {
+            'trend': str(TRENDS[self.trend[p]]),
+            'momentum': round(float(self.momentum[p]), 3),
+            'recent_home_win_pct': round(float(self.recent_home_pct[p]), 1),
+            'recent_away_win_pct': round(float(self.recent_away_pct[p]), 1),
+            'recent_draw_pct': round(float(self.recent_draw_pct[p]), 1),
+            'patterns': self.patterns(p),
+            'sequence': ''.join(RESULTS[c][0].upper() for c in codes),
+        }
+
+    def last_meetings(self, p: int) -> List[Dict]:
+        start = self._starts[p]
+        meetings = []
+        for row in range(start, start + int(self.sequence_length[p])):
+            meetings.append({
+                'date': str(self._dates[row]),
+                'result': str(RESULTS[self._result[row]]),
+                'score': f"{self._home_score[row]}-{self._away_score[row]}",
+                'competition': self._league[row],
+                'venue': self._venue[row],
+            })
+        return meetings
+
+    def lookup(self, home_team: str, away_team: str) -> Optional[Dict]:
+        """Aggregates for one pairing, or None if they never met"""
+        p = self.pair_index(home_team, away_team)
+        if p is None:
+            return None
+        last_meetings = self.last_meetings(p)
+        return {
+            'home_wins': int(self.home_wins[p]),
+            'away_wins': int(self.away_wins[p]),
+            'draws': int(self.draws[p]),
+            'total_meetings': int(self.total[p]),
+            'home_goals': int(self.home_goals[p]),
+            'away_goals': int(self.away_goals[p]),
+            'last_meeting_date': str(self._dates[self._starts[p]]),
+            'last_meeting_result': last_meetings[0]['result'] if last_meetings else None,
+            'last_meetings': last_meetings,
+            'recent_analysis': self.recent_analysis(p),
+        }
+
+def point_in_time_h2h(home_teams, away_teams, home_scores, away_scores,
+                      limit: Optional[int] = SEARCH_LIMIT) -> Dict[str, np.ndarray]:
+    """
+    Head-to-head aggregates each match's pairing had before kick-off
+
+    Input arrays must be sorted by date. Meetings are grouped per
+    (home, away) pairing; exclusive prefix sums along each group give the
+    totals over the previous `limit` meetings and the last
+    RECENT_MEETINGS results (counts and last-3 vs previous-3 momentum)
+    without looking at the match itself or anything after it.
+    """
+    home_teams = np.asarray(home_teams, dtype=str)
+    away_teams = np.asarray(away_teams, dtype=str)
+    home_scores = np.asarray(home_scores, dtype=np.int64)
+    away_scores = np.asarray(away_scores, dtype=np.int64)
+    n = home_scores.size
+
+    teams, team_ids = np.unique(np.concatenate([home_teams, away_teams]), return_inverse=True)
+    pair = team_ids[:n].astype(np.int64) * max(len(teams), 1) + team_ids[n:]
+    order = np.lexsort((np.arange(n), pair))
+    _, starts, counts = np.unique(pair[order], return_index=True, return_counts=True)
+    start = np.empty(n, dtype=np.int64)
+    start[order] = np.repeat(starts, counts)
+    position = np.empty(n, dtype=np.int64)
+    position[order] = np.arange(n)
+
+    result = 1 + np.sign(away_scores - home_scores)
+    per_match = {
+        'home_wins': result == HOME,
+        'draws': result == DRAW,
+        'away_wins': result == AWAY,
+        'home_goals': home_scores,
+        'away_goals': away_scores,
+        'points': np.select([result == HOME, result == DRAW], [3, 1], 0),
+    }
+
+    def window(values: np.ndarray, span: Optional[int], end_offset: int = 0) -> np.ndarray:
+        """Sum over the `span` meetings ending `end_offset` meetings before this one"""
+        prefix = np.concatenate([[0], np.cumsum(values[order])])
+        end = np.maximum(position - end_offset, start)
+        lo = start if span is None else np.maximum(end - span, start)
+        return prefix[end] - prefix[lo]
+
+    h2h = {name: window(values.astype(np.int64), limit) for name, values in per_match.items() if name != 'points'}
+    h2h['total_meetings'] = h2h['home_wins'] + h2h['draws'] + h2h['away_wins']
+    for name in ('home_wins', 'draws', 'away_wins'):
+        h2h[f'recent_{name}'] = window(per_match[name].astype(np.int64), RECENT_MEETINGS)
+    h2h['recent_meetings'] = np.minimum(position - start, RECENT_MEETINGS)
+    points = per_match['points'].astype(np.int64)
+    h2h['momentum'] = np.where(
+        h2h['recent_meetings'] >= 6,
+        (window(points, 3) - window(points, 3, end_offset=3)) / 9,
+        0.0,
+    )
+    return h2h
@@ -8,6 +8,11 @@ from datetime import datetime
 import logging
 from collections import Counter
 
+from api_client import CachedApiClient, shared_client
+from snapshot import SnapshotClient
+from feature_store import FeatureStore, fingerprint, rows_to_columns
+from h2h_index import H2HIndex
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,15 +28,19 @@ class H2HPrediction:
     raw_data: Dict
 
 class EnhancedHeadToHeadAnalyzer:
-    def __init__(self, api_base_url: str = "http://localhost:8000/api"):
+    def __init__(self, api_base_url: str = "http://localhost:8000/api",
+                 http_client: Optional[CachedApiClient] = None,
+                 h2h_index: Optional[H2HIndex] = None):
         self.api_base_url = api_base_url
-        self.session = requests.Session()
         
-        # Configure session
-        self.session.headers.update({
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-        })
+        # GETs go through the cache shared with the other analyzers;
+        # writes use its session directly
+        self.http = http_client or shared_client()
+        self.session = self.http.session
+        
+        # Precomputed pairings (H2HIndex, or a live AggregateEngine) replace
+        # the per-pair /matches/search call
+        self.h2h_index = h2h_index
         
         # Analysis parameters
         self.weights = {
@@ -51,11 +60,16 @@ class EnhancedHeadToHeadAnalyzer:
             'goal_margin_factor': 2.0,  # Factor for goal difference importance
         }
     
+    @classmethod
+    def from_snapshot(cls, path: str, **kwargs) -> "EnhancedHeadToHeadAnalyzer":
+        """Analyzer reading a local snapshot (SQLite file or JSONL directory) instead of the API"""
+        return cls(http_client=SnapshotClient.open(path), **kwargs)
+    
     def fetch_head_to_head(self, match_id: int) -> Optional[Dict]:
         """Fetch head-to-head data for a match"""
         try:
             url = f"{self.api_base_url}/head-to-head/{match_id}"
-            response = self.session.get(url, timeout=10)
+            response = self.http.get(url, timeout=10)
             
             if response.status_code == 200:
                 data = response.json().get('data', {})
@@ -75,7 +89,7 @@ class EnhancedHeadToHeadAnalyzer:
         try:
             # First get match details to get team IDs
             match_url = f"{self.api_base_url}/matches/{match_id}"
-            match_response = self.session.get(match_url, timeout=5)
+            match_response = self.http.get(match_url, timeout=5)
             
             if match_response.status_code != 200:
                 return None
@@ -87,6 +101,9 @@ class EnhancedHeadToHeadAnalyzer:
             if not home_team_code or not away_team_code:
                 return None
             
+            if self.h2h_index is not None:
+                return self.h2h_from_index(home_team_code, away_team_code)
+            
             # Search for historical matches between these teams
             params = {
                 'home_team': home_team_code,
@@ -96,7 +113,7 @@ class EnhancedHeadToHeadAnalyzer:
             }
             
             search_url = f"{self.api_base_url}/matches/search"
-            response = self.session.get(search_url, params=params, timeout=10)
+            response = self.http.get(search_url, params=params, timeout=10)
             
             if response.status_code != 200:
                 return None
@@ -113,6 +130,35 @@ class EnhancedHeadToHeadAnalyzer:
             logger.error(f"Error generating H2H from teams: {e}")
             return None
     
+    def h2h_from_index(self, home_team: str, away_team: str) -> Optional[Dict]:
+        """generate_h2h_from_teams' result from the attached H2HIndex, plus its recent analysis"""
+        record = self.h2h_index.lookup(home_team, away_team)
+        if not record:
+            return None
+        
+        home_wins, away_wins, draws = record['home_wins'], record['away_wins'], record['draws']
+        stats = self.calculate_h2h_statistics(
+            home_wins, away_wins, draws,
+            record['home_goals'], record['away_goals'], record['total_meetings']
+        )
+        
+        return {
+            'match_id': None,
+            'form': f"{home_wins}-{draws}-{away_wins}",
+            'home_wins': home_wins,
+            'away_wins': away_wins,
+            'draws': draws,
+            'total_meetings': record['total_meetings'],
+            'home_goals': record['home_goals'],
+            'away_goals': record['away_goals'],
+            'last_meeting_date': record['last_meeting_date'],
+            'last_meeting_result': record['last_meeting_result'],
+            'last_meetings': record['last_meetings'],
+            'stats': stats,
+            'recent_analysis': record['recent_analysis'],
+            'generated': True,
+        }
+    
     def analyze_historical_matches(self, matches: List[Dict], home_team: str, away_team: str) -> Dict:
         """Analyze historical matches to create H2H data"""
         home_wins = 0
@@ -673,6 +719,22 @@ class EnhancedHeadToHeadAnalyzer:
         
         return features
     
+    def store_ml_features(self, store: FeatureStore, h2h_data: Dict[int, Dict]) -> np.ndarray:
+        """
+        generate_ml_features rows for {match_id: H2H data}, via a feature store
+        
+        Rows whose H2H data is unchanged are read back instead of recomputed;
+        matches without H2H data get NaN features.
+        """
+        match_ids = list(h2h_data)
+        fingerprints = [fingerprint(h2h_data[match_id]) for match_id in match_ids]
+        
+        def compute(indices: List[int]) -> Dict[str, np.ndarray]:
+            rows = [self.generate_ml_features(h2h_data[match_ids[i]]) for i in indices]
+            return rows_to_columns(rows, store.feature_names or None)
+        
+        return store.get_or_compute(match_ids, fingerprints, compute)
+    
     def save_prediction_to_api(self, match_id: int, prediction: H2HPrediction) -> bool:
         """Save H2H prediction back to Laravel API"""
         try:
@@ -689,6 +751,11 @@ class EnhancedHeadToHeadAnalyzer:
             url = f"{self.api_base_url}/matches/{match_id}/h2h-prediction"
             response = self.session.post(url, json=data, timeout=10)
             
+            # Cached reads of this match no longer reflect the stored prediction
+            for stale_url in (url, f"{self.api_base_url}/matches/{match_id}",
+                              f"{self.api_base_url}/head-to-head/{match_id}"):
+                self.http.invalidate(stale_url)
+            
             return response.status_code == 200
             
         except Exception as e:
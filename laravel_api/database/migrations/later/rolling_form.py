@@ -0,0 +1,211 @@
+# python_generator/rolling_form.py
+import numpy as np
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Per-game quantities accumulated for every team
+METRICS = ('played', 'points', 'wins', 'draws', 'losses',
+           'goals_scored', 'goals_conceded', 'clean_sheets', 'failed_to_score')
+EWM_METRICS = ('points', 'goals_scored', 'goals_conceded', 'clean_sheets', 'failed_to_score')
+OUTCOME_CHARS = np.array(['W', 'D', 'L'])
+
+FORM_WINDOW = 10
+FORM_STRING_LENGTH = 5
+MOMENTUM_SPAN = 3
+
+class RollingFormEngine:
+    """
+    Point-in-time form for every team before every match, from one pass
+
+    Appearances are laid out as a (team, game number) matrix, and every
+    metric is stored as an exclusive cumulative sum along the games axis,
+    so the last-N window before game k is E[k] - E[k - N]. Nothing at or
+    after kick-off enters a team's numbers. Exponentially decayed metrics
+    are advanced one game column at a time across all teams and
+    bias-corrected by the accumulated weight.
+
+    Rolling metrics follow AggregateEngine's definitions: form_rating is
+    points per available point on a 0-10 scale and momentum is the last
+    three results against the three before (-1..1, needs 6 games). With
+    by_venue=True a team's home and away games are separate histories.
+    """
+
+    def __init__(self, home_teams, away_teams, home_scores, away_scores, dates=None,
+                 window: int = FORM_WINDOW, halflife: float = 5.0, by_venue: bool = False):
+        self.home_teams = np.asarray(home_teams, dtype=str)
+        self.away_teams = np.asarray(away_teams, dtype=str)
+        home_scores = np.asarray(home_scores, dtype=np.int64)
+        away_scores = np.asarray(away_scores, dtype=np.int64)
+        self.dates = np.asarray(dates if dates is not None else np.arange(len(home_scores)).astype(str), dtype=str)
+        if self.dates.size > 1 and np.any(self.dates[1:] < self.dates[:-1]):
+            raise ValueError("Matches must be sorted by date")
+
+        self.window = window
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.by_venue = by_venue
+        self._build(home_scores, away_scores)
+
+    @classmethod
+    def from_matches(cls, matches: Iterable[Dict], **kwargs) -> "RollingFormEngine":
+        """Completed matches in API shape, sorted by match_date here"""
+        rows = sorted(
+            (m for m in matches if m.get('home_score') is not None and m.get('away_score') is not None),
+            key=lambda m: m.get('match_date') or '',
+        )
+        engine = cls(
+            [m['home_team_code'] for m in rows], [m['away_team_code'] for m in rows],
+            [m['home_score'] for m in rows], [m['away_score'] for m in rows],
+            [m.get('match_date') or '' for m in rows], **kwargs,
+        )
+        engine.match_ids = np.array([m.get('id', -1) for m in rows], dtype=np.int64)
+        return engine
+
+    def _build(self, home_scores: np.ndarray, away_scores: np.ndarray):
+        n = home_scores.size
+        self.teams, team_ids = np.unique(np.concatenate([self.home_teams, self.away_teams]), return_inverse=True)
+        venue = np.repeat([0, 1], n)
+        key = team_ids * 2 + venue if self.by_venue else team_ids
+        match_index = np.tile(np.arange(n), 2)
+        scored = np.concatenate([home_scores, away_scores])
+        conceded = np.concatenate([away_scores, home_scores])
+
+        # Group appearances by team (and venue), in match order
+        order = np.lexsort((match_index, key))
+        groups, starts, counts = np.unique(key[order], return_index=True, return_counts=True)
+        self.num_groups = len(groups)
+        self.max_games = int(counts.max()) if n else 0
+        self._group_of_key = {int(k): g for g, k in enumerate(groups)}
+
+        group = np.empty(2 * n, dtype=np.int64)
+        game = np.empty(2 * n, dtype=np.int64)
+        group[order] = np.repeat(np.arange(self.num_groups), counts)
+        game[order] = np.arange(2 * n) - np.repeat(starts, counts)
+        self._app_group, self._app_game = group, game
+        self.games_played = counts
+
+        outcome = np.where(scored > conceded, 0, np.where(scored == conceded, 1, 2))
+        per_game = {
+            'played': np.ones(2 * n),
+            'points': np.select([outcome == 0, outcome == 1], [3.0, 1.0], 0.0),
+            'wins': (outcome == 0).astype(float),
+            'draws': (outcome == 1).astype(float),
+            'losses': (outcome == 2).astype(float),
+            'goals_scored': scored.astype(float),
+            'goals_conceded': conceded.astype(float),
+            'clean_sheets': (conceded == 0).astype(float),
+            'failed_to_score': (scored == 0).astype(float),
+        }
+
+        shape = (self.num_groups, self.max_games)
+        self._outcomes = np.full(shape, -1, dtype=np.int8)
+        self._outcomes[group, game] = outcome
+        self._game_dates = np.full(shape, '', dtype=self.dates.dtype)
+        self._game_dates[group, game] = np.tile(self.dates, 2)
+
+        # Exclusive prefix sums: column k holds the total before game k
+        self._prefix = {}
+        matrix = np.zeros(shape)
+        for name in METRICS:
+            matrix[:] = 0.0
+            matrix[group, game] = per_game[name]
+            prefix = np.zeros((self.num_groups, self.max_games + 1))
+            np.cumsum(matrix, axis=1, out=prefix[:, 1:])
+            self._prefix[name] = prefix
+
+        # Decayed state before each game; padded columns just carry it forward
+        self._ewm = {}
+        weight = np.zeros((self.num_groups, self.max_games + 1))
+        values = {name: np.zeros((self.num_groups, self.max_games + 1)) for name in EWM_METRICS}
+        played = np.zeros(shape, dtype=bool)
+        played[group, game] = True
+        per_game_matrix = {}
+        for name in EWM_METRICS:
+            per_game_matrix[name] = np.zeros(shape)
+            per_game_matrix[name][group, game] = per_game[name]
+        decay = 1 - self.alpha
+        for k in range(self.max_games):
+            active = played[:, k]
+            weight[:, k + 1] = np.where(active, decay * weight[:, k] + self.alpha, weight[:, k])
+            for name in EWM_METRICS:
+                values[name][:, k + 1] = np.where(
+                    active, decay * values[name][:, k] + self.alpha * per_game_matrix[name][:, k], values[name][:, k])
+        self._ewm_weight = weight
+        self._ewm = values
+
+    def _group(self, team: str, venue: Optional[str]) -> Optional[int]:
+        idx = np.searchsorted(self.teams, team)
+        if idx >= len(self.teams) or self.teams[idx] != team:
+            return None
+        key = int(idx) * 2 + (venue == 'away') if self.by_venue else int(idx)
+        return self._group_of_key.get(key)
+
+    def _form_columns(self, group: np.ndarray, game: np.ndarray) -> Dict[str, np.ndarray]:
+        """Form before game `game` of each group, as columns"""
+        def window(span):
+            lo = np.maximum(game - span, 0)
+            return {name: prefix[group, game] - prefix[group, lo] for name, prefix in self._prefix.items()}
+
+        last = window(self.window)
+        played = last['played']
+        safe = np.maximum(played, 1)
+
+        recent = self._prefix['points'][group, game] - self._prefix['points'][group, np.maximum(game - MOMENTUM_SPAN, 0)]
+        before = (self._prefix['points'][group, np.maximum(game - MOMENTUM_SPAN, 0)]
+                  - self._prefix['points'][group, np.maximum(game - 2 * MOMENTUM_SPAN, 0)])
+        momentum = np.where(np.minimum(game, self.window) >= 2 * MOMENTUM_SPAN, (recent - before) / 9, 0.0)
+
+        columns = {
+            'matches_played': played,
+            'wins': last['wins'],
+            'draws': last['draws'],
+            'losses': last['losses'],
+            'goals_scored': last['goals_scored'],
+            'goals_conceded': last['goals_conceded'],
+            'avg_goals_scored': np.round(last['goals_scored'] / safe, 2),
+            'avg_goals_conceded': np.round(last['goals_conceded'] / safe, 2),
+            'clean_sheets': last['clean_sheets'],
+            'failed_to_score': last['failed_to_score'],
+            'form_rating': np.round(last['points'] / (3 * safe) * 10, 2),
+            'form_momentum': np.round(momentum, 3),
+            'win_probability': np.round(last['wins'] / safe, 3),
+            'form_points': window(FORM_STRING_LENGTH)['points'],
+            'present': played > 0,
+        }
+
+        weight = self._ewm_weight[group, game]
+        safe_weight = np.where(weight > 0, weight, 1.0)
+        for name in EWM_METRICS:
+            columns[f'ewm_{name}'] = np.where(weight > 0, self._ewm[name][group, game] / safe_weight, np.nan)
+        columns['ewm_form_rating'] = columns['ewm_points'] / 3 * 10
+        return columns
+
+    def fixture_form(self) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        Pre-match form of the home and away side for every input match
+
+        Columns use aggregate_recent_forms' field names (plus form_points and
+        ewm_* metrics), so they drop into form_features.FormArrays.
+        """
+        n = self.home_teams.size
+        home = self._form_columns(self._app_group[:n], self._app_game[:n])
+        away = self._form_columns(self._app_group[n:], self._app_game[n:])
+        return home, away
+
+    def form_at(self, team: str, date: str, venue: Optional[str] = None) -> Optional[Dict]:
+        """Form of a team going into a fixture on `date` (games before that date only)"""
+        g = self._group(team, venue)
+        if g is None:
+            return None
+        played = int(self.games_played[g])
+        game = int(np.searchsorted(self._game_dates[g, :played], date, side='left'))
+        columns = self._form_columns(np.array([g]), np.array([game]))
+        form = {name: values[0].item() for name, values in columns.items()}
+
+        outcomes = self._outcomes[g, max(0, game - FORM_STRING_LENGTH):game]
+        form['form_string'] = ''.join(OUTCOME_CHARS[outcomes])
+        for name in ('matches_played', 'wins', 'draws', 'losses', 'goals_scored',
+                     'goals_conceded', 'clean_sheets', 'failed_to_score'):
+            form[name] = int(form[name])
+        return form
@@ -0,0 +1,309 @@
+# python_generator/snapshot.py
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+import logging
+
+from api_client import ApiResponse
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    home_team_code TEXT,
+    away_team_code TEXT,
+    match_date TEXT,
+    home_score INTEGER,
+    away_score INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_matches_teams ON matches (home_team_code, away_team_code, match_date);
+
+CREATE TABLE IF NOT EXISTS teams (
+    code TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS team_forms (
+    match_id INTEGER,
+    team_id TEXT,
+    venue TEXT,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_team_forms_key ON team_forms (match_id, team_id, venue);
+CREATE INDEX IF NOT EXISTS idx_team_forms_team ON team_forms (team_id, venue, created_at);
+
+CREATE TABLE IF NOT EXISTS head_to_head (
+    match_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+# JSONL export layout: one file per table in the snapshot directory
+JSONL_TABLES = ('matches', 'teams', 'team_forms', 'head_to_head')
+
+# SQLite caps bound parameters per statement; bulk lookups are chunked below it
+MAX_PARAMS = 900
+
+def _chunks(values: List[Any], size: int = MAX_PARAMS) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+class Snapshot:
+    """
+    Local copy of the matches, teams, team_forms and head_to_head resources
+
+    Rows are stored as the JSON the API returns, next to indexed key columns,
+    so lookups by id, team code or (match, team, venue) are index seeks and
+    bulk loads use executemany. A snapshot is either a SQLite file or a
+    directory of JSONL exports (matches.jsonl, teams.jsonl, ...), which is
+    imported into an in-memory database on open.
+    """
+
+    def __init__(self, db_path: str = ":memory:"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def open(cls, path: str) -> "Snapshot":
+        """SQLite file, or JSONL export directory"""
+        if os.path.isdir(path):
+            return cls.from_jsonl(path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Snapshot not found: {path}")
+        return cls(path)
+
+    @classmethod
+    def from_jsonl(cls, directory: str, db_path: str = ":memory:") -> "Snapshot":
+        snapshot = cls(db_path)
+        for table in JSONL_TABLES:
+            path = os.path.join(directory, f"{table}.jsonl")
+            if not os.path.exists(path):
+                logger.warning(f"Snapshot {directory} has no {table}.jsonl")
+                continue
+            with open(path) as f:
+                rows = (json.loads(line) for line in f if line.strip())
+                snapshot.load(**{table: rows})
+        return snapshot
+
+    @classmethod
+    def from_dataset(cls, dataset: Dict[str, Any], db_path: str = ":memory:") -> "Snapshot":
+        """Snapshot from in-memory rows, e.g. stub_api_server.sample_dataset()"""
+        snapshot = cls(db_path)
+        snapshot.load(**{
+            table: rows.values() if isinstance(rows, dict) else rows
+            for table, rows in dataset.items() if table in JSONL_TABLES
+        })
+        return snapshot
+
+    def export_jsonl(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            for table in JSONL_TABLES:
+                with open(os.path.join(directory, f"{table}.jsonl"), 'w') as f:
+                    for (data,) in self._conn.execute(f"SELECT data FROM {table} ORDER BY rowid"):
+                        f.write(data + '\n')
+
+    def load(self, matches: Iterable[Dict] = (), teams: Iterable[Dict] = (),
+             team_forms: Iterable[Dict] = (), head_to_head: Iterable[Dict] = ()):
+        """Bulk upsert rows in the API's JSON shape"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((m['id'], m.get('home_team_code'), m.get('away_team_code'), m.get('match_date'),
+                  m.get('home_score'), m.get('away_score'), json.dumps(m)) for m in matches),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO teams VALUES (?, ?)",
+                ((t['code'], json.dumps(t)) for t in teams),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO team_forms VALUES (?, ?, ?, ?, ?)",
+                ((f.get('match_id'), f.get('team_id'), f.get('venue'), f.get('created_at'), json.dumps(f))
+                 for f in team_forms),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO head_to_head VALUES (?, ?)",
+                ((h['match_id'], json.dumps(h)) for h in head_to_head),
+            )
+
+    def _rows(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        with self._lock:
+            return [json.loads(data) for (data,) in self._conn.execute(sql, params)]
+
+    def _many(self, sql: str, keys: List[Any]) -> List[Dict]:
+        """Run an IN (...) lookup over keys, chunked under SQLite's parameter limit"""
+        rows = []
+        for chunk in _chunks(keys):
+            rows.extend(self._rows(sql.format(marks=','.join('?' * len(chunk))), tuple(chunk)))
+        return rows
+
+    def match(self, match_id: int) -> Optional[Dict]:
+        rows = self._rows("SELECT data FROM matches WHERE id = ?", (match_id,))
+        return rows[0] if rows else None
+
+    def matches(self, ids: Optional[List[int]] = None) -> List[Dict]:
+        if ids is None:
+            return self._rows("SELECT data FROM matches ORDER BY id")
+        return self._many("SELECT data FROM matches WHERE id IN ({marks})", ids)
+
+    def search_matches(self, home_team: str, away_team: str, limit: int = 20) -> List[Dict]:
+        """Completed meetings of home_team against away_team, newest first"""
+        return self._rows(
+            "SELECT data FROM matches WHERE home_team_code = ? AND away_team_code = ? "
+            "AND home_score IS NOT NULL AND away_score IS NOT NULL "
+            "ORDER BY match_date DESC LIMIT ?",
+            (home_team, away_team, limit),
+        )
+
+    def team(self, code: str) -> Optional[Dict]:
+        rows = self._rows("SELECT data FROM teams WHERE code = ?", (code,))
+        return rows[0] if rows else None
+
+    def teams(self, codes: Optional[List[str]] = None) -> List[Dict]:
+        if codes is None:
+            return self._rows("SELECT data FROM teams ORDER BY code")
+        return self._many("SELECT data FROM teams WHERE code IN ({marks})", codes)
+
+    def team_forms(self, match_id: Optional[int] = None, team_id: Optional[str] = None,
+                   venue: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Forms matching the given filters; with a limit, newest first"""
+        clauses, params = [], []
+        for column, value in (('match_id', match_id), ('team_id', team_id), ('venue', venue)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT data FROM team_forms"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if limit is not None:
+            sql += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+            params.append(limit)
+        else:
+            sql += " ORDER BY rowid"
+        return self._rows(sql, tuple(params))
+
+    def team_forms_for_matches(self, match_ids: List[int]) -> List[Dict]:
+        return self._many("SELECT data FROM team_forms WHERE match_id IN ({marks}) ORDER BY rowid", match_ids)
+
+    def head_to_head(self, match_id: int) -> Optional[Dict]:
+        rows = self._rows("SELECT data FROM head_to_head WHERE match_id = ?", (match_id,))
+        return rows[0] if rows else None
+
+    def head_to_heads(self, match_ids: List[int]) -> List[Dict]:
+        return self._many("SELECT data FROM head_to_head WHERE match_id IN ({marks})", match_ids)
+
+    def close(self):
+        self._conn.close()
+
+class _ReadOnlySession:
+    """Stands in for the requests session: writes are refused, not sent anywhere"""
+
+    def _refuse(self, url: str, *args, **kwargs) -> ApiResponse:
+        logger.warning(f"Snapshot mode is read-only; not writing to {url}")
+        return ApiResponse(405, b'{"message": "Snapshot is read-only"}', {'Content-Type': 'application/json'}, url)
+
+    post = put = patch = delete = _refuse
+
+class SnapshotClient:
+    """
+    Drop-in for CachedApiClient that answers API GETs from a Snapshot
+
+    Pass it as http_client to the analyzers to run them on local data with
+    the same code path as HTTP mode. URLs are routed on their path, so any
+    api_base_url works. The bulk filters (?ids=, ?codes=, ?match_ids=) are
+    supported, so ApiLoaders batches resolve as single indexed queries.
+    """
+
+    def __init__(self, snapshot: Snapshot):
+        self.snapshot = snapshot
+        self.session = _ReadOnlySession()
+
+    @classmethod
+    def open(cls, path: str) -> "SnapshotClient":
+        return cls(Snapshot.open(path))
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None) -> ApiResponse:
+        status, body = self.route(urlparse(url).path, params or {})
+        return ApiResponse(status, json.dumps(body).encode(), {'Content-Type': 'application/json'}, url)
+
+    async def aget(self, transport: Any, url: str, params: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None) -> ApiResponse:
+        return self.get(url, params=params, timeout=timeout)
+
+    def bind(self, transport: Any) -> "BoundSnapshotClient":
+        """Async view for the batch paths; the transport is never used"""
+        return BoundSnapshotClient(self)
+
+    def invalidate(self, url: Optional[str] = None, params: Optional[Dict[str, Any]] = None):
+        """Nothing is cached on top of the snapshot"""
+
+    def route(self, path: str, params: Dict[str, Any]) -> Tuple[int, Dict]:
+        parts = [p for p in path.split('/') if p]
+        resources = ('matches', 'teams', 'team-forms', 'head-to-head')
+        start = next((i for i, part in enumerate(parts) if part in resources), None)
+        if start is None:
+            return 404, {'message': 'Not Found'}
+        resource, rest = parts[start], parts[start + 1:]
+        ident = rest[0] if rest else None
+        db = self.snapshot
+
+        def id_list(name: str, cast=str) -> List[Any]:
+            return [cast(v) for v in str(params[name]).split(',') if v]
+
+        def found(row: Optional[Dict]) -> Tuple[int, Dict]:
+            return (200, {'data': row}) if row else (404, {'message': 'Not Found'})
+
+        if resource == 'matches':
+            if ident == 'search':
+                limit = int(params.get('limit', 20))
+                return 200, {'data': db.search_matches(params.get('home_team'), params.get('away_team'), limit)}
+            if ident is not None:
+                return found(db.match(int(ident)) if ident.isdigit() else None)
+            return 200, {'data': db.matches(id_list('ids', int) if 'ids' in params else None)}
+
+        if resource == 'teams':
+            if ident is not None:
+                return found(db.team(ident))
+            return 200, {'data': db.teams(id_list('codes') if 'codes' in params else None)}
+
+        if resource == 'team-forms' and ident is None:
+            if 'match_ids' in params:
+                return 200, {'data': db.team_forms_for_matches(id_list('match_ids', int))}
+            match_id = params.get('match_id')
+            limit = params.get('limit')
+            return 200, {'data': db.team_forms(
+                match_id=int(match_id) if match_id is not None else None,
+                team_id=params.get('team_id'),
+                venue=params.get('venue'),
+                limit=int(limit) if limit is not None else None,
+            )}
+
+        if resource == 'head-to-head':
+            if ident is not None:
+                return found(db.head_to_head(int(ident)) if ident.isdigit() else None)
+            if 'match_ids' in params:
+                return 200, {'data': db.head_to_heads(id_list('match_ids', int))}
+
+        return 404, {'message': 'Not Found'}
+
+class BoundSnapshotClient:
+    """SnapshotClient with the async get() signature of BoundCachedClient"""
+
+    def __init__(self, client: SnapshotClient):
+        self.client = client
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  timeout: Optional[float] = None) -> ApiResponse:
+        return self.client.get(url, params=params, timeout=timeout)
+
+    async def drain(self):
+        """No background refreshes to wait for"""
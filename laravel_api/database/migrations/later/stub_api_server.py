@@ -0,0 +1,215 @@
+# python_generator/stub_api_server.py
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Unfiltered index responses are paginated like Laravel's default
+PAGE_SIZE = 15
+
+def sample_dataset(num_matches: int = 100, num_teams: int = 20, seed: int = 7) -> Dict:
+    """Matches, teams, team forms and head-to-head rows shaped like the Laravel resources"""
+    rng = random.Random(seed)
+    teams = {}
+    for i in range(num_teams):
+        code = f"T{i:02d}"
+        overall = rng.randint(60, 90)
+        teams[code] = {
+            'code': code,
+            'name': f"Team {i:02d}",
+            'overall_rating': overall,
+            'ratings': {'overall': overall, 'form': rng.randint(50, 90),
+                        'home': rng.randint(55, 90), 'away': rng.randint(50, 85)},
+        }
+
+    codes = list(teams)
+    matches, forms, head_to_head = {}, [], {}
+    for match_id in range(1, num_matches + 1):
+        home, away = rng.sample(codes, 2)
+        matches[match_id] = {'id': match_id, 'home_team_code': home, 'away_team_code': away}
+        for code, venue in ((home, 'home'), (away, 'away')):
+            results = [rng.choice('WDL') for _ in range(5)]
+            forms.append({
+                'match_id': match_id,
+                'team_id': code,
+                'venue': venue,
+                'form_rating': round(rng.uniform(3, 9), 2),
+                'form_momentum': round(rng.uniform(-1, 1), 2),
+                'raw_form': [{'result': r, 'goals_scored': rng.randint(0, 3),
+                              'goals_conceded': rng.randint(0, 3)} for r in results],
+            })
+        head_to_head[match_id] = {
+            'match_id': match_id,
+            'home_wins': rng.randint(0, 5), 'away_wins': rng.randint(0, 5), 'draws': rng.randint(0, 3),
+        }
+    return {'matches': matches, 'teams': teams, 'team_forms': forms, 'head_to_head': head_to_head}
+
+class StubApiServer:
+    """
+    Local stand-in for the Laravel API, for exercising the clients without it
+
+    Serves the item routes the analyzers use (/matches/{id}, /teams/{code},
+    /team-forms, /head-to-head/{id}) under /api. With bulk=True it also
+    honours the bulk filters (?ids=, ?codes=, ?match_ids=); with bulk=False
+    the list routes ignore them like the current Laravel index actions do.
+    200 responses carry an ETag and If-None-Match is answered with a 304.
+    Every request path is recorded in `requests` (its status in `statuses`,
+    its arrival time in `request_times`); `delay` holds each response back,
+    and `peak_in_flight` is the most requests served at once.
+
+        with StubApiServer(sample_dataset()) as server:
+            analyzer = EnhancedTeamFormAnalyzer(api_base_url=server.base_url)
+    """
+
+    def __init__(self, dataset: Optional[Dict] = None, bulk: bool = True, port: int = 0,
+                 delay: float = 0.0):
+        self.dataset = dataset or sample_dataset()
+        self.bulk = bulk
+        self.delay = delay
+        self.requests: List[str] = []
+        self.statuses: List[int] = []
+        self.request_times: List[float] = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self) -> "StubApiServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "StubApiServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_log(self):
+        with self._lock:
+            self.requests.clear()
+            self.statuses.clear()
+            self.request_times.clear()
+            self.peak_in_flight = self.in_flight
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(self.path)
+                    stub.request_times.append(time.monotonic())
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+                try:
+                    if stub.delay:
+                        time.sleep(stub.delay)
+                    parsed = urlparse(self.path)
+                    query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                    status, body = stub.route(parsed.path, query)
+
+                    payload = json.dumps(body).encode()
+                    etag = f'"{hashlib.md5(payload).hexdigest()}"'
+                    if status == 200 and self.headers.get('If-None-Match') == etag:
+                        status, payload = 304, b''
+                    with stub._lock:
+                        stub.statuses.append(status)
+
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    if status in (200, 304):
+                        self.send_header('ETag', etag)
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def route(self, path: str, query: Dict[str, str]):
+        parts = [p for p in path.split('/') if p]
+        if not parts or parts[0] != 'api' or len(parts) < 2:
+            return 404, {'message': 'Not Found'}
+        resource, ident = parts[1], parts[2] if len(parts) > 2 else None
+        data = self.dataset
+
+        def ids(param):
+            return [v for v in query[param].split(',') if v]
+
+        if resource == 'matches':
+            if ident is not None:
+                match = data['matches'].get(int(ident)) if ident.isdigit() else None
+                return (200, {'data': match}) if match else (404, {'message': 'Match not found'})
+            rows = list(data['matches'].values())
+            if self.bulk and 'ids' in query:
+                wanted = set(ids('ids'))
+                return 200, {'data': [m for m in rows if str(m['id']) in wanted]}
+            return 200, {'data': rows[:PAGE_SIZE]}
+
+        if resource == 'teams':
+            if ident is not None:
+                team = data['teams'].get(ident)
+                return (200, {'data': team}) if team else (404, {'message': 'Team not found'})
+            rows = list(data['teams'].values())
+            if self.bulk and 'codes' in query:
+                wanted = set(ids('codes'))
+                return 200, {'data': [t for t in rows if t['code'] in wanted]}
+            return 200, {'data': rows[:PAGE_SIZE]}
+
+        if resource == 'team-forms' and ident is None:
+            rows = data['team_forms']
+            if self.bulk and 'match_ids' in query:
+                wanted = set(ids('match_ids'))
+                return 200, {'data': [f for f in rows if str(f['match_id']) in wanted]}
+            filters = [field for field in ('match_id', 'team_id', 'venue') if field in query]
+            for field in filters:
+                rows = [f for f in rows if str(f[field]) == query[field]]
+            if 'limit' in query:
+                # Newest first, as requested with order_by=created_at&order=desc
+                return 200, {'data': rows[-int(query['limit']):][::-1]}
+            return 200, {'data': rows if filters else rows[:PAGE_SIZE]}
+
+        if resource == 'head-to-head':
+            if ident is not None:
+                h2h = data['head_to_head'].get(int(ident)) if ident.isdigit() else None
+                return (200, {'data': h2h}) if h2h else (404, {'message': 'Not Found'})
+            if self.bulk and 'match_ids' in query:
+                wanted = set(ids('match_ids'))
+                return 200, {'data': [h for k, h in data['head_to_head'].items() if str(k) in wanted]}
+            return 404, {'message': 'Not Found'}
+
+        return 404, {'message': 'Not Found'}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with StubApiServer(sample_dataset()) as server:
+        print(f"Stub API listening on {server.base_url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
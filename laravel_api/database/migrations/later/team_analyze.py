@@ -1,13 +1,16 @@
 # python_generator/team_analyzer.py
+from api_client import shared_client
 
 class TeamAnalyzer:
-    def __init__(self, api_base_url="http://laravel-api.test/api"):
+    def __init__(self, api_base_url="http://laravel-api.test/api", http_client=None):
         self.api_base_url = api_base_url
+        # Shares cached team lookups with the other analyzers
+        self.http = http_client or shared_client()
     
     def get_team_data(self, team_code):
         """Fetch team data for ML analysis"""
         url = f"{self.api_base_url}/teams/{team_code}"
-        response = requests.get(url)
+        response = self.http.get(url)
         
         if response.status_code == 200:
             return response.json()['data']
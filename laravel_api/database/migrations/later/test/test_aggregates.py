@@ -0,0 +1,80 @@
+import random
+from datetime import date, timedelta
+import pytest
+from aggregates import RECENT_MEETINGS, AggregateEngine, PairAggregate, TeamFormAggregate, window_patterns
+from h2h_index import H2HIndex
+
+def _scores(n, seed):
+    rng = random.Random(seed)
+    return [(rng.randint(0, 3), rng.randint(0, 3)) for _ in range(n)]
+
+def _outcome(a, b):
+    return 'home' if a > b else ('away' if b > a else 'draw')
+
+@pytest.mark.parametrize("limit", [1, 4, 20, None])
+def test_pair_eviction_matches_recompute(limit):
+    """Test running totals after every result equal a recompute over the window"""
+    pair = PairAggregate(limit)
+    history = []
+    for i, (home, away) in enumerate(_scores(60, seed=1)):
+        pair.add(home, away, match_date=str(i))
+        history.append((home, away))
+        
+        window = history[-limit:] if limit else history
+        results = [_outcome(h, a) for h, a in window]
+        assert (pair.home_wins, pair.draws, pair.away_wins) == \
+            (results.count('home'), results.count('draw'), results.count('away'))
+        assert (pair.home_goals, pair.away_goals) == (sum(h for h, _ in window), sum(a for _, a in window))
+        
+        recent = [_outcome(h, a) for h, a in window[::-1][:RECENT_MEETINGS]]
+        assert [m['result'] for m in pair.recent] == recent
+        assert pair.recent_counts == {r: recent.count(r) for r in ('home', 'draw', 'away')}
+        assert pair.recent_analysis()['patterns'] == window_patterns(recent)
+
+@pytest.mark.parametrize("window", [1, 5, 10])
+def test_team_form_eviction_matches_recompute(window):
+    """Test form sums and counts equal a recompute over the last `window` matches"""
+    form = TeamFormAggregate(window)
+    history = []
+    for i, (scored, conceded) in enumerate(_scores(40, seed=2)):
+        form.add(scored, conceded, match_date=str(i))
+        history.append((scored, conceded))
+        
+        last = history[-window:]
+        expected = {
+            'wins': sum(s > c for s, c in last),
+            'draws': sum(s == c for s, c in last),
+            'losses': sum(s < c for s, c in last),
+            'goals_scored': sum(s for s, _ in last),
+            'goals_conceded': sum(c for _, c in last),
+            'clean_sheets': sum(c == 0 for _, c in last),
+            'failed_to_score': sum(s == 0 for s, _ in last),
+        }
+        assert form.sums == expected
+        assert [m['_counts'] for m in form.matches] == [
+            {'wins': s > c, 'draws': s == c, 'losses': s < c, 'goals_scored': s, 'goals_conceded': c,
+             'clean_sheets': c == 0, 'failed_to_score': s == 0}
+            for s, c in last
+        ]
+        assert form.form()['matches_played'] == len(last)
+        assert '_counts' not in form.form()['raw_form'][0]
+
+def test_engine_lookup_matches_h2h_index():
+    """Test the engine replayed in date order agrees with the batch-built index"""
+    rng = random.Random(5)
+    teams = ['A', 'B', 'C']
+    matches = []
+    for i, (home_score, away_score) in enumerate(_scores(300, seed=5)):
+        home, away = rng.sample(teams, 2)
+        matches.append({'id': i, 'home_team_code': home, 'away_team_code': away,
+                        'match_date': (date(2020, 1, 1) + timedelta(days=i)).isoformat(),
+                        'home_score': home_score, 'away_score': away_score})
+    
+    for limit in (5, 20, None):
+        engine = AggregateEngine.from_matches(matches, h2h_limit=limit)
+        index = H2HIndex(matches, limit=limit)
+        for home in teams:
+            for away in set(teams) - {home}:
+                record = engine.lookup(home, away)
+                del record['current_streak']
+                assert record == index.lookup(home, away)
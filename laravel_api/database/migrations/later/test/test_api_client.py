@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import time
+from api_client import AsyncApiClient, CachedApiClient
+from analyze_team import EnhancedTeamFormAnalyzer
+from stub_api_server import StubApiServer, sample_dataset
+
+def _get_all(server, urls, **client_kwargs):
+    async def run():
+        async with AsyncApiClient(**client_kwargs) as client:
+            return await asyncio.gather(*(client.get(url) for url in urls))
+    
+    return asyncio.run(run())
+
+def test_concurrency_limit_caps_requests_in_flight():
+    """Test no more than max_concurrency requests reach the server at once"""
+    with StubApiServer(sample_dataset(), delay=0.05) as server:
+        urls = [f"{server.base_url}/matches/{i}" for i in range(1, 21)]
+        responses = _get_all(server, urls, max_concurrency=4, requests_per_second=1000)
+        peak = server.peak_in_flight
+    
+    assert [r.status_code for r in responses] == [200] * 20
+    assert peak == 4
+
+def test_rate_limit_spaces_requests():
+    """Test a burst of 1 at 40 requests/s takes at least (n - 1) / 40 seconds"""
+    with StubApiServer(sample_dataset()) as server:
+        urls = [f"{server.base_url}/teams/T{i:02d}" for i in range(12)]
+        _get_all(server, urls, max_concurrency=50, requests_per_second=40, burst=1)
+        times = sorted(server.request_times)
+    
+    assert len(times) == 12
+    assert times[-1] - times[0] >= 11 / 40 * 0.9
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert min(gaps) >= 1 / 40 * 0.5
+
+def test_batch_analysis_respects_max_concurrency():
+    """Test the async batch path fans out per-item lookups under its concurrency limit"""
+    dataset = sample_dataset(num_matches=30)
+    with StubApiServer(dataset, bulk=False, delay=0.02) as server:
+        analyzer = EnhancedTeamFormAnalyzer(api_base_url=server.base_url, max_concurrency=5)
+        summary = analyzer.batch_analyze_matches(list(range(1, 31)), concurrent=True)
+        peak = server.peak_in_flight
+    
+    assert summary['statistics']['total_analyzed'] == 30
+    assert 1 < peak <= 5
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_fresh_entries_are_served_from_memory():
+    """Test repeated GETs inside the ttl make one upstream request"""
+    with StubApiServer(sample_dataset()) as server:
+        cache = CachedApiClient(ttl=60)
+        url = f"{server.base_url}/matches/1"
+        bodies = [cache.get(url).json()['data'] for _ in range(3)]
+        
+        assert len(server.requests) == 1
+        assert bodies[0] == bodies[2] == server.dataset['matches'][1]
+        assert cache.stats['hits'] == 2
+
+def test_expired_entry_is_refetched_and_304_keeps_body():
+    """Test an expired entry is revalidated: new data replaces it, a 304 keeps it"""
+    with StubApiServer(sample_dataset()) as server:
+        cache = CachedApiClient(ttl=0.05, stale_ttl=0)
+        url = f"{server.base_url}/teams/T00"
+        first = cache.get(url).json()['data']
+        
+        time.sleep(0.06)
+        assert cache.get(url).json()['data'] == first
+        assert server.statuses == [200, 304]
+        assert cache.stats['revalidated'] == 1
+        
+        server.dataset['teams']['T00'] = dict(first, overall_rating=99)
+        time.sleep(0.06)
+        assert cache.get(url).json()['data']['overall_rating'] == 99
+        assert server.statuses == [200, 304, 200]
+
+def test_stale_reads_trigger_one_background_refresh():
+    """Test stale entries are served at once while a single request refreshes them"""
+    with StubApiServer(sample_dataset(), delay=0.1) as server:
+        cache = CachedApiClient(ttl=0.3, stale_ttl=60)
+        url = f"{server.base_url}/matches/2"
+        cache.get(url)
+        time.sleep(0.31)
+        
+        started = time.monotonic()
+        for _ in range(5):
+            cache.get(url)
+        assert time.monotonic() - started < 0.1
+        assert _wait_for(lambda: cache.stats['revalidated'] == 1)
+        
+        assert server.statuses == [200, 304]
+        assert cache.stats['stale_hits'] == 5
+        assert cache.get(url).status_code == 200 and cache.stats['hits'] == 1
+
+def test_concurrent_identical_gets_share_one_request():
+    """Test identical GETs in flight at once, sync or async, are joined"""
+    with StubApiServer(sample_dataset(), delay=0.1) as server:
+        cache = CachedApiClient()
+        url = f"{server.base_url}/head-to-head/3"
+        threads = [threading.Thread(target=cache.get, args=(url,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(server.requests) == 1
+        
+        async def burst():
+            async with AsyncApiClient() as transport:
+                client = cache.bind(transport)
+                return await asyncio.gather(*(client.get(f"{server.base_url}/matches/4") for _ in range(8)))
+        
+        responses = asyncio.run(burst())
+        assert len(server.requests) == 2
+        assert all(r.json()['data'] == server.dataset['matches'][4] for r in responses)
+        assert cache.stats['coalesced'] >= 14
+
+def test_invalidate_drops_every_query_of_a_url():
+    """Test invalidate(url) forces a refetch of the url under any params"""
+    with StubApiServer(sample_dataset()) as server:
+        cache = CachedApiClient()
+        forms = f"{server.base_url}/team-forms"
+        for params in ({'match_id': 1}, {'match_id': 2}):
+            cache.get(forms, params=params)
+        cache.get(f"{server.base_url}/matches/1")
+        
+        cache.invalidate(forms, params={'match_id': 1})
+        cache.get(forms, params={'match_id': 2})
+        assert len(server.requests) == 3
+        
+        cache.invalidate(forms)
+        cache.get(forms, params={'match_id': 2})
+        cache.get(f"{server.base_url}/matches/1")
+        assert len(server.requests) == 4
+
+def test_drain_waits_for_refreshes_before_transport_closes():
+    """Test a stale async read's refresh completes before the transport is closed"""
+    with StubApiServer(sample_dataset(), delay=0.1) as server:
+        cache = CachedApiClient(ttl=0.01, stale_ttl=60)
+        url = f"{server.base_url}/matches/5"
+        cache.get(url)
+        time.sleep(0.02)
+        
+        async def stale_read():
+            async with AsyncApiClient() as transport:
+                client = cache.bind(transport)
+                await client.get(url)
+                await client.drain()
+        
+        asyncio.run(stale_read())
+        assert server.statuses == [200, 304]
+        assert cache.stats['revalidated'] == 1
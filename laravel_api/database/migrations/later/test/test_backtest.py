@@ -0,0 +1,134 @@
+import importlib.util
+import math
+import os
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from backtest import (Backtester, BacktestConfig, blended_home_probability, brier_score,
+                      calibration, log_loss, simulated_roi)
+
+# game_engine/engine/probability.py, loaded on its own (the package imports the whole engine)
+PROBABILITY_PY = os.path.join(os.path.dirname(__file__), *[os.pardir] * 5, 'game_engine', 'engine', 'probability.py')
+
+def test_brier_score():
+    probs = np.array([[1.0, 0.0, 0.0], [0.5, 0.25, 0.25]])
+    # (0.5^2 + 0.75^2 + 0.25^2) / 2
+    assert brier_score(probs, np.array([0, 1])) == pytest.approx(0.4375)
+
+def test_log_loss_normalises_and_clips():
+    probs = np.array([[0.5, 0.25, 0.25], [0.2, 0.2, 0.6]])
+    assert log_loss(probs, np.array([0, 2])) == pytest.approx(-(math.log(0.5) + math.log(0.6)) / 2)
+    assert log_loss(np.array([[2.0, 1.0, 1.0]]), np.array([0])) == pytest.approx(math.log(2))
+    assert log_loss(np.array([[1.0, 0.0, 0.0]]), np.array([1]), eps=1e-6) == pytest.approx(-math.log(1e-6))
+
+def test_calibration_table_and_ece():
+    predicted = np.array([0.05, 0.15, 0.15, 0.95, 1.0])
+    observed = np.array([0.0, 1.0, 0.0, 1.0, 1.0])
+    result = calibration(predicted, observed, bins=10)
+    
+    # (1 * 0.05 + 2 * 0.35 + 2 * 0.025) / 5
+    assert result['ece'] == pytest.approx(0.16)
+    assert result['bins'] == [
+        {'bin': '0.0-0.1', 'count': 1, 'mean_predicted': 0.05, 'observed': 0.0},
+        {'bin': '0.1-0.2', 'count': 2, 'mean_predicted': 0.15, 'observed': 0.5},
+        {'bin': '0.9-1.0', 'count': 2, 'mean_predicted': 0.975, 'observed': 1.0},
+    ]
+
+def test_simulated_roi():
+    probs = np.array([[0.6, 0.2, 0.2], [0.3, 0.3, 0.4], [0.5, 0.3, 0.2], [0.9, 0.05, 0.05]])
+    odds = np.array([[2.5, 4.0, 4.0], [2.5, 3.0, 2.0], [1.5, 4.0, 4.0], [np.nan, 3.0, 3.0]])
+    outcome = np.array([0, 0, 2, 0])
+    
+    # Row 0 backs home at +0.5 edge and wins 1.5; row 1 has no edge; row 2
+    # backs the draw at +0.2 and loses; row 3 is unpriced
+    assert simulated_roi(probs, outcome, odds, min_edge=0.0) == \
+        {'bets': 2, 'profit': 0.5, 'roi': 0.25, 'hit_rate': 0.5}
+    assert simulated_roi(probs, outcome, odds, min_edge=0.3) == \
+        {'bets': 1, 'profit': 1.5, 'roi': 1.5, 'hit_rate': 1.0}
+    assert simulated_roi(probs[3:], outcome[3:], odds[3:], min_edge=0.0) is None
+
+def test_blended_home_probability_matches_probability_engine():
+    """Test the vectorised blend equals ProbabilityEngine.get_blended_probabilities"""
+    spec = importlib.util.spec_from_file_location("game_engine_probability", PROBABILITY_PY)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    engine = module.ProbabilityEngine
+    
+    rng = np.random.default_rng(12)
+    home_xg, away_xg = rng.uniform(0.1, 3.5, 500), rng.uniform(0.1, 3.5, 500)
+    implied = rng.uniform(0.02, 0.98, 500)
+    for volatility in (0.0, 2.3, 5.0, 10.0):
+        expected = [
+            engine.get_blended_probabilities(SimpleNamespace(
+                model_inputs=SimpleNamespace(home_xg=h, away_xg=a, volatility_score=volatility),
+                selected_market=SimpleNamespace(implied_probability=p),
+            ))
+            for h, a, p in zip(home_xg, away_xg, implied)
+        ]
+        assert blended_home_probability(home_xg, away_xg, implied, volatility) == pytest.approx(expected)
+    
+    # Unpriced fixtures blend the model probability with itself
+    assert blended_home_probability(np.array([2.0]), np.array([1.0]), np.array([np.nan]), 0.0)[0] == \
+        pytest.approx(2 / 3)
+
+def _history(leagues=('L1', 'L2'), seasons=(2021, 2022, 2023), teams=4, seed=4):
+    """Double round robins per league and season, priced, plus one unplayed fixture"""
+    rng = random.Random(seed)
+    matches = []
+    for league in leagues:
+        codes = [f"{league}-{i}" for i in range(teams)]
+        for season in seasons:
+            day = date(season, 8, 1)
+            for home in codes:
+                for away in codes:
+                    if home == away:
+                        continue
+                    day += timedelta(days=3)
+                    matches.append({
+                        'id': len(matches), 'league': league, 'season': str(season),
+                        'home_team_code': home, 'away_team_code': away, 'match_date': day.isoformat(),
+                        'home_score': rng.randint(0, 3), 'away_score': rng.randint(0, 3),
+                        'home_odds': 2.4, 'draw_odds': 3.3, 'away_odds': 3.0,
+                    })
+    matches.append({'id': len(matches), 'league': 'L1', 'home_team_code': 'L1-0', 'away_team_code': 'L1-1',
+                    'match_date': '2030-01-01', 'home_score': None, 'away_score': None})
+    return matches
+
+def _expected_scored(matches, min_history):
+    """Fixtures where both sides already had min_history league games"""
+    played, scored = {}, 0
+    for m in sorted((m for m in matches if m['home_score'] is not None), key=lambda m: m['match_date']):
+        home, away = m['home_team_code'], m['away_team_code']
+        scored += played.get(home, 0) >= min_history and played.get(away, 0) >= min_history
+        played[home] = played.get(home, 0) + 1
+        played[away] = played.get(away, 0) + 1
+    return scored
+
+def test_run_by_season_and_by_league_agree():
+    """Test both partition modes score the same fixtures with the same point-in-time features"""
+    matches = _history()
+    by_season = Backtester(BacktestConfig(partition_by='season', workers=1)).run(matches)
+    by_league = Backtester(BacktestConfig(partition_by='league', workers=2)).run(matches)
+    
+    assert by_season['fixtures_total'] == by_league['fixtures_total'] == len(matches) - 1
+    assert by_season['partitions'] == 6
+    assert by_league['partitions'] == 2
+    assert by_season['fixtures_scored'] == by_league['fixtures_scored'] == _expected_scored(matches, 3)
+    assert sorted(by_season['by_partition']) == [f"{l}/{s}" for l in ('L1', 'L2') for s in (2021, 2022, 2023)]
+    assert sum(p['fixtures'] for p in by_season['by_partition'].values()) == by_season['fixtures_scored']
+    
+    assert set(by_season['models']) == {'form', 'combined', 'h2h', 'probability_engine'}
+    assert by_season['models'] == by_league['models']
+    assert by_season['models']['form']['roi']['bets'] > 0
+    assert by_season['models']['probability_engine']['market'] == 'home_win'
+
+def test_run_on_empty_history():
+    """Test no matches, or none completed, gives an empty report"""
+    for matches in ([], [m for m in _history() if m['home_score'] is None]):
+        report = Backtester(BacktestConfig(workers=1)).run(matches)
+        assert report['fixtures_total'] == 0
+        assert report['fixtures_scored'] == 0
+        assert report['partitions'] == 0
+        assert report['models'] == {} and report['by_partition'] == {}
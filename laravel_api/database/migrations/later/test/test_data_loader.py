@@ -0,0 +1,56 @@
+import asyncio
+from api_client import AsyncApiClient, CachedApiClient
+from data_loader import ApiLoaders
+from stub_api_server import StubApiServer, sample_dataset
+
+MATCH_IDS = list(range(1, 21))
+
+def _load_matches(server, match_ids):
+    """Load matches and their head-to-head rows through fresh loaders"""
+    async def run():
+        async with AsyncApiClient() as transport:
+            loaders = ApiLoaders(CachedApiClient().bind(transport), server.base_url)
+            matches, h2h = await asyncio.gather(
+                loaders.matches.load_many(match_ids),
+                loaders.head_to_head.load_many(match_ids),
+            )
+            return matches, h2h, loaders
+    
+    return asyncio.run(run())
+
+def test_bulk_routes_fetch_a_batch_in_one_request():
+    """Test a batch of loads is coalesced into one bulk request per resource"""
+    dataset = sample_dataset()
+    with StubApiServer(dataset, bulk=True) as server:
+        matches, h2h, loaders = _load_matches(server, MATCH_IDS)
+        requests = list(server.requests)
+    
+    assert matches == [dataset['matches'][i] for i in MATCH_IDS]
+    assert h2h == [dataset['head_to_head'][i] for i in MATCH_IDS]
+    assert len(requests) == 2
+    assert loaders.matches.stats == {'loads': 20, 'bulk_calls': 1, 'item_calls': 0}
+
+def test_ignored_bulk_filter_falls_back_to_item_routes():
+    """Test rows outside the request disable bulk and every key is fetched per item"""
+    dataset = sample_dataset()
+    with StubApiServer(dataset, bulk=False) as server:
+        # The unfiltered index page holds matches 1-15, none of which were asked for
+        matches, _, loaders = _load_matches(server, list(range(30, 40)))
+        requests = list(server.requests)
+    
+    assert matches == [dataset['matches'][i] for i in range(30, 40)]
+    assert loaders.matches.stats == {'loads': 10, 'bulk_calls': 1, 'item_calls': 10}
+    assert not loaders.matches.bulk_supported
+    assert sum(path.startswith('/api/matches/') for path in requests) == 10
+    # head-to-head has no index route: 404 also falls back
+    assert loaders.head_to_head.stats['item_calls'] == 10
+
+def test_empty_bulk_answer_is_not_unsupported():
+    """Test an empty bulk response keeps the bulk route; missing keys fall through"""
+    dataset = sample_dataset(num_matches=5)
+    with StubApiServer(dataset, bulk=True) as server:
+        matches, _, loaders = _load_matches(server, [101, 102])
+    
+    assert matches == [None, None]
+    assert loaders.matches.stats == {'loads': 2, 'bulk_calls': 1, 'item_calls': 2}
+    assert loaders.matches.bulk_supported
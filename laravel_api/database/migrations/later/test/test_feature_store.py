@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from feature_store import MIN_CAPACITY, FeatureStore
+
+NAMES = ['a', 'b']
+
+def _rows(match_ids, offset=0.0):
+    match_ids = np.asarray(match_ids, dtype=np.float64)
+    return {'a': match_ids + offset, 'b': match_ids * 2 + offset}
+
+def test_upsert_replaces_and_appends(tmp_path):
+    """Test upserts overwrite stored ids in place and append new ones"""
+    store = FeatureStore(str(tmp_path), "ml", feature_names=NAMES)
+    store.upsert([1, 2, 3], _rows([1, 2, 3]), [10, 20, 30])
+    store.upsert([2, 4], _rows([2, 4], offset=0.5), [21, 40])
+    
+    assert list(store.match_ids()) == [1, 2, 3, 4]
+    assert store.load([4, 2, 9]).tolist()[:2] == [[4.5, 8.5], [2.5, 4.5]]
+    assert np.isnan(store.load([9])).all()
+
+def test_duplicate_ids_in_a_batch_last_wins(tmp_path):
+    """Test a batch repeating a match id stores its last row once"""
+    store = FeatureStore(str(tmp_path), "ml", feature_names=NAMES)
+    store.upsert([5, 6, 5], np.array([[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]]), [1, 2, 3])
+    
+    assert list(store.match_ids()) == [6, 5]
+    assert store.load([5]).tolist() == [[3.0, 3.0]]
+    assert not store.needs_update([5], [3]).any()
+
+def test_grow_and_reopen_keep_rows(tmp_path):
+    """Test rows survive growing past capacity and reopening the directory"""
+    ids = np.arange(MIN_CAPACITY + 10)
+    store = FeatureStore(str(tmp_path), "ml", version="2", feature_names=NAMES)
+    store.upsert(ids[:100], _rows(ids[:100]), ids[:100])
+    store.upsert(ids[100:], _rows(ids[100:]), ids[100:])
+    assert store.capacity >= len(ids)
+    
+    reopened = FeatureStore(str(tmp_path), "ml", version="2")
+    assert reopened.feature_names == NAMES
+    assert len(reopened) == len(ids)
+    assert np.array_equal(reopened.load(ids), np.column_stack([ids, ids * 2]).astype(float))
+    with pytest.raises(ValueError):
+        FeatureStore(str(tmp_path), "ml", version="2", feature_names=['a'])
+
+def test_get_or_compute_recomputes_changed_fingerprints(tmp_path):
+    """Test only missing rows and rows with a new fingerprint are recomputed"""
+    store = FeatureStore(str(tmp_path), "ml", feature_names=NAMES)
+    computed = []
+    
+    def compute(indices):
+        computed.append(list(indices))
+        return _rows([10 * (i + 1) for i in indices])
+    
+    store.get_or_compute([1, 2, 3], [100, 200, 300], compute)
+    rows = store.get_or_compute([1, 2, 3, 4], [100, 201, 300, 400], compute)
+    
+    assert computed == [[0, 1, 2], [1, 3]]
+    assert rows[:, 0].tolist() == [10.0, 20.0, 30.0, 40.0]
+
+def test_matrix_is_a_read_only_live_view(tmp_path):
+    """Test matrix() cannot be written through and later upserts stay writable"""
+    store = FeatureStore(str(tmp_path), "ml", feature_names=NAMES)
+    store.upsert([1, 2], _rows([1, 2]), [1, 2])
+    view = store.matrix()
+    
+    with pytest.raises(ValueError):
+        view[0, 0] = 99.0
+    store.upsert([1], _rows([1], offset=7.0), [3])
+    
+    assert view[0].tolist() == [8.0, 9.0]
+    assert store.column('b').tolist() == [9.0, 4.0]
@@ -0,0 +1,92 @@
+import random
+import pytest
+from analyze_team import EnhancedTeamFormAnalyzer
+from api_client import CachedApiClient
+
+def _form(rng):
+    played = rng.randint(0, 10)
+    return {
+        'form_rating': round(rng.uniform(2, 9), rng.choice([1, 2, 3])),
+        'form_momentum': round(rng.uniform(-1, 1), 3),
+        'avg_goals_scored': round(rng.uniform(0, 3), 2),
+        'avg_goals_conceded': round(rng.uniform(0, 3), 2),
+        'win_probability': round(rng.random(), 3),
+        'clean_sheets': rng.randint(0, played),
+        'failed_to_score': rng.randint(0, played),
+        'matches_played': played,
+        'form_string': ''.join(rng.choice('WDL') for _ in range(rng.randint(0, 5))),
+    }
+
+def _team(rng):
+    return {'overall_rating': rng.randint(3, 9), 'home_strength': round(rng.uniform(3, 9), 1)}
+
+def _h2h(rng):
+    home, away, draws = rng.randint(0, 5), rng.randint(0, 5), rng.randint(0, 3)
+    return {'home_wins': home, 'away_wins': away, 'draws': draws, 'total_meetings': home + away + draws}
+
+def _match(rng, missing=()):
+    data = {
+        'home_team_form': _form(rng), 'away_team_form': _form(rng),
+        'home_team_details': _team(rng), 'away_team_details': _team(rng),
+        'head_to_head': _h2h(rng),
+    }
+    for key in missing:
+        del data[key]
+    return data
+
+def _match_data():
+    rng = random.Random(11)
+    matches = [_match(rng) for _ in range(40)]
+    # Each section missing on its own, a meetingless h2h and everything missing
+    matches += [
+        _match(rng, missing=['home_team_form']),
+        _match(rng, missing=['away_team_form']),
+        _match(rng, missing=['home_team_form', 'away_team_form']),
+        _match(rng, missing=['home_team_details']),
+        _match(rng, missing=['away_team_details']),
+        _match(rng, missing=['head_to_head']),
+        dict(_match(rng), head_to_head={'home_wins': 0, 'away_wins': 0, 'draws': 0, 'total_meetings': 0}),
+        {'home_team_code': 'T00', 'away_team_code': 'T01'},
+    ]
+    return matches
+
+def _assert_same_predictions(batch, scalar):
+    for stage in ('form_based', 'final'):
+        assert batch[stage]['prediction'] == scalar[stage]['prediction']
+        assert batch[stage]['confidence'] == pytest.approx(scalar[stage]['confidence'])
+        assert batch[stage]['probabilities'] == pytest.approx(scalar[stage]['probabilities'])
+    assert batch['final']['factors'] == pytest.approx(scalar['final']['factors'])
+
+@pytest.fixture
+def analyzer():
+    return EnhancedTeamFormAnalyzer(http_client=CachedApiClient())
+
+def test_predict_batch_matches_scalar_analysis(analyzer):
+    """Test every batch output equals analyze_match_data's for the same match"""
+    matches = _match_data()
+    batch = analyzer.predict_batch(matches)
+    
+    for i, match in enumerate(matches):
+        scalar = analyzer.analyze_match_data(i, match)
+        assert 'error' not in scalar
+        
+        _assert_same_predictions(batch.predictions(i), scalar['predictions'])
+        assert batch.home_strength[i] == pytest.approx(scalar['team_strength']['home'])
+        assert batch.away_strength[i] == pytest.approx(scalar['team_strength']['away'])
+        assert batch.h2h_factor[i] == pytest.approx(scalar['head_to_head']['factor'])
+        assert {name: float(values[i]) for name, values in batch.ml_features.items()} == \
+            pytest.approx(scalar['ml_features'])
+        if batch.has_comparison[i]:
+            assert {name: float(values[i]) for name, values in batch.comparison.items()} == \
+                pytest.approx(scalar['form_analysis']['comparison'])
+        else:
+            assert scalar['form_analysis']['comparison'] == {}
+
+def test_predict_batch_handles_all_missing(analyzer):
+    """Test a match with no form, team or h2h data gets the neutral defaults"""
+    batch = analyzer.predict_batch([None, {}])
+    
+    assert list(batch.has_comparison) == [False, False]
+    assert list(batch.form_prediction) == ['draw', 'draw']
+    assert list(batch.home_strength) == [5.0, 5.0]
+    assert list(batch.h2h_factor) == [0.0, 0.0]
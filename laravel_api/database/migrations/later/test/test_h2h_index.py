@@ -0,0 +1,85 @@
+import random
+from datetime import date, timedelta
+import pytest
+from api_client import CachedApiClient
+from h2h_index import H2HIndex
+from pythongeneraton import EnhancedHeadToHeadAnalyzer
+from snapshot import Snapshot
+from stub_api_server import sample_dataset
+
+def _scored_matches(num_matches=600, num_teams=5, seed=3):
+    """sample_dataset matches with distinct dates and final scores"""
+    rng = random.Random(seed)
+    matches = list(sample_dataset(num_matches=num_matches, num_teams=num_teams)['matches'].values())
+    for match in matches:
+        match['match_date'] = (date(2020, 1, 1) + timedelta(days=match['id'])).isoformat()
+        match['home_score'], match['away_score'] = rng.randint(0, 3), rng.randint(0, 3)
+    return matches
+
+@pytest.fixture
+def analyzer():
+    return EnhancedHeadToHeadAnalyzer(http_client=CachedApiClient())
+
+def test_lookup_matches_scalar_analysis(analyzer):
+    """Test every pairing agrees with the scalar path over a newest-first search"""
+    matches = _scored_matches()
+    snapshot = Snapshot.from_dataset({'matches': matches})
+    shuffled = matches[:]
+    random.Random(0).shuffle(shuffled)
+    index = H2HIndex(shuffled)
+    analyzer.h2h_index = index
+    
+    pairs = {(m['home_team_code'], m['away_team_code']) for m in matches}
+    assert len(index) == len(pairs)
+    for home, away in pairs:
+        # The search route answers newest first, up to 20 meetings
+        search = snapshot.search_matches(home, away, limit=20)
+        expected = analyzer.analyze_historical_matches(search, home, away)
+        expected['recent_analysis'] = analyzer.analyze_recent_meetings(expected['last_meetings'])
+        
+        assert analyzer.h2h_from_index(home, away) == expected
+
+def test_recent_analysis_patterns_match_scalar(analyzer):
+    """Test streak, alternating and bias patterns on hand-built sequences"""
+    scores = {'home': (2, 0), 'draw': (1, 1), 'away': (0, 1)}
+    sequences = [
+        ['home'] * 4 + ['away'] * 3 + ['draw'],
+        ['home', 'away'] * 4,
+        ['home'] * 8 + ['away'],
+        ['away'] * 8 + ['home'],
+        ['draw', 'draw'],
+    ]
+    matches = []
+    for s, results in enumerate(sequences):
+        for i, result in enumerate(results):
+            home_score, away_score = scores[result]
+            # Listed newest first: earlier entries get later dates
+            matches.append({'id': len(matches), 'home_team_code': f"H{s}", 'away_team_code': f"A{s}",
+                            'match_date': (date(2024, 1, 1) - timedelta(days=i)).isoformat(),
+                            'home_score': home_score, 'away_score': away_score})
+    index = H2HIndex(matches[::-1])
+    
+    for s, results in enumerate(sequences):
+        record = index.lookup(f"H{s}", f"A{s}")
+        assert record['last_meeting_result'] == results[0]
+        assert [m['result'] for m in record['last_meetings']] == results
+        assert record['recent_analysis'] == analyzer.analyze_recent_meetings(record['last_meetings'])
+        assert index.patterns(index.pair_index(f"H{s}", f"A{s}")) == analyzer.identify_patterns(results)
+
+def test_lookup_is_newest_first_and_limited():
+    """Test meetings come back newest first and aggregates cover the last `limit` only"""
+    matches = _scored_matches(num_matches=200, num_teams=3)
+    index = H2HIndex(matches, limit=5)
+    
+    for (home, away) in {(m['home_team_code'], m['away_team_code']) for m in matches}:
+        meetings = sorted((m for m in matches if (m['home_team_code'], m['away_team_code']) == (home, away)),
+                          key=lambda m: m['match_date'], reverse=True)[:5]
+        record = index.lookup(home, away)
+        
+        dates = [m['date'] for m in record['last_meetings']]
+        assert dates == [m['match_date'] for m in meetings]
+        assert record['last_meeting_date'] == meetings[0]['match_date']
+        assert record['home_goals'] == sum(m['home_score'] for m in meetings)
+        assert record['total_meetings'] == len(meetings)
+    
+    assert index.lookup('T00', 'nobody') is None
@@ -0,0 +1,86 @@
+import random
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from aggregates import AggregateEngine
+from rolling_form import RollingFormEngine
+
+FIELDS = ('matches_played', 'wins', 'draws', 'losses', 'goals_scored', 'goals_conceded',
+          'avg_goals_scored', 'avg_goals_conceded', 'clean_sheets', 'failed_to_score',
+          'form_rating', 'form_momentum', 'win_probability')
+
+def _matches(n=240, teams=6, per_day=3, seed=9):
+    """Fixtures in date order, several per day, no team twice on one day"""
+    rng = random.Random(seed)
+    codes = [f"T{i}" for i in range(teams)]
+    matches = []
+    for i in range(n):
+        day = date(2023, 1, 1) + timedelta(days=i // per_day)
+        busy = {code for m in matches if m['match_date'] == day.isoformat()
+                for code in (m['home_team_code'], m['away_team_code'])}
+        home, away = rng.sample([c for c in codes if c not in busy], 2)
+        matches.append({'id': i, 'home_team_code': home, 'away_team_code': away,
+                        'match_date': day.isoformat(),
+                        'home_score': rng.randint(0, 3), 'away_score': rng.randint(0, 3)})
+    return matches
+
+def _row(columns, i):
+    return {name: float(columns[name][i]) for name in FIELDS}
+
+@pytest.mark.parametrize("by_venue", [False, True])
+def test_fixture_form_agrees_with_aggregates_before_kickoff(by_venue):
+    """Test each fixture's form equals AggregateEngine state just before the match is recorded"""
+    matches = _matches()
+    home, away = RollingFormEngine.from_matches(matches, by_venue=by_venue).fixture_form()
+    engine = AggregateEngine()
+    
+    for i, match in enumerate(matches):
+        for columns, team, venue in ((home, match['home_team_code'], 'home'),
+                                     (away, match['away_team_code'], 'away')):
+            expected = engine.team_form(team, venue if by_venue else None)
+            if not expected:
+                assert not columns['present'][i]
+                continue
+            assert _row(columns, i) == pytest.approx({name: expected[name] for name in FIELDS})
+            form_string = expected['form_string']
+            assert columns['form_points'][i] == 3 * form_string.count('W') + form_string.count('D')
+        engine.record_result(match)
+
+def test_fixture_form_has_no_lookahead():
+    """Test changing a match's score, or anything after it, leaves its own pre-match form alone"""
+    matches = _matches()
+    base_home, base_away = RollingFormEngine.from_matches(matches).fixture_form()
+    
+    cut = 120
+    changed = [dict(m, home_score=m['away_score'] + 2, away_score=0) if i >= cut else m
+               for i, m in enumerate(matches)]
+    home, away = RollingFormEngine.from_matches(changed).fixture_form()
+    
+    for name in base_home:
+        assert np.array_equal(home[name][:cut + 1], base_home[name][:cut + 1], equal_nan=True)
+        assert np.array_equal(away[name][:cut + 1], base_away[name][:cut + 1], equal_nan=True)
+    assert not np.array_equal(home['wins'], base_home['wins'])
+
+def test_form_at_excludes_games_on_the_fixture_date():
+    """Test form_at counts games strictly before `date`, and equals fixture_form on match day"""
+    matches = _matches()
+    rolling = RollingFormEngine.from_matches(matches)
+    home, _ = rolling.fixture_form()
+    
+    for i in (30, 31, 32, 200):
+        match = matches[i]
+        team, day = match['home_team_code'], match['match_date']
+        form = rolling.form_at(team, day)
+        played_before = sum(team in (m['home_team_code'], m['away_team_code'])
+                            for m in matches if m['match_date'] < day)
+        assert form['matches_played'] == min(played_before, rolling.window)
+        assert {name: float(form[name]) for name in FIELDS} == pytest.approx(_row(home, i))
+        
+        # The day after, the game itself counts
+        next_day = (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+        after = rolling.form_at(team, next_day)
+        assert after['form_string'][-1] == ('W' if match['home_score'] > match['away_score'] else
+                                            'L' if match['home_score'] < match['away_score'] else 'D')
+    
+    assert rolling.form_at('nobody', '2023-02-01') is None
+    assert rolling.form_at('T0', '2000-01-01')['matches_played'] == 0
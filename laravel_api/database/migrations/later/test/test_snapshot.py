@@ -0,0 +1,80 @@
+import pytest
+from analyze_team import EnhancedTeamFormAnalyzer
+from api_client import CachedApiClient
+from snapshot import Snapshot, SnapshotClient
+from stub_api_server import StubApiServer, sample_dataset
+
+FORM = {'match_id': 1, 'team_id': 'T00', 'venue': 'home', 'form_rating': 5.0}
+
+def test_reloading_team_forms_replaces_rows():
+    """Test loading the same (match, team, venue) twice keeps one row, the last"""
+    dataset = sample_dataset(num_matches=10)
+    snapshot = Snapshot.from_dataset(dataset)
+    snapshot.load(team_forms=dataset['team_forms'])
+    snapshot.load(team_forms=[dict(FORM), dict(FORM, form_rating=7.5)])
+    
+    assert len(snapshot.team_forms()) == len(dataset['team_forms']) + 1
+    assert snapshot.team_forms(match_id=1, team_id='T00', venue='home') == [dict(FORM, form_rating=7.5)]
+
+ROUTES = [
+    ('/api/matches/3', {}),
+    ('/api/matches/999', {}),
+    ('/api/matches', {'ids': '1,4,7'}),
+    ('/api/teams/T05', {}),
+    ('/api/teams/NOPE', {}),
+    ('/api/teams', {'codes': 'T01,T02'}),
+    ('/api/team-forms', {'match_id': '2', 'venue': 'home'}),
+    ('/api/team-forms', {'team_id': 'T03', 'venue': 'away', 'limit': '5'}),
+    ('/api/team-forms', {'match_ids': '1,2,3'}),
+    ('/api/head-to-head/6', {}),
+    ('/api/head-to-head', {'match_ids': '2,5'}),
+    ('/api/unknown/1', {}),
+]
+
+def test_snapshot_client_routes_like_the_api():
+    """Test every route the analyzers use answers like the (bulk) stub API"""
+    dataset = sample_dataset(num_matches=20)
+    client = SnapshotClient(Snapshot.from_dataset(dataset))
+    with StubApiServer(dataset, bulk=True) as stub:
+        for path, params in ROUTES:
+            response = client.get(f"http://snapshot.local{path}", params=params)
+            status, body = stub.route(path, params)
+            assert response.status_code == status, path
+            if status == 200:
+                assert response.json() == body, (path, params)
+
+def test_snapshot_client_search_and_read_only_session():
+    """Test /matches/search is newest first over completed meetings and writes are refused"""
+    matches = [
+        {'id': 1, 'home_team_code': 'A', 'away_team_code': 'B', 'match_date': '2024-01-01', 'home_score': 1, 'away_score': 0},
+        {'id': 2, 'home_team_code': 'A', 'away_team_code': 'B', 'match_date': '2024-03-01', 'home_score': 2, 'away_score': 2},
+        {'id': 3, 'home_team_code': 'A', 'away_team_code': 'B', 'match_date': '2024-05-01'},
+        {'id': 4, 'home_team_code': 'B', 'away_team_code': 'A', 'match_date': '2024-04-01', 'home_score': 0, 'away_score': 1},
+    ]
+    client = SnapshotClient(Snapshot.from_dataset({'matches': matches}))
+    response = client.get("http://x/api/matches/search", params={'home_team': 'A', 'away_team': 'B', 'limit': 20})
+    
+    assert [m['id'] for m in response.json()['data']] == [2, 1]
+    assert client.session.post("http://x/api/matches/1/h2h-prediction", json={}).status_code == 405
+
+@pytest.fixture
+def exported(tmp_path):
+    dataset = sample_dataset(num_matches=12)
+    Snapshot.from_dataset(dataset).export_jsonl(str(tmp_path / "snap"))
+    return dataset, str(tmp_path / "snap")
+
+def test_from_snapshot_matches_http_analysis(exported):
+    """Test analyses read from a snapshot equal the ones fetched from the API, sync and batched"""
+    dataset, directory = exported
+    match_ids = list(range(1, 13))
+    offline = EnhancedTeamFormAnalyzer.from_snapshot(directory)
+    
+    with StubApiServer(dataset) as server:
+        online = EnhancedTeamFormAnalyzer(api_base_url=server.base_url, http_client=CachedApiClient())
+        for match_id in match_ids:
+            assert offline.analyze_match(match_id) == online.analyze_match(match_id)
+        online_batch = online.batch_analyze_matches(match_ids, concurrent=True)
+    
+    offline_batch = offline.batch_analyze_matches(match_ids, concurrent=True)
+    assert offline_batch == online_batch
+    assert offline_batch['statistics']['total_analyzed'] == len(match_ids)